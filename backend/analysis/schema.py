@@ -9,7 +9,12 @@ from .models import (
 from stocks.models import Stock, Sector
 from graphene_file_upload.scalars import Upload
 import django_filters
-from graphene_django.filter import DjangoFilterConnectionField
+from stocktracker.dataloaders import batched
+from stocktracker.optimizer import OptimizedConnectionField, optimize
+from stocktracker.pagination import KeysetConnectionField
+
+# Newest first. Ids grow with created_at, and the primary key index serves this order.
+NEWEST_FIRST = ("-id",)
 
 
 class StockNoteFilter(django_filters.FilterSet):
@@ -40,6 +45,9 @@ class StockNoteNode(DjangoObjectType):
         filterset_class = StockNoteFilter
         interfaces = (graphene.relay.Node,)
 
+    resolve_stock = batched("stock")
+    resolve_user = batched("user")
+
 
 class StockEvaluationNode(DjangoObjectType):
     class Meta:
@@ -47,24 +55,39 @@ class StockEvaluationNode(DjangoObjectType):
         filterset_class = StockEvaluationFilter
         interfaces = (graphene.relay.Node,)
 
+    resolve_stock = batched("stock")
+    resolve_user = batched("user")
+
 class StockImageType(DjangoObjectType):
     class Meta:
         model = StockImage
 
+    resolve_stock = batched("stock")
+    resolve_user = batched("user")
+
 class SectorImageType(DjangoObjectType):
     class Meta:
         model = SectorImage
 
+    resolve_sector = batched("sector")
+    resolve_user = batched("user")
+
 
 class SectorNoteType(DjangoObjectType):
     class Meta:
         model = SectorNote
 
+    resolve_sector = batched("sector")
+    resolve_user = batched("user")
+
 
 class SectorEvaluationType(DjangoObjectType):
     class Meta:
         model = SectorEvaluation
 
+    resolve_sector = batched("sector")
+    resolve_user = batched("user")
+
 
 # Stock Note Mutations
 class CreateStockNoteMutation(graphene.Mutation):
@@ -461,49 +484,55 @@ class UploadSectorImageMutation(graphene.Mutation):
 
 class Query(graphene.ObjectType):
     # Stock images with filtering
-    stock_images = graphene.List(
+    stock_images = KeysetConnectionField(
         StockImageType,
+        order_by=NEWEST_FIRST,
         stock_id=graphene.ID(),
         user_id=graphene.ID()
     )
 
     # Stock notes with filtering
-    stock_notes = graphene.List(
+    stock_notes = KeysetConnectionField(
         StockNoteNode,
+        order_by=NEWEST_FIRST,
         stock_id=graphene.ID(),
         user_id=graphene.ID()
     )
 
     # Stock evaluations with filtering
-    stock_evaluations = graphene.List(
+    stock_evaluations = KeysetConnectionField(
         StockEvaluationNode,
+        order_by=NEWEST_FIRST,
         stock_id=graphene.ID(),
         user_id=graphene.ID()
     )
 
     # Sector images with filtering
-    sector_images = graphene.List(
+    sector_images = KeysetConnectionField(
         SectorImageType,
+        order_by=NEWEST_FIRST,
         sector_id=graphene.ID(),
         user_id=graphene.ID()
     )
 
     # Sector notes with filtering
-    sector_notes = graphene.List(
+    sector_notes = KeysetConnectionField(
         SectorNoteType,
+        order_by=NEWEST_FIRST,
         sector_id=graphene.ID(),
         user_id=graphene.ID()
     )
 
     # Sector evaluations with filtering
-    sector_evaluations = graphene.List(
+    sector_evaluations = KeysetConnectionField(
         SectorEvaluationType,
+        order_by=NEWEST_FIRST,
         sector_id=graphene.ID(),
         user_id=graphene.ID()
     )
 
-    stock_notes_filtered = DjangoFilterConnectionField(StockNoteNode)
-    stock_evaluations_filtered = DjangoFilterConnectionField(StockEvaluationNode)
+    stock_notes_filtered = OptimizedConnectionField(StockNoteNode)
+    stock_evaluations_filtered = OptimizedConnectionField(StockEvaluationNode)
 
     # Add field for average rating
     stock_average_rating = graphene.Float(
@@ -532,7 +561,7 @@ class Query(graphene.ObjectType):
         if user_id:
             query = query.filter(user_id=user_id)
 
-        return query
+        return optimize(query, info)
 
     def resolve_stock_notes(self, info, stock_id=None, user_id=None):
         query = StockNote.objects.all()
@@ -543,7 +572,7 @@ class Query(graphene.ObjectType):
         if user_id:
             query = query.filter(user_id=user_id)
 
-        return query
+        return optimize(query, info)
 
     def resolve_stock_evaluations(self, info, stock_id=None, user_id=None):
         query = StockEvaluation.objects.all()
@@ -554,7 +583,7 @@ class Query(graphene.ObjectType):
         if user_id:
             query = query.filter(user_id=user_id)
 
-        return query
+        return optimize(query, info)
 
     def resolve_sector_images(self, info, sector_id=None, user_id=None):
         query = SectorImage.objects.all()
@@ -565,7 +594,7 @@ class Query(graphene.ObjectType):
         if user_id:
             query = query.filter(user_id=user_id)
 
-        return query
+        return optimize(query, info)
 
     def resolve_sector_notes(self, info, sector_id=None, user_id=None):
         query = SectorNote.objects.all()
@@ -576,7 +605,7 @@ class Query(graphene.ObjectType):
         if user_id:
             query = query.filter(user_id=user_id)
 
-        return query
+        return optimize(query, info)
 
     def resolve_sector_evaluations(self, info, sector_id=None, user_id=None):
         query = SectorEvaluation.objects.all()
@@ -587,7 +616,7 @@ class Query(graphene.ObjectType):
         if user_id:
             query = query.filter(user_id=user_id)
 
-        return query
+        return optimize(query, info)
 
 
 class Mutation(graphene.ObjectType):
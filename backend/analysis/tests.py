@@ -1,3 +1,49 @@
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from analysis.models import StockNote
+from stocks.models import Stock
+from stocktracker.schema import schema
+
+
+def execute(query, **variables):
+    request = RequestFactory().post("/graphql/")
+    request.user = AnonymousUser()
+    result = schema.execute(query, variable_values=variables, context_value=request)
+    if result.errors:
+        raise result.errors[0]
+    return result.data
+
+
+class StockNotesTests(TestCase):
+    QUERY = """
+        query ($stockId: ID, $first: Int, $after: String, $last: Int, $before: String) {
+            stockNotes(stockId: $stockId, first: $first, after: $after, last: $last, before: $before) {
+                edges { node { title } }
+                pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+            }
+        }
+    """
+
+    def setUp(self):
+        user = User.objects.create_user("analyst")
+        self.stock = Stock.objects.create(symbol="AAA", name="AAA")
+        other = Stock.objects.create(symbol="BBB", name="BBB")
+        for title in ["first", "second", "third", "fourth", "fifth"]:
+            StockNote.objects.create(stock=self.stock, user=user, title=title, content=title)
+        StockNote.objects.create(stock=other, user=user, title="elsewhere", content="")
+
+    def page(self, **args):
+        connection = execute(self.QUERY, stockId=self.stock.pk, **args)["stockNotes"]
+        return [edge["node"]["title"] for edge in connection["edges"]], connection["pageInfo"]
+
+    def test_notes_are_paged_newest_first(self):
+        newest, info = self.page(first=2)
+        self.assertEqual(newest, ["fifth", "fourth"])
+
+        older, info = self.page(first=2, after=info["endCursor"])
+        self.assertEqual(older, ["third", "second"])
+        self.assertTrue(info["hasNextPage"])
+
+        self.assertEqual(self.page(last=2, before=info["startCursor"])[0], newest)
+        self.assertEqual(self.page(last=1)[0], ["first"])
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Stock, Sector, Tag, StockList
+from .models import Stock, Sector, Tag, StockList, PriceBar, IndicatorSnapshot, IndicatorState, StockFundamentals, SectorStrength, IndustryGroupStrength, RefreshRun, SavedScreen
 
 @admin.register(Stock)
 class StockAdmin(admin.ModelAdmin):
@@ -21,4 +21,49 @@ class TagAdmin(admin.ModelAdmin):
 class StockListAdmin(admin.ModelAdmin):
     list_display = ('name', 'user', 'created_at')
     search_fields = ('name', 'user__username')
+    list_filter = ('user',)
+
+@admin.register(PriceBar)
+class PriceBarAdmin(admin.ModelAdmin):
+    list_display = ('stock', 'interval', 'date', 'close', 'volume')
+    search_fields = ('stock__symbol',)
+    list_filter = ('interval',)
+
+@admin.register(IndicatorState)
+class IndicatorStateAdmin(admin.ModelAdmin):
+    list_display = ('stock', 'last_date', 'updated_at')
+    search_fields = ('stock__symbol',)
+
+@admin.register(IndicatorSnapshot)
+class IndicatorSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('stock', 'date', 'current_price', 'RSI_14', 'RS_SP500')
+    search_fields = ('stock__symbol',)
+    raw_id_fields = ('stock',)
+
+@admin.register(StockFundamentals)
+class StockFundamentalsAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'long_name', 'sector', 'industry', 'fetched_at')
+    search_fields = ('symbol', 'long_name')
+    list_filter = ('sector',)
+
+@admin.register(SectorStrength)
+class SectorStrengthAdmin(admin.ModelAdmin):
+    list_display = ('sector', 'date', 'rank', 'avg_rs', 'count_above_sma50', 'count_above_sma200', 'total_stocks')
+    list_filter = ('sector',)
+    date_hierarchy = 'date'
+
+@admin.register(IndustryGroupStrength)
+class IndustryGroupStrengthAdmin(admin.ModelAdmin):
+    list_display = ('industry_group', 'sector', 'date', 'rank', 'avg_rs', 'total_stocks')
+    search_fields = ('industry_group__name',)
+    date_hierarchy = 'date'
+
+@admin.register(RefreshRun)
+class RefreshRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'finished_at', 'stock_count')
+
+@admin.register(SavedScreen)
+class SavedScreenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'order_by', 'updated_at')
+    search_fields = ('name', 'user__username')
     list_filter = ('user',)
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StocksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stocks'
+
+    def ready(self):
+        # Connect the refresh_finished receivers.
+        from stocks.utils import industry_analysis, saved_screens, screener  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from stocks.models import PriceBar, Stock
+from stocks.utils.price_store import append_bars, rollup_bars
+from stocks.utils.providers import get_provider
+
+
+def backfill_stock(stock, period):
+    """Download ``period`` of daily bars for a stock and rebuild its weekly/monthly bars."""
+    try:
+        df = get_provider().history(stock.symbol, period=period, interval=PriceBar.DAILY)
+        if df.empty:
+            return 0
+        written = append_bars(stock, PriceBar.DAILY, df)
+        rollup_bars(stock)
+        return written
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Downloads long daily history so weekly and monthly bars can be rolled up locally'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', default='5y', help='How much daily history to keep (yfinance period)')
+        parser.add_argument('--symbols', nargs='+', help='Only backfill these symbols')
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent downloads')
+
+    def handle(self, *args, **options):
+        stocks = Stock.objects.all()
+        if options['symbols']:
+            stocks = stocks.filter(symbol__in=options['symbols'])
+        stocks = list(stocks)
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            written = sum(executor.map(lambda stock: backfill_stock(stock, options['period']), stocks))
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {written} daily bars for {len(stocks)} stocks'))
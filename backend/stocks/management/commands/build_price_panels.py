@@ -0,0 +1,25 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from stocks.models import PriceBar
+from stocks.utils.panel_store import build_panel
+
+
+class Command(BaseCommand):
+    help = 'Writes the stored bars of every stock to memory-mapped panel files for fast, shared reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', action='append', choices=[PriceBar.DAILY, PriceBar.WEEKLY, PriceBar.MONTHLY],
+                            help='Interval to build (repeatable, default: daily and weekly)')
+        parser.add_argument('--years', type=int, default=5, help='Years of bars to include')
+        parser.add_argument('--float32', action='store_true', help='Store float32 values to halve the file size')
+
+    def handle(self, *args, **options):
+        dtype = np.float32 if options['float32'] else np.float64
+        for interval in options['interval'] or [PriceBar.DAILY, PriceBar.WEEKLY]:
+            started = time.monotonic()
+            directory = build_panel(interval, years=options['years'], dtype=dtype)
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(f'Built {interval} panel in {directory} ({elapsed:.2f}s)'))
\ No newline at end of file
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.utils.populate_db import onboard_stocks, read_symbols_csv
+
+
+class Command(BaseCommand):
+    help = 'Adds or updates many stocks (name, sector, industry group) from a list of symbols or a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Symbols to onboard')
+        parser.add_argument('--csv', help='CSV file with a "symbol" column (or symbols in the first column)')
+        parser.add_argument('--column', default='symbol', help='Name of the symbol column in the CSV file')
+        parser.add_argument('--batch-size', type=int, default=500, help='Stocks per upsert batch')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent company info requests')
+
+    def handle(self, *args, **options):
+        symbols = list(options['symbols'])
+        if options['csv']:
+            symbols += read_symbols_csv(options['csv'], column=options['column'])
+        if not symbols:
+            raise CommandError('Give symbols or --csv')
+
+        started = time.monotonic()
+        written = onboard_stocks(symbols, batch_size=options['batch_size'], workers=options['workers'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Onboarded {written}/{len(set(symbols))} stocks in {elapsed:.1f}s'))
\ No newline at end of file
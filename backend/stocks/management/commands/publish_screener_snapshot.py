@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from stocks.utils.screener import publish_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Publishes the indicator columns of every stock as the shared screener snapshot (normally done after each refresh)'
+
+    def handle(self, *args, **options):
+        directory = publish_snapshot()
+        self.stdout.write(self.style.SUCCESS(f'Published screener snapshot in {directory}'))
\ No newline at end of file
@@ -0,0 +1,32 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from stocks.models import Stock
+from stocks.utils.indicator_engine import recompute_indicators
+
+
+class Command(BaseCommand):
+    help = 'Recomputes indicator columns for all stocks from stored bars in one vectorized pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sector', help='Only recompute stocks in this sector (by name)')
+        parser.add_argument('--float32', action='store_true', help='Use float32 panels to halve memory use')
+        parser.add_argument('--from-panels', action='store_true',
+                            help='Read bars from the panels written by build_price_panels instead of the database')
+
+    def handle(self, *args, **options):
+        # None is the whole universe, which receivers of refresh_finished handle as such.
+        stocks = None
+        if options['sector']:
+            stocks = Stock.objects.filter(sector__name=options['sector'])
+
+        started = time.monotonic()
+        dtype = np.float32 if options['float32'] else np.float64
+        updated, unchanged = recompute_indicators(stocks, dtype=dtype, use_panels=options['from_panels'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed indicators in {elapsed:.2f}s: {updated} stocks changed, {unchanged} unchanged'
+        ))
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.utils.industry_analysis import record_group_strength
+
+
+class Command(BaseCommand):
+    help = 'Stores the current sector and industry group strength (normally done at the end of each refresh)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Market date to store the rows under (YYYY-MM-DD, default: current)')
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['date']:
+            try:
+                as_of = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+        written = record_group_strength(as_of)
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} sector and industry group strength rows'))
\ No newline at end of file
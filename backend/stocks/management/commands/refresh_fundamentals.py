@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from stocks.utils.fundamentals import refresh_stale_fundamentals, store_info
+from stocks.utils.providers import get_provider
+
+
+class Command(BaseCommand):
+    help = 'Re-fetches cached company info (name, sector, industry) that is older than the TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', nargs='+', help='Re-fetch these symbols now, whatever their age')
+        parser.add_argument('--limit', type=int, help='Refresh at most this many stale symbols')
+
+    def handle(self, *args, **options):
+        if options['symbols']:
+            provider = get_provider()
+            for symbol in options['symbols']:
+                info = store_info(symbol, provider.info(symbol))
+                self.stdout.write(f'{symbol}: {info.get("longName", "?")} ({info.get("sector", "?")})')
+            return
+
+        refreshed = refresh_stale_fundamentals(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed fundamentals for {refreshed} symbols'))
\ No newline at end of file
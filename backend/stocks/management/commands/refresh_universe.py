@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.models import Stock
+from stocks.utils.async_pipeline import refresh_stocks_async
+from stocks.utils.refresh import refresh_stocks
+
+
+class Command(BaseCommand):
+    help = 'Refreshes prices and indicators for all stocks, or a filtered subset, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', nargs='+', help='Only refresh these symbols')
+        parser.add_argument('--sector', help='Only refresh stocks in this sector (by name)')
+        parser.add_argument('--tag', action='append', help='Only refresh stocks with this tag (repeatable)')
+        parser.add_argument('--list', dest='stock_list', help='Only refresh stocks in stock lists with this name')
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent workers')
+        parser.add_argument('--processes', action='store_true', help='Use worker processes instead of threads')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Stocks per worker task and write batch')
+        parser.add_argument('--retries', type=int, default=3, help='Retries per stock before giving up')
+        parser.add_argument('--backoff', type=float, default=1.0, help='Base delay in seconds between retries')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only fold new daily bars into the running indicator state')
+        parser.add_argument('--async', dest='use_async', action='store_true',
+                            help='Use the asyncio fetch/compute/write pipeline')
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Upstream requests in flight with --async')
+
+    def handle(self, *args, **options):
+        stocks = Stock.objects.all()
+        if options['symbols']:
+            stocks = stocks.filter(symbol__in=options['symbols'])
+        if options['sector']:
+            stocks = stocks.filter(sector__name=options['sector'])
+        if options['tag']:
+            stocks = stocks.filter(tags__name__in=options['tag'])
+        if options['stock_list']:
+            stocks = stocks.filter(in_lists__name=options['stock_list'])
+        symbols = list(stocks.order_by('symbol').values_list('symbol', flat=True).distinct())
+        whole_universe = not any(options[name] for name in ('symbols', 'sector', 'tag', 'stock_list'))
+
+        if options['use_async']:
+            if options['incremental'] or options['processes']:
+                raise CommandError('--async cannot be combined with --incremental or --processes')
+            self.stdout.write(f'Refreshing {len(symbols)} stocks with {options["concurrency"]} requests in flight')
+            summary = refresh_stocks_async(
+                symbols,
+                concurrency=options['concurrency'],
+                batch_size=options['chunk_size'],
+                retries=options['retries'],
+                backoff=options['backoff'],
+                whole_universe=whole_universe,
+            )
+        else:
+            self.stdout.write(f'Refreshing {len(symbols)} stocks with {options["workers"]} workers')
+            summary = refresh_stocks(
+                symbols,
+                workers=options['workers'],
+                use_processes=options['processes'],
+                retries=options['retries'],
+                backoff=options['backoff'],
+                incremental=options['incremental'],
+                chunk_size=options['chunk_size'],
+                whole_universe=whole_universe,
+            )
+
+        self.stdout.write(
+            f'Refreshed {summary.succeeded}/{summary.total} stocks in {summary.elapsed:.1f}s '
+            f'({summary.throughput:.1f} stocks/s, {summary.skipped} unchanged)'
+        )
+        for symbol, error in sorted(summary.failures.items()):
+            self.stdout.write(self.style.ERROR(f'  {symbol}: {error}'))
+        if not summary.failures:
+            self.stdout.write(self.style.SUCCESS('No failures'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from stocks.utils.scheduler import RefreshScheduler, is_market_open, plan_refresh
+
+
+class Command(BaseCommand):
+    help = 'Runs the refresh scheduler, refreshing watched stocks most often and nothing off-hours unless stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tick', type=int, default=60, help='Seconds between scheduling runs')
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent refresh workers')
+        parser.add_argument('--once', action='store_true', help='Run one scheduling pass and exit')
+        parser.add_argument('--dry-run', action='store_true', help='Only print what is due now')
+
+    def handle(self, *args, **options):
+        scheduler = RefreshScheduler(tick=options['tick'], workers=options['workers'])
+
+        if options['dry_run']:
+            symbols = plan_refresh(config=scheduler.config)
+            state = 'open' if is_market_open(timezone.now()) else 'closed'
+            self.stdout.write(f'Market {state}; {len(symbols)} stocks due: {" ".join(symbols)}')
+            return
+
+        if options['once']:
+            summary = scheduler.run_once()
+            if summary is None:
+                self.stdout.write('Nothing due')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Refreshed {summary.succeeded}/{summary.total} stocks'))
+            return
+
+        self.stdout.write(f'Scheduling refreshes every {options["tick"]}s (Ctrl+C to stop)')
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Scheduler stopped')
\ No newline at end of file
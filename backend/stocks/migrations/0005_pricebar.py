@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0004_industrygroup_stock_industry_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.CharField(choices=[('1d', 'Daily'), ('1wk', 'Weekly')], default='1d', max_length=3)),
+                ('date', models.DateField()),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('volume', models.BigIntegerField(default=0)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_bars', to='stocks.stock')),
+            ],
+            options={
+                'unique_together': {('stock', 'interval', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0005_pricebar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_date', models.DateField()),
+                ('state', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_state', to='stocks.stock')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0006_indicatorstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pricebar',
+            name='interval',
+            field=models.CharField(choices=[('1d', 'Daily'), ('1wk', 'Weekly'), ('1mo', 'Monthly')], default='1d', max_length=3),
+        ),
+    ]
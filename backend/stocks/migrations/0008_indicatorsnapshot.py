@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:07
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0007_alter_pricebar_interval'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('current_price', models.FloatField(blank=True, null=True)),
+                ('SMA_50', models.FloatField(blank=True, null=True)),
+                ('SMA_200', models.FloatField(blank=True, null=True)),
+                ('RSI_14', models.FloatField(blank=True, null=True)),
+                ('WMA_30_week', models.FloatField(blank=True, null=True)),
+                ('SMA_50_week', models.FloatField(blank=True, null=True)),
+                ('SMA_200_week', models.FloatField(blank=True, null=True)),
+                ('RS_SP500', models.FloatField(blank=True, null=True)),
+                ('new_high', models.BooleanField(default=False)),
+                ('new_low', models.BooleanField(default=False)),
+                ('volume_spike', models.BooleanField(default=False)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='stocks.stock')),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.BrinIndex(fields=['date'], name='snapshot_date_brin')],
+                'constraints': [models.UniqueConstraint(fields=('stock', 'date'), name='unique_snapshot_per_stock_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0008_indicatorsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockFundamentals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20, unique=True)),
+                ('long_name', models.CharField(blank=True, max_length=200)),
+                ('sector', models.CharField(blank=True, max_length=100)),
+                ('industry', models.CharField(blank=True, max_length=100)),
+                ('fetched_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'stock fundamentals',
+            },
+        ),
+    ]
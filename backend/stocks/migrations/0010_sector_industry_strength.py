@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0009_stockfundamentals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndustryGroupStrength',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('avg_rs', models.FloatField(blank=True, null=True)),
+                ('count_above_sma50', models.IntegerField(default=0)),
+                ('count_above_sma200', models.IntegerField(default=0)),
+                ('total_stocks', models.IntegerField(default=0)),
+                ('industry_group', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='strength', to='stocks.industrygroup')),
+                ('sector', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='industry_strength', to='stocks.sector')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'industry_group'], name='group_strength_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SectorStrength',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('avg_rs', models.FloatField(blank=True, null=True)),
+                ('count_above_sma50', models.IntegerField(default=0)),
+                ('count_above_sma200', models.IntegerField(default=0)),
+                ('total_stocks', models.IntegerField(default=0)),
+                ('sector', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='strength', to='stocks.sector')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'sector'], name='sector_strength_date')],
+            },
+        ),
+    ]
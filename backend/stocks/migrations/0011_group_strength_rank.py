@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:15
+
+from django.db import migrations, models
+
+
+def rank_existing_rows(apps, schema_editor):
+    for model_name in ("SectorStrength", "IndustryGroupStrength"):
+        model = apps.get_model("stocks", model_name)
+        rows_by_date = {}
+        for row in model.objects.only("id", "date", "avg_rs"):
+            rows_by_date.setdefault(row.date, []).append(row)
+        for rows in rows_by_date.values():
+            rows.sort(key=lambda row: (row.avg_rs is None, -(row.avg_rs or 0), row.id))
+            for rank, row in enumerate(rows, 1):
+                row.rank = rank
+            model.objects.bulk_update(rows, ["rank"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0010_sector_industry_strength'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='industrygroupstrength',
+            name='rank',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sectorstrength',
+            name='rank',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(rank_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0011_group_strength_rank'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('finished_at', models.DateTimeField(auto_now_add=True)),
+                ('stock_count', models.IntegerField(blank=True, help_text='Stocks refreshed, empty for the whole universe', null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedScreen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('definition', models.JSONField()),
+                ('order_by', models.CharField(blank=True, default='', max_length=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['RS_SP500'], name='stock_rs_sp500'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['RSI_14'], name='stock_rsi_14'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('new_high', True)), fields=['new_high'], name='stock_new_high'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('volume_spike', True)), fields=['volume_spike'], name='stock_volume_spike'),
+        ),
+        migrations.AddField(
+            model_name='savedscreen',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_screens', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='savedscreen',
+            unique_together={('user', 'name')},
+        ),
+    ]
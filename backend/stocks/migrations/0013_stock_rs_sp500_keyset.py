@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0012_saved_screens'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stock',
+            name='stock_rs_sp500',
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(models.OrderBy(models.F('RS_SP500'), descending=True, nulls_last=True), models.F('id'), name='stock_rs_sp500'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_updated_at(apps, schema_editor):
+    # Until now the scheduler went by updated_at; start from it so existing stocks are not all due at once.
+    Stock = apps.get_model("stocks", "Stock")
+    Stock.objects.update(refreshed_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0013_stock_rs_sp500_keyset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='refreshed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0014_stock_refreshed_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='industrygroupstrength',
+            name='group_strength_date',
+        ),
+        migrations.RemoveIndex(
+            model_name='sectorstrength',
+            name='sector_strength_date',
+        ),
+        migrations.AddConstraint(
+            model_name='industrygroupstrength',
+            constraint=models.UniqueConstraint(fields=('date', 'industry_group', 'sector'), name='unique_group_strength_per_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='sectorstrength',
+            constraint=models.UniqueConstraint(fields=('date', 'sector'), name='unique_sector_strength_per_date'),
+        ),
+    ]
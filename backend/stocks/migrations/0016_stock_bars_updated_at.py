@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0015_group_strength_unique_per_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='bars_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
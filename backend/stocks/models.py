@@ -1,5 +1,14 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import BrinIndex
+
+# Indicator columns the refresh computes, kept on Stock and in IndicatorSnapshot.
+INDICATOR_FIELDS = [
+    "current_price", "SMA_50", "SMA_200", "RSI_14",
+    "WMA_30_week", "SMA_50_week", "SMA_200_week", "RS_SP500",
+    "new_high", "new_low", "volume_spike",
+]
 
 
 class Sector(models.Model):
@@ -27,6 +36,10 @@ class Stock(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Last time a refresh processed the stock, whether or not any of its values changed.
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    # Last time any of the stock's price bars were written; panels built before it are stale.
+    bars_updated_at = models.DateTimeField(null=True, blank=True)
     exposed_to_sectors = models.ManyToManyField(Sector, related_name='exposed_to_sectors')
 
     current_price = models.FloatField(null=True, blank=True)
@@ -44,10 +57,182 @@ class Stock(models.Model):
     new_low = models.BooleanField(default=False)
     volume_spike = models.BooleanField(default=False)
 
+    class Meta:
+        # The columns screens filter on most; the flags only ever select the few stocks that have them set.
+        # stock_rs_sp500 is also the (strongest first, id) order stock connections page through.
+        indexes = [
+            models.Index(F("RS_SP500").desc(nulls_last=True), F("id"), name="stock_rs_sp500"),
+            models.Index(fields=["RSI_14"], name="stock_rsi_14"),
+            models.Index(fields=["new_high"], name="stock_new_high", condition=models.Q(new_high=True)),
+            models.Index(fields=["volume_spike"], name="stock_volume_spike", condition=models.Q(volume_spike=True)),
+        ]
+
     def __str__(self):
         return f"{self.symbol} - {self.name}"
 
 
+class StockFundamentals(models.Model):
+    """
+    Cached company info (``Ticker.info``) for a symbol.
+
+    Keyed by symbol rather than by stock so onboarding can look it up before
+    the stock exists. Refreshes reuse it regardless of age; rows older than
+    ``PRICE_DATA["FUNDAMENTALS_TTL_DAYS"]`` are re-fetched by ``refresh_fundamentals``.
+    """
+    symbol = models.CharField(max_length=20, unique=True)
+    long_name = models.CharField(max_length=200, blank=True)
+    sector = models.CharField(max_length=100, blank=True)
+    industry = models.CharField(max_length=100, blank=True)
+    fetched_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = "stock fundamentals"
+
+    def __str__(self):
+        return f"{self.symbol} fundamentals ({self.fetched_at:%Y-%m-%d})"
+
+    def as_info(self):
+        """The cached values under the same keys ``Ticker.info`` uses, leaving out empty ones."""
+        info = {"longName": self.long_name, "sector": self.sector, "industry": self.industry}
+        return {key: value for key, value in info.items() if value}
+
+
+class PriceBar(models.Model):
+    """Stored OHLCV bar so refreshes only need to fetch what is newer than the last one."""
+    DAILY = "1d"
+    WEEKLY = "1wk"
+    MONTHLY = "1mo"
+    INTERVAL_CHOICES = [
+        (DAILY, "Daily"),
+        (WEEKLY, "Weekly"),
+        (MONTHLY, "Monthly"),
+    ]
+
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="price_bars")
+    interval = models.CharField(max_length=3, choices=INTERVAL_CHOICES, default=DAILY)
+    date = models.DateField()
+
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('stock', 'interval', 'date')
+
+    def __str__(self):
+        return f"{self.stock.symbol} {self.interval} {self.date}"
+
+
+class IndicatorState(models.Model):
+    """Running window state that lets a new daily bar update a stock's indicators in constant time."""
+    stock = models.OneToOneField(Stock, on_delete=models.CASCADE, related_name="indicator_state")
+    last_date = models.DateField()
+    state = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.stock.symbol} state as of {self.last_date}"
+
+
+class IndicatorSnapshot(models.Model):
+    """
+    A stock's indicator values as of one market date, kept so past screens can be replayed.
+
+    Rows are only ever added (a refresh later the same day overwrites that day's
+    row). The BRIN index keeps date-range scans cheap on an append-only table of
+    tens of millions of rows; the unique constraint doubles as the per-stock index.
+    """
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="snapshots")
+    date = models.DateField()
+
+    current_price = models.FloatField(null=True, blank=True)
+    SMA_50 = models.FloatField(null=True, blank=True)
+    SMA_200 = models.FloatField(null=True, blank=True)
+    RSI_14 = models.FloatField(null=True, blank=True)
+
+    WMA_30_week = models.FloatField(null=True, blank=True)
+    SMA_50_week = models.FloatField(null=True, blank=True)
+    SMA_200_week = models.FloatField(null=True, blank=True)
+
+    RS_SP500 = models.FloatField(null=True, blank=True)
+
+    new_high = models.BooleanField(default=False)
+    new_low = models.BooleanField(default=False)
+    volume_spike = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["stock", "date"], name="unique_snapshot_per_stock_date"),
+        ]
+        indexes = [
+            BrinIndex(fields=["date"], name="snapshot_date_brin"),
+        ]
+
+    def __str__(self):
+        return f"{self.stock.symbol} as of {self.date}"
+
+
+class SectorStrength(models.Model):
+    """
+    A sector's aggregate strength on one market date, recomputed at the end of
+    each refresh so reads cost one row per sector instead of a scan of every stock.
+    Rows are kept, so the stored ranks double as the rotation history.
+    """
+    sector = models.ForeignKey(Sector, on_delete=models.CASCADE, null=True, related_name="strength")
+    date = models.DateField()
+    avg_rs = models.FloatField(null=True, blank=True)
+    count_above_sma50 = models.IntegerField(default=0)
+    count_above_sma200 = models.IntegerField(default=0)
+    total_stocks = models.IntegerField(default=0)
+    # Position by avg_rs among all rows of the same date, 1 = strongest.
+    rank = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "sector"], name="unique_sector_strength_per_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.sector} strength as of {self.date}"
+
+
+class IndustryGroupStrength(models.Model):
+    """An industry group's aggregate strength on one market date, split by the sector of its stocks."""
+    industry_group = models.ForeignKey(IndustryGroup, on_delete=models.CASCADE, null=True, related_name="strength")
+    sector = models.ForeignKey(Sector, on_delete=models.CASCADE, null=True, related_name="industry_strength")
+    date = models.DateField()
+    avg_rs = models.FloatField(null=True, blank=True)
+    count_above_sma50 = models.IntegerField(default=0)
+    count_above_sma200 = models.IntegerField(default=0)
+    total_stocks = models.IntegerField(default=0)
+    # Position by avg_rs among all rows of the same date, 1 = strongest.
+    rank = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "industry_group", "sector"], name="unique_group_strength_per_date"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.industry_group} strength as of {self.date}"
+
+
+class RefreshRun(models.Model):
+    """
+    One finished refresh run. The latest row's id is the refresh generation
+    every process agrees on, e.g. for caches that are valid until the next refresh.
+    """
+    finished_at = models.DateTimeField(auto_now_add=True)
+    stock_count = models.IntegerField(null=True, blank=True, help_text="Stocks refreshed, empty for the whole universe")
+
+    def __str__(self):
+        return f"Refresh finished at {self.finished_at}"
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -63,6 +248,25 @@ class StockList(models.Model):
     stocks = models.ManyToManyField(Stock, related_name='in_lists')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        unique_together = ('user', 'name')
+
+    def __str__(self):
+        return f"{self.user.username}'s {self.name}"
+
+
+class SavedScreen(models.Model):
+    """
+    A user's named screen: a predicate tree over the indicator columns of Stock
+    (see ``stocks.utils.saved_screens``), optionally ordered by one of them.
+    """
+    name = models.CharField(max_length=100)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_screens')
+    definition = models.JSONField()
+    order_by = models.CharField(max_length=30, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         unique_together = ('user', 'name')
 
@@ -1,13 +1,24 @@
 import graphene
-from graphene_django import DjangoObjectType
+from django.core.exceptions import ValidationError
+from django.db.models import OuterRef, Subquery
+from graphene_django import DjangoConnectionField, DjangoObjectType
 from graphql import GraphQLError
 
 import django_filters
 from graphene_django.filter import DjangoFilterConnectionField
-from .models import Stock, Sector, Tag, StockList
+from stocktracker.dataloaders import BatchedConnectionField, batched
+from stocktracker.optimizer import OptimizedConnectionField, optimize
+from stocktracker.pagination import KeysetConnectionField
+from .models import IndicatorSnapshot, SavedScreen, Stock, Sector, Tag, StockList
 from .utils.data_fetcher import fetch_stock_data
-from .utils.industry_analysis import rank_sectors, rank_industry_groups
-from .utils.stock_screener import find_breakout_stocks
+from .utils.industry_analysis import (
+    industry_group_rank_changes,
+    industry_group_strength,
+    sector_rank_changes,
+    sector_strength,
+)
+from .utils import saved_screens, screener
+from .utils.stock_screener import BREAKOUT, TRENDING, find_breakout_stocks, find_trending_stocks
 
 
 # Types
@@ -49,21 +60,155 @@ class StockFilter(django_filters.FilterSet):
         fields = []
 
 class StockNode(DjangoObjectType):
+    notes = BatchedConnectionField("analysis.schema.StockNoteNode")
+    evaluations = BatchedConnectionField("analysis.schema.StockEvaluationNode")
+
     class Meta:
         model = Stock
         filterset_class  = StockFilter
         interfaces = (graphene.relay.Node,)
 
+    resolve_sector = batched("sector")
+    resolve_tags = batched("tags")
+    resolve_in_lists = batched("in_lists")
+    resolve_notes = batched("notes")
+    resolve_evaluations = batched("evaluations")
+    resolve_images = batched("images")
+
+
+# Strongest first; the order of the stock_rs_sp500 index, so pages of stocks are index range scans.
+STOCK_ORDER = ("-RS_SP500", "id")
+
+
+class ScreenedConnectionField(OptimizedConnectionField):
+    """
+    A filter connection answered by the in-memory screener when it is enabled.
+
+    The filters are evaluated against the screener snapshot and only the page
+    the connection returns is loaded; filters the screener cannot evaluate
+    fall back to the database.
+    """
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        if not screener.enabled():
+            return super().resolve_queryset(connection, iterable, info, args, filtering_args, filterset_class)
+
+        queryset = optimize(DjangoConnectionField.resolve_queryset(connection, iterable, info, args), info)
+        data = {name: value for name, value in args.items() if name in filtering_args}
+        filterset = filterset_class(data=data, queryset=queryset, request=info.context)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.form.errors.as_json())
+        try:
+            return screener.ScreenResult(screener.screen(screener.filterset_q(filterset)), queryset)
+        except screener.UnsupportedScreen:
+            return filterset.qs
+
+
+class StockSnapshotFilter(django_filters.FilterSet):
+    """StockFilter's filters, applied to the indicator values a stock had on a past date."""
+    symbol_contains = django_filters.CharFilter(field_name='stock__symbol', lookup_expr='icontains')
+    name_contains = django_filters.CharFilter(field_name='stock__name', lookup_expr='icontains')
+    sector = django_filters.ModelChoiceFilter(field_name='stock__sector', queryset=Sector.objects.all())
+    tag = django_filters.ModelMultipleChoiceFilter(
+        field_name='stock__tags__name',
+        to_field_name='name',
+        queryset=Tag.objects.all()
+    )
+    sma_50_above = django_filters.NumberFilter(field_name="SMA_50", lookup_expr="gt")
+    sma_50_below = django_filters.NumberFilter(field_name="SMA_50", lookup_expr="lt")
+    sma_200_above = django_filters.NumberFilter(field_name="SMA_200", lookup_expr="gt")
+    sma_200_below = django_filters.NumberFilter(field_name="SMA_200", lookup_expr="lt")
+
+    sma_50_week_above = django_filters.NumberFilter(field_name="SMA_50_week", lookup_expr="gt")
+    sma_200_week_above = django_filters.NumberFilter(field_name="SMA_200_week", lookup_expr="gt")
+    wma_30_week_above = django_filters.NumberFilter(field_name="WMA_30_week", lookup_expr="gt")
+
+    rsi_above = django_filters.NumberFilter(field_name="RSI_14", lookup_expr="gt")
+    rsi_below = django_filters.NumberFilter(field_name="RSI_14", lookup_expr="lt")
+
+    rs_sp500_above = django_filters.NumberFilter(field_name="RS_SP500", lookup_expr="gt")
+    rs_sp500_below = django_filters.NumberFilter(field_name="RS_SP500", lookup_expr="lt")
+
+    new_high = django_filters.BooleanFilter(field_name="new_high")
+    new_low = django_filters.BooleanFilter(field_name="new_low")
+    volume_spike = django_filters.BooleanFilter(field_name="volume_spike")
+
+    class Meta:
+        model = IndicatorSnapshot
+        fields = []
+
+
+class StockSnapshotNode(DjangoObjectType):
+    """
+    A stock with the indicator values it had on ``date``.
+
+    It has the fields of ``StockNode`` except the connections and timestamps
+    that are not values as of ``date`` (notes, evaluations, snapshots and when
+    the row was created, updated and refreshed); those are under ``stock``.
+    """
+    symbol = graphene.String()
+    name = graphene.String()
+    sector = graphene.Field(SectorType)
+    exposed_to_sectors = graphene.List(graphene.NonNull(SectorType), required=True)
+    tags = graphene.List(graphene.NonNull("stocks.schema.TagType"), required=True)
+    in_lists = graphene.List(graphene.NonNull("stocks.schema.StockListType"), required=True)
+    images = graphene.List(graphene.NonNull("analysis.schema.StockImageType"), required=True)
+
+    class Meta:
+        model = IndicatorSnapshot
+        filterset_class = StockSnapshotFilter
+        interfaces = (graphene.relay.Node,)
+
+    def resolve_symbol(self, info):
+        return self.stock.symbol
+
+    def resolve_name(self, info):
+        return self.stock.name
+
+    def resolve_sector(self, info):
+        return self.stock.sector
+
+    resolve_exposed_to_sectors = batched("stock__exposed_to_sectors")
+    resolve_tags = batched("stock__tags")
+    resolve_in_lists = batched("stock__in_lists")
+    resolve_images = batched("stock__images")
+
 
 class TagType(DjangoObjectType):
+    stocks = BatchedConnectionField(StockNode)
+
     class Meta:
         model = Tag
 
+    resolve_stocks = batched("stocks")
+
 
 class StockListType(DjangoObjectType):
+    stocks = BatchedConnectionField(StockNode)
+
     class Meta:
         model = StockList
 
+    resolve_stocks = batched("stocks")
+    resolve_user = batched("user")
+
+
+class SavedScreenType(DjangoObjectType):
+    # Paged in the screen's own order, then by id: one filtered index scan per page.
+    stocks = KeysetConnectionField(StockNode, order_by=lambda screen: (screen.order_by or "symbol", "id"))
+    stock_count = graphene.Int()
+
+    class Meta:
+        model = SavedScreen
+        fields = ("id", "name", "definition", "order_by", "created_at", "updated_at")
+
+    def resolve_stocks(self, info):
+        return optimize(saved_screens.screen_queryset(self), info)
+
+    def resolve_stock_count(self, info):
+        return len(saved_screens.screen_ids(self))
+
 
 # Stock Mutations
 class CreateStockMutation(graphene.Mutation):
@@ -378,12 +523,91 @@ class DeleteStockListMutation(graphene.Mutation):
             raise GraphQLError(f"Stock list with ID {id} does not exist or does not belong to you")
 
 
+def _validated_screen(definition, order_by):
+    try:
+        saved_screens.compile_screen(definition)
+        saved_screens.validate_order_by(order_by)
+    except saved_screens.InvalidScreen as e:
+        raise GraphQLError(f"Invalid screen: {e}")
+
+
+class CreateSavedScreenMutation(graphene.Mutation):
+    class Arguments:
+        name = graphene.String(required=True)
+        definition = graphene.JSONString(required=True)
+        order_by = graphene.String()
+
+    saved_screen = graphene.Field(SavedScreenType)
+
+    @classmethod
+    def mutate(cls, root, info, name, definition, order_by=""):
+        if not info.context.user.is_authenticated:
+            raise GraphQLError("You must be logged in to perform this action")
+
+        _validated_screen(definition, order_by)
+        saved_screen = SavedScreen.objects.create(
+            name=name, user=info.context.user, definition=definition, order_by=order_by or ""
+        )
+        return CreateSavedScreenMutation(saved_screen=saved_screen)
+
+
+class UpdateSavedScreenMutation(graphene.Mutation):
+    class Arguments:
+        id = graphene.ID(required=True)
+        name = graphene.String()
+        definition = graphene.JSONString()
+        order_by = graphene.String()
+
+    saved_screen = graphene.Field(SavedScreenType)
+
+    @classmethod
+    def mutate(cls, root, info, id, name=None, definition=None, order_by=None):
+        if not info.context.user.is_authenticated:
+            raise GraphQLError("You must be logged in to perform this action")
+
+        try:
+            saved_screen = SavedScreen.objects.get(pk=id, user=info.context.user)
+        except SavedScreen.DoesNotExist:
+            raise GraphQLError(f"Saved screen with ID {id} does not exist or does not belong to you")
+
+        if name:
+            saved_screen.name = name
+        if definition is not None:
+            saved_screen.definition = definition
+        if order_by is not None:
+            saved_screen.order_by = order_by
+        _validated_screen(saved_screen.definition, saved_screen.order_by)
+        saved_screen.save()
+
+        return UpdateSavedScreenMutation(saved_screen=saved_screen)
+
+
+class DeleteSavedScreenMutation(graphene.Mutation):
+    class Arguments:
+        id = graphene.ID(required=True)
+
+    success = graphene.Boolean()
+
+    @classmethod
+    def mutate(cls, root, info, id):
+        if not info.context.user.is_authenticated:
+            raise GraphQLError("You must be logged in to perform this action")
+
+        try:
+            saved_screen = SavedScreen.objects.get(pk=id, user=info.context.user)
+            saved_screen.delete()
+            return DeleteSavedScreenMutation(success=True)
+        except SavedScreen.DoesNotExist:
+            raise GraphQLError(f"Saved screen with ID {id} does not exist or does not belong to you")
+
+
 class SectorStrengthType(graphene.ObjectType):
     sector_name = graphene.String()
     avg_rs = graphene.Float()
     count_above_sma50 = graphene.Int()
     count_above_sma200 = graphene.Int()
     total_stocks = graphene.Int()
+    rank = graphene.Int()
 
 class IndustryStrengthType(graphene.ObjectType):
     industry_group_name = graphene.String()
@@ -392,60 +616,128 @@ class IndustryStrengthType(graphene.ObjectType):
     count_above_sma50 = graphene.Int()
     count_above_sma200 = graphene.Int()
     total_stocks = graphene.Int()
+    rank = graphene.Int()
+
+class RankChangeFields:
+    rank = graphene.Int()
+    previous_rank = graphene.Int()
+    rank_change = graphene.Int(description="Ranks climbed since previous_date; negative if the group fell")
+    avg_rs = graphene.Float()
+    previous_avg_rs = graphene.Float()
+    date = graphene.Date()
+    previous_date = graphene.Date()
+
+class SectorRankChangeType(RankChangeFields, graphene.ObjectType):
+    sector_name = graphene.String()
+
+class IndustryRankChangeType(RankChangeFields, graphene.ObjectType):
+    industry_group_name = graphene.String()
+    sector_name = graphene.String()
+
+RANK_CHANGE_ARGS = {
+    "days": graphene.Int(description="Compare with the ranks this many days earlier"),
+    "weeks": graphene.Int(description="Compare with the ranks this many weeks earlier"),
+    "date": graphene.Date(description="Compare as of this date instead of the latest"),
+    "min_change": graphene.Int(),
+    "max_change": graphene.Int(),
+    "limit": graphene.Int(),
+}
+
+def _rank_change_days(days, weeks):
+    if (days is None) == (weeks is None):
+        raise GraphQLError("Give exactly one of days or weeks")
+    days = days if days is not None else weeks * 7
+    if days <= 0:
+        raise GraphQLError("The comparison period must be positive")
+    return days
 
 
 class Query(graphene.ObjectType):
-    sector_strength = graphene.List(SectorStrengthType)
-    industry_group_strength = graphene.List(IndustryStrengthType)
+    sector_strength = graphene.List(SectorStrengthType, date=graphene.Date())
+    industry_group_strength = graphene.List(IndustryStrengthType, date=graphene.Date())
+
+    def resolve_sector_strength(self, info, date=None):
+        return sector_strength(date)
+
+    def resolve_industry_group_strength(self, info, date=None):
+        return industry_group_strength(date)
 
-    def resolve_sector_strength(self, info):
-        result = rank_sectors()
-        return result
+    sector_rank_changes = graphene.List(SectorRankChangeType, **RANK_CHANGE_ARGS)
+    industry_group_rank_changes = graphene.List(IndustryRankChangeType, **RANK_CHANGE_ARGS)
 
-    def resolve_industry_group_strength(self, info):
-        return rank_industry_groups()
+    def resolve_sector_rank_changes(self, info, days=None, weeks=None, date=None,
+                                    min_change=None, max_change=None, limit=None):
+        return sector_rank_changes(_rank_change_days(days, weeks), date, min_change, max_change, limit)
 
+    def resolve_industry_group_rank_changes(self, info, days=None, weeks=None, date=None,
+                                            min_change=None, max_change=None, limit=None):
+        return industry_group_rank_changes(_rank_change_days(days, weeks), date, min_change, max_change, limit)
 
-    all_stocks =  DjangoFilterConnectionField(StockNode, filterset_class=StockFilter)
-    trending_stocks = graphene.List(StockNode)
+
+    all_stocks =  ScreenedConnectionField(StockNode, filterset_class=StockFilter)
+    stocks_as_of = DjangoFilterConnectionField(
+        StockSnapshotNode,
+        filterset_class=StockSnapshotFilter,
+        date=graphene.Date(required=True),
+    )
+    trending_stocks = KeysetConnectionField(StockNode, order_by=STOCK_ORDER)
     stock = graphene.Field(StockNode, id=graphene.ID(), symbol=graphene.String())
-    breakout_stocks = graphene.List(StockNode)
+    breakout_stocks = KeysetConnectionField(StockNode, order_by=STOCK_ORDER)
 
-    all_sectors = graphene.List(SectorType)
+    all_sectors = KeysetConnectionField(SectorType, order_by=("name",))
     sector = graphene.Field(SectorType, id=graphene.ID())
 
-    all_tags = graphene.List(TagType)
+    all_tags = KeysetConnectionField(TagType, order_by=("name",))
     tag = graphene.Field(TagType, id=graphene.ID())
 
     my_stock_lists = graphene.List(StockListType)
     stock_list = graphene.Field(StockListType, id=graphene.ID())
 
-    stocks_filtered = DjangoFilterConnectionField(StockNode)
-    stocks_by_sector = graphene.List(
+    my_saved_screens = graphene.List(SavedScreenType)
+    saved_screen = graphene.Field(SavedScreenType, id=graphene.ID())
+
+    stocks_filtered = ScreenedConnectionField(StockNode)
+    stocks_by_sector = KeysetConnectionField(
         StockNode,
+        order_by=STOCK_ORDER,
         sector_id=graphene.ID(required=True)
     )
-    stocks_by_tags = graphene.List(
+    stocks_by_tags = KeysetConnectionField(
         StockNode,
+        order_by=STOCK_ORDER,
         tag_names=graphene.List(graphene.String, required=True)
     )
 
+    def resolve_stocks_as_of(self, info, date, **kwargs):
+        """Every stock with the values of its latest snapshot on or before ``date``."""
+        # One seek per stock on the (stock, date) unique index; stocks listed after ``date`` have none.
+        latest = IndicatorSnapshot.objects.filter(stock=OuterRef("pk"), date__lte=date).order_by("-date")
+        snapshot_ids = Stock.objects.annotate(snapshot_id=Subquery(latest.values("pk")[:1])).filter(
+            snapshot_id__isnull=False
+        ).values("snapshot_id")
+        return IndicatorSnapshot.objects.filter(pk__in=snapshot_ids).select_related(
+            "stock__sector"
+        ).order_by("stock__symbol")
+
     def resolve_breakout_stocks(self, info):
-        return find_breakout_stocks()
+        if screener.enabled():
+            snapshot = screener.get_snapshot()
+            return screener.ScreenResult(snapshot.screen(BREAKOUT, STOCK_ORDER[0]), snapshot=snapshot)
+        return optimize(find_breakout_stocks(), info)
 
 
     def resolve_trending_stocks(self, info):
         """Fetch stocks with strong trends (e.g., volume spikes or RSI over 60)."""
-        return Stock.objects.filter(volume_spike=True) | Stock.objects.filter(RSI_14__gt=60)
+        if screener.enabled():
+            snapshot = screener.get_snapshot()
+            return screener.ScreenResult(snapshot.screen(TRENDING, STOCK_ORDER[0]), snapshot=snapshot)
+        return optimize(find_trending_stocks(), info)
 
     def resolve_stocks_by_sector(self, info, sector_id):
-        try:
-            return Stock.objects.filter(sector_id=sector_id)
-        except:
-            return []
+        return optimize(Stock.objects.filter(sector_id=sector_id), info)
 
     def resolve_stocks_by_tags(self, info, tag_names):
-        return Stock.objects.filter(tags__name__in=tag_names).distinct()
+        return optimize(Stock.objects.filter(tags__name__in=tag_names).distinct(), info)
 
     def resolve_stock(self, info, id=None, symbol=None):
         if id:
@@ -455,13 +747,13 @@ class Query(graphene.ObjectType):
         return None
 
     def resolve_all_sectors(self, info):
-        return Sector.objects.all()
+        return optimize(Sector.objects.all(), info)
 
     def resolve_sector(self, info, id):
         return Sector.objects.get(pk=id)
 
     def resolve_all_tags(self, info):
-        return Tag.objects.all()
+        return optimize(Tag.objects.all(), info)
 
     def resolve_tag(self, info, id):
         return Tag.objects.get(pk=id)
@@ -476,6 +768,16 @@ class Query(graphene.ObjectType):
             raise GraphQLError("You must be logged in to view stock lists")
         return StockList.objects.get(pk=id, user=info.context.user)
 
+    def resolve_my_saved_screens(self, info):
+        if not info.context.user.is_authenticated:
+            return SavedScreen.objects.none()
+        return SavedScreen.objects.filter(user=info.context.user)
+
+    def resolve_saved_screen(self, info, id):
+        if not info.context.user.is_authenticated:
+            raise GraphQLError("You must be logged in to view saved screens")
+        return SavedScreen.objects.get(pk=id, user=info.context.user)
+
 
 class FetchStockMutation(graphene.Mutation):
     class Arguments:
@@ -504,4 +806,8 @@ class Mutation(graphene.ObjectType):
     update_stock_list = UpdateStockListMutation.Field()
     delete_stock_list = DeleteStockListMutation.Field()
 
+    create_saved_screen = CreateSavedScreenMutation.Field()
+    update_saved_screen = UpdateSavedScreenMutation.Field()
+    delete_saved_screen = DeleteSavedScreenMutation.Field()
+
     fetch_stock = FetchStockMutation.Field()
\ No newline at end of file
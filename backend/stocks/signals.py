@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent once a refresh run has written its indicator columns, with the ids of the
+# refreshed stocks as ``stock_ids`` (None when the whole universe was refreshed).
+refresh_finished = Signal()
\ No newline at end of file
@@ -1,3 +1,1083 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Q
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from analysis.models import StockNote
+from stocks.models import (
+    INDICATOR_FIELDS, IndicatorSnapshot, IndustryGroup, PriceBar, SavedScreen, Sector, SectorStrength, Stock,
+    StockFundamentals, StockList, Tag,
+)
+from stocks.signals import refresh_finished
+from stocks.utils.async_pipeline import RefreshPipeline, refresh_stocks_async
+from stocks.utils.benchmarks import clear_benchmark_cache, get_benchmark_close
+from stocks.utils.bulk_writer import IndicatorWriter
+from stocks.utils.fundamentals import (
+    cached_infos, fundamentals_ttl, get_info, refresh_stale_fundamentals, store_infos,
+)
+from stocks.utils.incremental import update_incrementally
+from stocks.utils.indicator_engine import compute_indicators, indicator_rows, recompute_indicators, right_align
+from stocks.utils.industry_analysis import industry_group_rank_changes, record_group_strength, sector_strength
+from stocks.utils.market_hours import is_market_open, last_market_close, market_date
+from stocks.utils.panel_store import PricePanel, build_panel, load_panel
+from stocks.utils.populate_db import onboard_stocks, read_symbols_csv
+from stocks.utils.price_store import append_bars, load_bars, resample_bars, rollup_bars, sync_bars
+from stocks.utils.providers import LocalFileProvider, build_provider
+from stocks.utils.refresh import RefreshSummary, refresh_stocks
+from stocks.utils import screener
+from stocks.utils.scheduler import RefreshScheduler, plan_refresh, schedule_config
+from stocks.utils.trend_analysis import compute_trends, fetch_stock_trends
+from stocktracker import documents, query_cost
+from stocktracker.schema import schema
+
+FRIDAY_EVENING = datetime(2026, 10, 16, 22, 0, tzinfo=dt_timezone.utc)
+SATURDAY = datetime(2026, 10, 17, 15, 0, tzinfo=dt_timezone.utc)
+MONDAY_MORNING = datetime(2026, 10, 19, 15, 0, tzinfo=dt_timezone.utc)
+
+VALUES = {"name": "AAA Corp", "current_price": 10.0, "SMA_50": 9.5, "RSI_14": 55.0}
+
+
+def execute(query, user=None, **variables):
+    request = RequestFactory().post("/graphql/")
+    request.user = user or AnonymousUser()
+    result = schema.execute(query, variable_values=variables, context_value=request)
+    if result.errors:
+        raise result.errors[0]
+    return result.data
+
+
+class SchedulerTests(TestCase):
+    def test_unchanged_stock_is_not_due_after_a_refresh(self):
+        Stock.objects.create(symbol="AAA", **VALUES)
+        self.assertEqual(plan_refresh(now=SATURDAY), ["AAA"])
+
+        with mock.patch("django.utils.timezone.now", return_value=FRIDAY_EVENING):
+            with IndicatorWriter() as writer:
+                writer.add("AAA", dict(VALUES))
+        self.assertEqual((writer.written, writer.skipped), (0, 1))
+
+        self.assertEqual(plan_refresh(now=SATURDAY), [])
+
+    def test_watched_stocks_come_first_while_the_market_is_open(self):
+        refreshed = {"WATCH": 20 * 60, "RECENT": 20 * 60, "OLD": 5 * 60 * 60, "NEW": None}
+        for symbol, age in refreshed.items():
+            Stock.objects.create(
+                symbol=symbol, name=symbol, refreshed_at=None if age is None else MONDAY_MORNING - timedelta(seconds=age)
+            )
+        StockList.objects.create(user=User.objects.create_user("watcher"), name="watch").stocks.add(
+            Stock.objects.get(symbol="WATCH")
+        )
+
+        self.assertTrue(is_market_open(MONDAY_MORNING))
+        self.assertEqual(plan_refresh(now=MONDAY_MORNING), ["WATCH", "NEW", "OLD"])
+        config = {**schedule_config(), "MAX_STOCKS_PER_RUN": 2}
+        self.assertEqual(plan_refresh(now=MONDAY_MORNING, config=config), ["WATCH", "NEW"])
+        self.assertEqual(plan_refresh(now=MONDAY_MORNING, exclude=["NEW"]), ["WATCH", "OLD"])
+
+    def test_market_hours(self):
+        self.assertFalse(is_market_open(SATURDAY))
+        self.assertEqual(last_market_close(SATURDAY), datetime(2026, 10, 16, 20, 0, tzinfo=dt_timezone.utc))
+        # Before Monday's open the current bars are still Friday's.
+        self.assertEqual(market_date(MONDAY_MORNING - timedelta(hours=3)), date(2026, 10, 16))
+        self.assertEqual(market_date(MONDAY_MORNING), date(2026, 10, 19))
+
+    def test_failed_stocks_wait_before_being_retried(self):
+        for symbol in ("AAA", "BBB"):
+            Stock.objects.create(symbol=symbol, name=symbol)
+        summary = RefreshSummary(2)
+        summary.failures = {"BBB": "ValueError: no data"}
+        scheduler = RefreshScheduler()
+        with mock.patch("stocks.utils.scheduler.refresh_stocks", return_value=summary) as refresh:
+            with self.assertLogs("stocks.utils.scheduler"):
+                scheduler.run_once(now=MONDAY_MORNING)
+                scheduler.run_once(now=MONDAY_MORNING)
+        self.assertEqual([c.args[0] for c in refresh.call_args_list], [["AAA", "BBB"], ["AAA"]])
+
+
+class RefreshStocksTests(TestCase):
+    def setUp(self):
+        self.symbols = ["AAA", "BBB", "CCC", "DDD", "EEE", "FFF"]
+        for symbol in self.symbols:
+            Stock.objects.create(symbol=symbol, name=symbol)
+        self.running = self.most_running = 0
+        self.attempts = {}
+        self.lock = threading.Lock()
+        receiver = mock.Mock()
+        refresh_finished.connect(receiver)
+        self.addCleanup(refresh_finished.disconnect, receiver)
+        self.receiver = receiver
+
+    def fetch(self, symbol, incremental=False, writer=None):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+            self.attempts[symbol] = self.attempts.get(symbol, 0) + 1
+            attempt = self.attempts[symbol]
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        if symbol == "BBB" and attempt == 1:
+            raise ConnectionError("reset by peer")
+        if symbol == "EEE":
+            raise ValueError("no data")
+
+    def test_bounded_concurrency_and_retries(self):
+        with mock.patch("stocks.utils.refresh.fetch_stock_data", side_effect=self.fetch):
+            with self.assertLogs("stocks.utils.refresh") as logs:
+                summary = refresh_stocks(self.symbols, workers=2, retries=2, backoff=0, chunk_size=1)
+
+        self.assertEqual(self.most_running, 2)
+        self.assertEqual(self.attempts["BBB"], 2)
+        self.assertEqual(self.attempts["EEE"], 3)
+        self.assertEqual(summary.failures, {"EEE": "ValueError: no data"})
+        self.assertEqual(summary.succeeded, 5)
+        self.assertIn("ERROR:stocks.utils.refresh:Giving up on EEE: ValueError: no data", logs.output)
+        refreshed = Stock.objects.exclude(symbol="EEE").values_list("pk", flat=True)
+        self.assertCountEqual(self.receiver.call_args.kwargs["stock_ids"], refreshed)
+
+    def test_command_refreshes_a_filtered_subset_as_such(self):
+        with mock.patch("stocks.management.commands.refresh_universe.refresh_stocks") as refresh:
+            refresh.return_value = RefreshSummary(1)
+            call_command("refresh_universe", "--symbols", "BBB", stdout=io.StringIO())
+            call_command("refresh_universe", stdout=io.StringIO())
+        (subset, options), (universe, universe_options) = [(c.args[0], c.kwargs) for c in refresh.call_args_list]
+        self.assertEqual((subset, options["whole_universe"]), (["BBB"], False))
+        self.assertEqual((universe, universe_options["whole_universe"]), (self.symbols, True))
+
+
+class AsyncPipelineTests(TransactionTestCase):
+    class Provider(LocalFileProvider):
+        """Local bars, with the requests in flight counted and ``failures[symbol]`` failed requests first."""
+
+        def __init__(self, root, failures):
+            super().__init__(root)
+            self.failures = failures
+            self.running = self.most_running = self.downloaded = 0
+            self.lock = threading.Lock()
+
+        def history(self, symbol, period="1y", interval="1d", start=None):
+            with self.lock:
+                self.running += 1
+                self.most_running = max(self.most_running, self.running)
+            try:
+                time.sleep(0.01)
+                with self.lock:
+                    fail = self.failures.get(symbol, 0) > 0
+                    if fail:
+                        self.failures[symbol] -= 1
+                if fail:
+                    raise ConnectionError("reset by peer")
+                if symbol != "SPY":
+                    with self.lock:
+                        self.downloaded += 1
+                return super().history(symbol, period, interval, start)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+    def test_refresh_with_bounded_requests_and_retries(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        symbols = [f"S{i}" for i in range(8)]
+        provider = self.Provider(root.name, failures={"S3": 1, "S7": 3})
+        for seed, symbol in enumerate(symbols):
+            provider.write_history(symbol, price_history(300, seed=seed), file_format="csv")
+        provider.write_history("SPY", price_history(300, seed=99), file_format="csv")
+        with open(os.path.join(root.name, "info.json"), "w") as f:
+            json.dump({symbol: {"longName": f"{symbol} Corp"} for symbol in symbols}, f)
+
+        waiting = []
+        compute = RefreshPipeline._compute
+
+        def slow_compute(pipeline, *item):
+            # Downloaded stocks the compute stage has not finished yet.
+            waiting.append(provider.downloaded - len(waiting))
+            time.sleep(0.02)
+            return compute(pipeline, *item)
+
+        clear_benchmark_cache()
+        self.addCleanup(clear_benchmark_cache)
+        with mock.patch.object(RefreshPipeline, "_compute", slow_compute):
+            with self.assertLogs("stocks.utils.async_pipeline", "WARNING"):
+                summary = refresh_stocks_async(
+                    symbols, provider=provider, concurrency=2, compute_workers=1, queue_size=1,
+                    batch_size=3, retries=2, backoff=0,
+                )
+
+        self.assertLessEqual(provider.most_running, 2)
+        # One stock computing, one queued and one held by each request slot, however slow computing is.
+        self.assertLessEqual(max(waiting), 4)
+        self.assertEqual(summary.succeeded, 7)
+        self.assertEqual(summary.failures, {"S7": "ConnectionError: reset by peer"})
+        self.assertEqual(Stock.objects.filter(current_price__isnull=False).count(), 7)
+        self.assertEqual(Stock.objects.get(symbol="S3").name, "S3 Corp")
+
+
+class IndicatorWriterTests(TestCase):
+    def test_only_changed_and_new_stocks_are_written(self):
+        for symbol in ("AAA", "BBB"):
+            Stock.objects.create(symbol=symbol, **VALUES)
+        Stock.objects.update(updated_at=FRIDAY_EVENING)
+
+        with IndicatorWriter() as writer:
+            writer.add("AAA", dict(VALUES))
+            writer.add("BBB", {**VALUES, "RSI_14": 60.0})
+            writer.add("CCC", dict(VALUES, name="CCC Corp"))
+        self.assertEqual((writer.written, writer.skipped), (2, 1))
+
+        stocks = {stock.symbol: stock for stock in Stock.objects.all()}
+        self.assertEqual(stocks["AAA"].updated_at, FRIDAY_EVENING)
+        self.assertGreater(stocks["BBB"].updated_at, FRIDAY_EVENING)
+        self.assertEqual(stocks["BBB"].RSI_14, 60.0)
+        self.assertEqual(stocks["CCC"].name, "CCC Corp")
+        self.assertTrue(all(stock.refreshed_at for stock in stocks.values()))
+        self.assertEqual(IndicatorSnapshot.objects.count(), 3)
+
+    def test_batches_are_written_in_a_fixed_number_of_queries(self):
+        for i in range(4):
+            Stock.objects.create(symbol=f"S{i}", name=f"S{i}", current_price=1.0, SMA_50=2.0)
+        writer = IndicatorWriter(batch_size=4)
+        writer.add("S0", {"current_price": 5.0})
+        writer.add("S1", {"current_price": 6.0, "SMA_50": 3.0})
+        writer.add("S2", {"current_price": 7.0})
+        # Read the batch, upsert each set of columns, read and record its history and mark it
+        # refreshed, in a transaction (a savepoint pair inside the test's own).
+        with self.assertNumQueries(8):
+            writer.add("S3", {"current_price": 8.0})
+        self.assertEqual(writer.written, 4)
+
+        # A row only overwrites the columns it was given.
+        self.assertEqual(
+            list(Stock.objects.order_by("symbol").values_list("current_price", "SMA_50")),
+            [(5.0, 2.0), (6.0, 3.0), (7.0, 2.0), (8.0, 2.0)],
+        )
+
+
+def price_history(days, seed=5):
+    """A random walk of daily OHLCV bars ending on the last business day."""
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days, name="Date")
+    close = 50 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.02, days)))
+    return pd.DataFrame(
+        {"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": 1e6},
+        index=dates,
+    )
+
+
+class PriceStoreTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.provider = LocalFileProvider(root.name)
+        self.stock = Stock.objects.create(symbol="AAA", name="AAA")
+        self.history = price_history(300)
+
+    def test_only_bars_from_the_resume_point_are_downloaded(self):
+        self.provider.write_history("AAA", self.history.iloc[:-1], file_format="csv")
+        _, full = sync_bars(self.stock, self.provider)
+        self.assertTrue(full)
+        stored = len(load_bars(self.stock))
+
+        # The newest stored bar was taken mid-session and closed higher.
+        later = self.history.copy()
+        later.loc[later.index[-2], "Close"] += 1
+        self.provider.write_history("AAA", later, file_format="csv")
+        with mock.patch.object(self.provider, "history", wraps=self.provider.history) as history:
+            df, full = sync_bars(self.stock, self.provider)
+
+        self.assertFalse(full)
+        self.assertEqual(history.call_args.kwargs["start"], self.history.index[-3].date())
+        self.assertEqual(len(df), 3)
+        self.assertEqual(len(load_bars(self.stock)), stored + 1)
+        stored = load_bars(self.stock)
+        self.assertAlmostEqual(stored["Close"].iloc[-2], later["Close"].iloc[-2])
+
+    def test_weekly_and_monthly_bars_are_rolled_up_from_daily_ones(self):
+        self.provider.write_history("AAA", self.history, file_format="csv")
+        with mock.patch.object(self.provider, "history", wraps=self.provider.history) as history:
+            sync_bars(self.stock, self.provider)
+        self.assertEqual({call.kwargs["interval"] for call in history.call_args_list}, {PriceBar.DAILY})
+
+        daily = load_bars(self.stock)
+        weekly = load_bars(self.stock, PriceBar.WEEKLY)
+        self.assertTrue((weekly.index.dayofweek == 0).all())
+        week = daily[daily.index >= weekly.index[-1]]
+        self.assertEqual(
+            weekly.iloc[-1].tolist(),
+            [week["Open"].iloc[0], week["High"].max(), week["Low"].min(), week["Close"].iloc[-1], week["Volume"].sum()],
+        )
+        self.assertTrue((load_bars(self.stock, PriceBar.MONTHLY).index.day == 1).all())
+
+    def test_trends_from_stored_bars_match_a_fresh_download(self):
+        self.provider.write_history("AAA", self.history, file_format="csv")
+        stored = fetch_stock_trends("AAA", stock=self.stock, provider=self.provider)
+        downloaded = fetch_stock_trends("AAA", provider=self.provider)
+        self.assertEqual(stored.keys(), downloaded.keys())
+        for name, value in downloaded.items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(stored[name], value, places=6, msg=name)
+            else:
+                self.assertEqual(stored[name], value, msg=name)
+
+
+class ProviderTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        self.provider = LocalFileProvider(self.root)
+        self.history = price_history(300)
+        self.provider.write_history("AAA", self.history, file_format="csv")
+
+    def test_periods_count_back_from_the_newest_bar(self):
+        month = self.provider.history("AAA", period="1mo")
+        self.assertEqual(month.index[-1], self.history.index[-1])
+        self.assertGreaterEqual(month.index[0], self.history.index[-1] - pd.DateOffset(months=1))
+        self.assertEqual(len(self.provider.history("AAA", period="max")), 300)
+
+        since = self.history.index[-10].date()
+        self.assertEqual(len(self.provider.history("AAA", period="1mo", start=since)), 10)
+        self.assertTrue(self.provider.history("NONE").empty)
+
+    def test_provider_is_chosen_by_settings(self):
+        with open(os.path.join(self.root, "info.json"), "w") as f:
+            json.dump({"AAA": {"longName": "AAA Corp"}}, f)
+        provider = build_provider({"PROVIDER": "local", "LOCAL_ROOT": self.root, "RATE_LIMIT": 100})
+        self.assertIsInstance(provider, LocalFileProvider)
+        self.assertIsNotNone(provider.limiter)
+        self.assertEqual(provider.info("AAA"), {"longName": "AAA Corp"})
+        self.assertEqual(
+            type(build_provider({"PROVIDER": "stocks.utils.providers.LocalFileProvider", "LOCAL_ROOT": self.root})),
+            LocalFileProvider,
+        )
+
+
+class IndicatorEngineTests(SimpleTestCase):
+    def panel(self, stocks, days, seed):
+        history = [price_history(days, seed=seed + i) for i in range(stocks)]
+        fields = {
+            name.lower(): np.array([bars[name].to_numpy() for bars in history])
+            for name in ("Close", "High", "Low", "Volume")
+        }
+        return fields, history[0].index.to_numpy().astype("datetime64[D]")
+
+    def test_ragged_rows_match_a_right_aligned_panel(self):
+        daily, dates = self.panel(6, 300, seed=1)
+        weekly, weeks = self.panel(6, 120, seed=20)
+        gaps = [(1, slice(0, 40)), (2, slice(-3, None)), (3, slice(150, 152)), (4, slice(None))]
+        for fields in (daily, weekly):
+            for row, columns in gaps:
+                for values in fields.values():
+                    values[row, columns] = np.nan
+
+        ids = np.arange(6)
+        aligned = compute_indicators(
+            PricePanel(ids, dates, **{name: right_align(values) for name, values in daily.items()}),
+            PricePanel(ids, weeks, **{name: right_align(values) for name, values in weekly.items()}),
+            pd.Series([1.0, 1.01]),
+        )
+        ragged = compute_indicators(
+            PricePanel(ids, dates, **daily), PricePanel(ids, weeks, **weekly), pd.Series([1.0, 1.01])
+        )
+        for name, expected in aligned.items():
+            if name != "RS_SP500":
+                np.testing.assert_array_equal(ragged[name], expected, err_msg=name)
+
+
+    def test_panel_matches_per_ticker_trends(self):
+        histories = [price_history(300, seed=seed) for seed in range(4)]
+        benchmark = price_history(130, seed=99)
+        daily = PricePanel(np.arange(4), histories[0].index.to_numpy().astype("datetime64[D]"), **{
+            name.lower(): np.array([bars[name].to_numpy() for bars in histories])
+            for name in ("Close", "High", "Low", "Volume")
+        })
+        weeks = [resample_bars(bars, PriceBar.WEEKLY) for bars in histories]
+        weekly = PricePanel(np.arange(4), weeks[0].index.to_numpy().astype("datetime64[D]"), close=np.array(
+            [bars["Close"].to_numpy() for bars in weeks]
+        ))
+        rows = dict(indicator_rows(daily.stock_ids, compute_indicators(daily, weekly, benchmark["Close"])))
+
+        clear_benchmark_cache()
+        self.addCleanup(clear_benchmark_cache)
+        provider = BenchmarkTests.Provider(benchmark)
+        for row, (bars, week_bars) in enumerate(zip(histories, weeks)):
+            trends = compute_trends(bars.copy(), week_bars.copy(), provider=provider)
+            for name in INDICATOR_FIELDS:
+                with self.subTest(stock=row, field=name):
+                    if isinstance(trends[name], float):
+                        self.assertAlmostEqual(rows[row][name], trends[name], places=6)
+                    else:
+                        self.assertEqual(rows[row][name], trends[name])
+
+
+class PricePanelTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        panels = self.settings(PRICE_DATA={**settings.PRICE_DATA, "PANEL_ROOT": root.name})
+        panels.enable()
+        self.addCleanup(panels.disable)
+        self.stock = Stock.objects.create(symbol="AAA", name="AAA")
+        self.history = price_history(300)
+        append_bars(self.stock, PriceBar.DAILY, self.history.iloc[:-1])
+        rollup_bars(self.stock)
+        build_panel(PriceBar.DAILY)
+        build_panel(PriceBar.WEEKLY)
+
+    def recompute(self):
+        with mock.patch("stocks.utils.indicator_engine.get_benchmark_close", return_value=pd.Series([1.0, 1.01])):
+            recompute_indicators(use_panels=True)
+        self.stock.refresh_from_db()
+        return self.stock.current_price
+
+    def test_current_panel_is_read(self):
+        # Bars changed behind the panel's back, so reading them would show.
+        PriceBar.objects.filter(stock=self.stock).update(close=1.0)
+        self.assertEqual(self.recompute(), self.history["Close"].iloc[-2])
+        # Writing the recomputed values does not outdate the panel.
+        self.assertEqual(self.recompute(), self.history["Close"].iloc[-2])
+
+    def test_panel_older_than_the_bars_is_not_read(self):
+        self.recompute()
+        append_bars(self.stock, PriceBar.DAILY, self.history.iloc[-1:])
+        with self.assertLogs("stocks.utils.indicator_engine", "INFO"):
+            self.assertAlmostEqual(self.recompute(), self.history["Close"].iloc[-1])
+
+
+class IncrementalUpdateTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.provider = LocalFileProvider(root.name)
+        self.stock = Stock.objects.create(symbol="SPLT", name="Split Corp")
+
+    def vectorised(self):
+        stock_ids = np.array([self.stock.pk])
+        start = (pd.Timestamp.today() - pd.DateOffset(years=1)).date()
+        daily = load_panel(stock_ids, PriceBar.DAILY, start=start)
+        weekly = load_panel(stock_ids, PriceBar.WEEKLY, start=start)
+        return compute_indicators(daily, weekly, pd.Series([1.0, 1.01]))
+
+    def test_split_reseeds_the_running_state(self):
+        history = price_history(300)
+        self.provider.write_history("SPLT", history.iloc[:-1], file_format="csv")
+        update_incrementally(self.stock, provider=self.provider)
+
+        # A 2:1 split: the provider now serves the whole history at half the price.
+        adjusted = history.copy()
+        adjusted[["Open", "High", "Low", "Close"]] /= 2
+        self.provider.write_history("SPLT", adjusted, file_format="csv")
+        update_incrementally(self.stock, provider=self.provider)
+
+        self.stock.refresh_from_db()
+        expected = self.vectorised()
+        for field in ("current_price", "SMA_50", "SMA_200", "RSI_14"):
+            self.assertAlmostEqual(getattr(self.stock, field), expected[field][0], places=6, msg=field)
+        for field in ("new_high", "new_low"):
+            self.assertEqual(getattr(self.stock, field), expected[field][0], msg=field)
+
+    def test_reload_keeps_the_full_history(self):
+        history = price_history(1300)
+        self.provider.write_history("SPLT", history.iloc[:-1], file_format="csv")
+        update_incrementally(self.stock, provider=self.provider)
+        before = PriceBar.objects.filter(stock=self.stock, interval=PriceBar.WEEKLY).count()
+
+        adjusted = history.copy()
+        adjusted[["Open", "High", "Low", "Close"]] /= 2
+        self.provider.write_history("SPLT", adjusted, file_format="csv")
+        update_incrementally(self.stock, provider=self.provider)
+
+        self.assertGreater(PriceBar.objects.filter(stock=self.stock, interval=PriceBar.DAILY).count(), 1200)
+        self.assertGreaterEqual(PriceBar.objects.filter(stock=self.stock, interval=PriceBar.WEEKLY).count(), before)
+        self.assertGreater(before, 250)
+
+
+class StocksAsOfTests(TestCase):
+    QUERY = """
+        query ($date: Date!) {
+            stocksAsOf(date: $date) { edges { node { symbol date currentPrice tags { name } } } }
+        }
+    """
+
+    def test_each_stock_has_its_latest_snapshot(self):
+        current = Stock.objects.create(symbol="AAA", name="AAA")
+        current.tags.add(Tag.objects.create(name="growth"))
+        stale = Stock.objects.create(symbol="BBB", name="BBB")
+        listed_later = Stock.objects.create(symbol="CCC", name="CCC")
+        IndicatorSnapshot.objects.create(stock=current, date=date(2026, 10, 14), current_price=1.0)
+        IndicatorSnapshot.objects.create(stock=current, date=date(2026, 10, 16), current_price=2.0)
+        # A failed fetch: BBB has nothing newer than the week before.
+        IndicatorSnapshot.objects.create(stock=stale, date=date(2026, 10, 2), current_price=3.0)
+        IndicatorSnapshot.objects.create(stock=listed_later, date=date(2026, 10, 19), current_price=4.0)
+
+        data = execute(self.QUERY, date="2026-10-16")
+        self.assertEqual([edge["node"] for edge in data["stocksAsOf"]["edges"]], [
+            {"symbol": "AAA", "date": "2026-10-16", "currentPrice": 2.0, "tags": [{"name": "growth"}]},
+            {"symbol": "BBB", "date": "2026-10-02", "currentPrice": 3.0, "tags": []},
+        ])
+
+
+class FundamentalsTests(TestCase):
+    def setUp(self):
+        self.provider = mock.Mock()
+        self.provider.info.side_effect = lambda symbol: {"longName": f"{symbol} Corp", "sector": "Tech", "industry": "Chips"}
+
+    def test_info_is_fetched_once_per_symbol(self):
+        self.assertEqual(get_info("AAA", self.provider)["longName"], "AAA Corp")
+        self.assertEqual(get_info("AAA", self.provider)["sector"], "Tech")
+        self.assertEqual(self.provider.info.call_count, 1)
+
+        StockFundamentals.objects.update(fetched_at=FRIDAY_EVENING)
+        get_info("AAA", self.provider, max_age=timedelta(days=1))
+        self.assertEqual(self.provider.info.call_count, 2)
+
+    def test_only_expired_rows_are_refreshed(self):
+        store_infos({symbol: {"longName": symbol} for symbol in ("OLD", "BAD", "NEW")})
+        expired = timezone.now() - fundamentals_ttl() - timedelta(days=1)
+        StockFundamentals.objects.exclude(symbol="NEW").update(fetched_at=expired)
+        self.provider.info.side_effect = lambda symbol: {"longName": "Old Corp"} if symbol == "OLD" else 1 / 0
+
+        with self.assertLogs("stocks.utils.fundamentals", "WARNING"):
+            self.assertEqual(refresh_stale_fundamentals(provider=self.provider), 1)
+        self.assertCountEqual([c.args[0] for c in self.provider.info.call_args_list], ["OLD", "BAD"])
+        self.assertEqual(cached_infos(["OLD", "BAD", "NEW"], max_age=fundamentals_ttl()).keys(), {"OLD", "NEW"})
+        self.assertEqual(get_info("OLD")["longName"], "Old Corp")
+
+
+class OnboardingTests(TestCase):
+    def setUp(self):
+        self.provider = mock.Mock()
+        self.provider.info.side_effect = lambda symbol: {
+            "longName": f"{symbol} Corp",
+            "sector": "Tech" if symbol < "M" else "Energy",
+            "industry": "Chips" if symbol < "M" else "Oil",
+        }
+
+    def onboard(self, symbols):
+        with CaptureQueriesContext(connection) as queries, self.assertLogs("stocks.utils.populate_db"):
+            written = onboard_stocks(symbols, self.provider, batch_size=10, workers=2)
+        return written, len(queries)
+
+    def test_onboarding_costs_the_same_queries_for_any_number_of_symbols(self):
+        self.assertEqual(self.onboard(["aaa", "ZZZ", "AAA "])[0], 2)
+        few = self.onboard(["BBB", "YYY"])[1]
+        many = self.onboard([f"B{i:02d}" for i in range(5)] + [f"Y{i:02d}" for i in range(5)])[1]
+        self.assertEqual(many, few)
+
+        self.assertEqual(Stock.objects.count(), 14)
+        self.assertEqual(Sector.objects.count(), 2)
+        self.assertEqual(IndustryGroup.objects.count(), 2)
+        stock = Stock.objects.select_related("sector", "industry_group").get(symbol="ZZZ")
+        self.assertEqual((stock.name, stock.sector.name, stock.industry_group.name), ("ZZZ Corp", "Energy", "Oil"))
+
+    def test_cached_info_is_reused_and_rows_are_updated(self):
+        self.onboard(["AAA"])
+        StockFundamentals.objects.filter(symbol="AAA").update(long_name="Renamed")
+        self.onboard(["AAA"])
+
+        self.assertEqual(self.provider.info.call_count, 1)
+        self.assertEqual(Stock.objects.get(symbol="AAA").name, "Renamed")
+
+    def test_symbols_without_info_are_skipped(self):
+        self.provider.info.side_effect = lambda symbol: 1 / 0
+        with self.assertLogs("stocks.utils.populate_db", "WARNING"):
+            self.assertEqual(onboard_stocks(["AAA"], self.provider, workers=1), 0)
+        self.assertFalse(Stock.objects.exists())
+
+    def test_symbols_are_read_with_or_without_a_header(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with_header = os.path.join(directory.name, "with_header.csv")
+        without_header = os.path.join(directory.name, "without_header.csv")
+        with open(with_header, "w") as f:
+            f.write("name,Symbol\nApple,aapl\nBlank, \n")
+        with open(without_header, "w") as f:
+            f.write("MSFT,Microsoft\nnvda,Nvidia\n")
+
+        self.assertEqual(read_symbols_csv(with_header), ["AAPL"])
+        self.assertEqual(read_symbols_csv(without_header), ["MSFT", "NVDA"])
+
+
+class GroupStrengthTests(TestCase):
+    def setUp(self):
+        for name, rs in [("Tech", 1.5), ("Energy", 1.0), ("Utilities", 0.5)]:
+            sector = Sector.objects.create(name=name)
+            Stock.objects.create(symbol=name.upper(), name=name, sector=sector, RS_SP500=rs)
+
+    def refresh(self, *symbols, now=FRIDAY_EVENING):
+        stock_ids = list(Stock.objects.filter(symbol__in=symbols).values_list("pk", flat=True))
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            refresh_finished.send(sender=self.__class__, stock_ids=stock_ids)
+
+    def test_partial_refresh_keeps_every_group(self):
+        record_group_strength(date(2026, 10, 15))
+        Stock.objects.filter(symbol="UTILITIES").update(RS_SP500=2.0)
+        self.refresh("UTILITIES")
+
+        self.assertEqual(
+            [(row["sector_name"], row["rank"], row["total_stocks"]) for row in sector_strength()],
+            [("Utilities", 1, 1), ("Tech", 2, 1), ("Energy", 3, 1)],
+        )
+        self.assertEqual(SectorStrength.objects.filter(date=date(2026, 10, 16)).count(), 3)
+
+    def test_strength_is_read_from_the_recorded_rows(self):
+        query = "query ($date: Date) { sectorStrength(date: $date) { sectorName rank totalStocks } }"
+        self.assertEqual([row["sectorName"] for row in execute(query)["sectorStrength"]], ["Tech", "Energy", "Utilities"])
+        self.assertEqual(execute(query, date="2026-10-15")["sectorStrength"], [])
+
+        record_group_strength(date(2026, 10, 15))
+        Stock.objects.filter(symbol="UTILITIES").update(RS_SP500=2.0)
+        with self.assertNumQueries(2):
+            rows = list(sector_strength())
+        self.assertEqual([row["sector_name"] for row in rows], ["Tech", "Energy", "Utilities"])
+
+        record_group_strength(date(2026, 10, 16))
+        self.assertEqual(execute(query)["sectorStrength"][0], {"sectorName": "Utilities", "rank": 1, "totalStocks": 1})
+        self.assertEqual(execute(query, date="2026-10-15")["sectorStrength"][0]["sectorName"], "Tech")
+
+    def test_rank_changes_across_a_partial_day(self):
+        record_group_strength(date(2026, 10, 15))
+        self.refresh("UTILITIES")
+        data = execute("{ sectorRankChanges(days: 1) { sectorName rank previousRank rankChange } }")
+        self.assertEqual(data["sectorRankChanges"], [
+            {"sectorName": "Tech", "rank": 1, "previousRank": 1, "rankChange": 0},
+            {"sectorName": "Energy", "rank": 2, "previousRank": 2, "rankChange": 0},
+            {"sectorName": "Utilities", "rank": 3, "previousRank": 3, "rankChange": 0},
+        ])
+
+        Stock.objects.filter(symbol="ENERGY").update(RS_SP500=2.0)
+        self.refresh("ENERGY", now=FRIDAY_EVENING + timedelta(days=3))
+        data = execute("{ sectorRankChanges(days: 1, minChange: 1) { sectorName rankChange } }")
+        self.assertEqual(data["sectorRankChanges"], [{"sectorName": "Energy", "rankChange": 1}])
+
+
+    def test_industry_group_rank_changes_by_weeks(self):
+        for symbol, group in [("TECH", "Chips"), ("ENERGY", "Oil"), ("UTILITIES", "Power")]:
+            stock = Stock.objects.get(symbol=symbol)
+            stock.industry_group = IndustryGroup.objects.create(name=group, sector=stock.sector)
+            stock.save()
+        record_group_strength(date(2026, 10, 2))
+        Stock.objects.filter(symbol="UTILITIES").update(RS_SP500=2.0)
+        record_group_strength(date(2026, 10, 9))
+
+        query = """query ($weeks: Int, $days: Int) {
+            industryGroupRankChanges(weeks: $weeks, days: $days, maxChange: -1) {
+                industryGroupName sectorName rankChange previousDate
+            }
+        }"""
+        self.assertEqual(execute(query, weeks=1)["industryGroupRankChanges"], [
+            {"industryGroupName": "Chips", "sectorName": "Tech", "rankChange": -1, "previousDate": "2026-10-02"},
+            {"industryGroupName": "Oil", "sectorName": "Energy", "rankChange": -1, "previousDate": "2026-10-02"},
+        ])
+        self.assertEqual(industry_group_rank_changes(8), [])
+        with self.assertRaisesMessage(Exception, "Give exactly one of days or weeks"):
+            execute(query, weeks=1, days=7)
+
+
+class SavedScreenTests(TestCase):
+    QUERY = """
+        query ($id: ID!, $first: Int, $after: String, $last: Int, $before: String) {
+            savedScreen(id: $id) {
+                stockCount
+                stocks(first: $first, after: $after, last: $last, before: $before) {
+                    edges { node { symbol } }
+                    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+                }
+            }
+        }
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user("screener")
+        for symbol, rsi in [("AAA", 60), ("BBB", 75), ("CCC", 40), ("DDD", 75), ("EEE", 20)]:
+            Stock.objects.create(symbol=symbol, name=symbol, RSI_14=rsi)
+        self.screen = SavedScreen.objects.create(
+            user=self.user, name="strong", order_by="-RSI_14",
+            definition={"field": "RSI_14", "op": "gt", "value": 30},
+        )
+
+    def page(self, **args):
+        stocks = execute(self.QUERY, self.user, id=self.screen.pk, **args)["savedScreen"]["stocks"]
+        return [edge["node"]["symbol"] for edge in stocks["edges"]], stocks["pageInfo"]
+
+    def test_stocks_are_paged_in_the_screen_order(self):
+        first, info = self.page(first=2)
+        self.assertEqual(first, ["BBB", "DDD"])
+        self.assertTrue(info["hasNextPage"])
+
+        rest, info = self.page(first=2, after=info["endCursor"])
+        self.assertEqual(rest, ["AAA", "CCC"])
+        self.assertFalse(info["hasNextPage"])
+
+        back, _ = self.page(last=2, before=info["startCursor"])
+        self.assertEqual(back, first)
+
+    def test_null_only_compares_with_eq(self):
+        Stock.objects.create(symbol="FFF", name="FFF")
+        self.screen.definition = {"field": "RSI_14", "op": "eq", "value": None}
+        self.screen.save()
+        self.assertEqual(self.page(first=5)[0], ["FFF"])
+
+        create = """
+            mutation ($definition: JSONString!) {
+                createSavedScreen(name: "broken", definition: $definition) { savedScreen { id } }
+            }
+        """
+        for definition in [
+            {"field": "RSI_14", "op": "gt", "value": None},
+            {"field": "RSI_14", "op": "between", "value": [None, 70]},
+            {"field": "RSI_14", "op": "in", "value": [60, None]},
+        ]:
+            with self.subTest(definition=definition), self.assertRaisesMessage(Exception, "Only 'eq' takes null"):
+                execute(create, self.user, definition=json.dumps(definition))
+        self.assertFalse(SavedScreen.objects.filter(name="broken").exists())
+
+
+class DataLoaderTests(TestCase):
+    QUERY = """{
+        myStockLists {
+            name
+            stocks(first: 20) { edges { node {
+                symbol
+                sector { name }
+                tags { name }
+                notes(first: 5) { edges { node { title user { username } } } }
+            } } }
+        }
+    }"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("dashboard")
+        self.client.force_login(self.user)
+        self.sectors = [Sector.objects.create(name=name) for name in ("Tech", "Energy")]
+        self.tag = Tag.objects.create(name="watch")
+        self.lists = [StockList.objects.create(user=self.user, name=name) for name in ("core", "swing")]
+
+    def add_stocks(self, count):
+        for i in range(count):
+            stock = Stock.objects.create(
+                symbol=f"S{Stock.objects.count():03d}", name="S", sector=self.sectors[i % 2]
+            )
+            stock.tags.add(self.tag)
+            self.lists[i % 2].stocks.add(stock)
+            StockNote.objects.create(stock=stock, user=self.user, title=stock.symbol, content="")
+
+    def dashboard(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/graphql/", json.dumps({"query": self.QUERY}), content_type="application/json")
+        return response.json()["data"]["myStockLists"], len(queries)
+
+    def test_queries_do_not_grow_with_the_nodes_returned(self):
+        self.add_stocks(2)
+        lists, few = self.dashboard()
+        self.add_stocks(10)
+        lists, many = self.dashboard()
+        self.assertEqual(many, few)
+
+        node = lists[0]["stocks"]["edges"][0]["node"]
+        self.assertEqual(node, {
+            "symbol": "S000",
+            "sector": {"name": "Tech"},
+            "tags": [{"name": "watch"}],
+            "notes": {"edges": [{"node": {"title": "S000", "user": {"username": "dashboard"}}}]},
+        })
+        self.assertEqual(sum(len(stock_list["stocks"]["edges"]) for stock_list in lists), 12)
+
+
+class QueryOptimizerTests(TestCase):
+    def setUp(self):
+        tech = Sector.objects.create(name="Tech")
+        tag = Tag.objects.create(name="watch")
+        for i in range(5):
+            stock = Stock.objects.create(symbol=f"S{i}", name="S", sector=tech, RSI_14=50 + i, SMA_50=10)
+            stock.tags.add(tag)
+
+    def test_only_selected_columns_are_loaded(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = execute("{ allStocks(rsiAbove: 52) { edges { node { symbol RSI14 } } } }")
+        self.assertEqual([edge["node"] for edge in data["allStocks"]["edges"]][0], {"symbol": "S3", "RSI14": 53.0})
+        sql = queries[-1]["sql"]
+        self.assertIn('"symbol"', sql)
+        self.assertNotIn('"SMA_50"', sql)
+        self.assertNotIn('"name"', sql)
+
+    def test_relations_are_joined_and_prefetched(self):
+        query = "{ allStocks { edges { node { symbol sector { name } tags { name } } } } }"
+        with self.assertNumQueries(3):
+            data = execute(query)
+        node = data["allStocks"]["edges"][0]["node"]
+        self.assertEqual(node, {"symbol": "S0", "sector": {"name": "Tech"}, "tags": [{"name": "watch"}]})
+
+        Stock.objects.create(symbol="S5", name="S", sector=Sector.objects.get())
+        with self.assertNumQueries(3):
+            self.assertEqual(len(execute(query)["allStocks"]["edges"]), 6)
+
+
+class GraphQLEndpointTests(TestCase):
+    SECTORS = "{ allSectors { edges { node { name } } } }"
+
+    def post(self, body):
+        return self.client.post("/graphql/", json.dumps(body), content_type="application/json")
+
+    def persisted(self, query):
+        return {"persistedQuery": {"version": 1, "sha256Hash": hashlib.sha256(query.encode()).hexdigest()}}
+
+    def test_persisted_query_hit_and_miss(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        manifest = os.path.join(root.name, "manifest.json")
+        with open(manifest, "w") as f:
+            json.dump({documents.document_hash(self.SECTORS): self.SECTORS}, f)
+        documents.persisted_queries.cache_clear()
+        self.addCleanup(documents.persisted_queries.cache_clear)
+
+        with override_settings(GRAPHQL_DOCUMENTS={"PERSISTED_QUERIES": manifest}):
+            hit = self.post({"extensions": self.persisted(self.SECTORS)}).json()
+            miss = self.post({"extensions": self.persisted("{ allTags { edges { node { name } } } }")}).json()
+
+        self.assertEqual(hit, {"data": {"allSectors": {"edges": []}}})
+        self.assertEqual(miss["errors"][0]["extensions"]["code"], "PERSISTED_QUERY_NOT_FOUND")
+
+    def test_costly_query_is_rejected(self):
+        query = "{ allStocks(first: 100) { edges { node { symbol tags { name } } } } }"
+        with override_settings(QUERY_LIMITS={"MAX_COST": 50}):
+            error = self.post({"query": query}).json()["errors"][0]
+        self.assertEqual(error["extensions"]["code"], "QUERY_TOO_COSTLY")
+        # The connection, plus 100 stocks each with their tags counted as a list of LIST_SIZE.
+        self.assertEqual(error["extensions"]["cost"], 1 + 100 * (1 + 20))
+
+    def test_deep_query_is_rejected(self):
+        # Fifteen levels deep, at one row per level.
+        query = """{ allTags(first: 1) { edges { node {
+            stocks(first: 1) { edges { node { tags {
+                stocks(first: 1) { edges { node { tags { stocks(first: 1) { edges { node { symbol } } } } } } }
+            } } } }
+        } } } }"""
+        errors = self.post({"query": query}).json()["errors"]
+        self.assertEqual([error["message"] for error in errors], ["'anonymous' exceeds maximum operation depth of 12."])
+
+    def test_cached_documents_count_every_time_they_are_served(self):
+        query = "{ allTags { edges { node { name } } } }"
+        checked = query_cost.metrics["operations_checked"]
+        for _ in range(3):
+            self.assertEqual(self.post({"query": query}).status_code, 200)
+        self.assertEqual(query_cost.metrics["operations_checked"] - checked, 3)
+
+
+class BenchmarkTests(SimpleTestCase):
+    class Provider:
+        def __init__(self, history):
+            self.history_frame = history
+            self.calls = 0
+            self.lock = threading.Lock()
+
+        def history(self, symbol, period="1y", interval="1d", start=None):
+            with self.lock:
+                self.calls += 1
+            time.sleep(0.05)
+            return self.history_frame
+
+    def setUp(self):
+        clear_benchmark_cache()
+        self.addCleanup(clear_benchmark_cache)
+
+    def test_concurrent_callers_share_one_download(self):
+        provider = self.Provider(price_history(30))
+        with ThreadPoolExecutor(4) as pool:
+            series = list(pool.map(lambda _: get_benchmark_close("SPY", provider=provider), range(8)))
+        self.assertEqual(provider.calls, 1)
+        self.assertTrue(all(close is series[0] for close in series))
+
+    def test_no_bars_is_an_empty_series(self):
+        close = get_benchmark_close("NONE", provider=self.Provider(pd.DataFrame()))
+        self.assertTrue(close.empty)
+
+    def test_trends_without_benchmark_bars(self):
+        provider = self.Provider(pd.DataFrame())
+        history = price_history(300)
+        trends = compute_trends(history.copy(), resample_bars(history, PriceBar.WEEKLY), provider=provider)
+        self.assertIsNone(trends["RS_SP500"])
+        self.assertIsNotNone(trends["SMA_200"])
+
+        # The empty download is not kept, so the next stock tries again.
+        provider.history_frame = price_history(130, seed=9)
+        trends = compute_trends(history.copy(), resample_bars(history, PriceBar.WEEKLY), provider=provider)
+        self.assertEqual(provider.calls, 2)
+        self.assertIsNotNone(trends["RS_SP500"])
+
+
+class ScreenerTests(TestCase):
+    def setUp(self):
+        for symbol, rsi in [("AAA", 60), ("BBB", 75), ("CCC", None), ("DDD", 40)]:
+            Stock.objects.create(symbol=symbol, name=symbol, RSI_14=rsi)
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        screener.invalidate()
+        self.addCleanup(screener.invalidate)
+
+    def symbols(self, q, order_by=None):
+        ids = screener.screen(q, order_by).tolist()
+        stocks = Stock.objects.in_bulk(ids)
+        return [stocks[stock_id].symbol for stock_id in ids]
+
+    def test_screen_matches_sql(self):
+        q = Q(RSI_14__gt=50) | Q(symbol__icontains="d")
+        with override_settings(SCREENER={"ENGINE": True}):
+            self.assertEqual(self.symbols(q, "-RSI_14"), ["BBB", "AAA", "DDD"])
+            self.assertEqual(
+                self.symbols(q, "-RSI_14"),
+                list(Stock.objects.filter(q).order_by(F("RSI_14").desc(nulls_last=True)).values_list("symbol", flat=True)),
+            )
+            with self.assertRaises(screener.UnsupportedScreen):
+                screener.screen(~q)
+
+    def test_all_stocks_filters_match_sql(self):
+        tech = Sector.objects.create(name="Tech")
+        Stock.objects.filter(symbol__in=["AAA", "CCC"]).update(sector=tech, RS_SP500=1.2)
+        Tag.objects.create(name="watch").stocks.add(*Stock.objects.filter(symbol__in=["BBB", "CCC"]))
+        query = """query ($rsiAbove: Decimal, $sector: ID, $tag: [ID], $symbolContains: String) {
+            allStocks(rsiAbove: $rsiAbove, sector: $sector, tag: $tag, symbolContains: $symbolContains) {
+                edges { node { symbol } }
+            }
+        }"""
+        screens = [
+            {"rsiAbove": "50"},
+            {"sector": tech.pk},
+            {"tag": ["watch"], "symbolContains": "c"},
+            {"rsiAbove": "30", "tag": []},
+        ]
+        for variables in screens:
+            with self.subTest(**variables):
+                # allStocks has no order of its own, so compare what matched.
+                sql = execute(query, **variables)["allStocks"]["edges"]
+                with override_settings(SCREENER={"ENGINE": True}):
+                    self.assertCountEqual(execute(query, **variables)["allStocks"]["edges"], sql)
+
+    def test_screen_loads_only_the_displayed_page(self):
+        Stock.objects.bulk_create([Stock(symbol=f"X{i:03d}", name="X", RSI_14=90) for i in range(100)])
+        with override_settings(SCREENER={"ENGINE": True, "RECHECK_SECONDS": 60}):
+            execute("{ allStocks(rsiAbove: 50, first: 2) { edges { node { symbol } } } }")
+            with CaptureQueriesContext(connection) as queries:
+                data = execute("{ allStocks(rsiAbove: 80, first: 2) { edges { node { symbol } } } }")
+        self.assertEqual([edge["node"]["symbol"] for edge in data["allStocks"]["edges"]], ["X000", "X001"])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("RSI_14\" >", queries[0]["sql"])
+
+    def test_writes_outside_a_refresh_are_picked_up(self):
+        for shared in (False, True):
+            with self.subTest(shared=shared), override_settings(
+                SCREENER={"ENGINE": True, "SHARED": shared, "ROOT": self.root, "RECHECK_SECONDS": 0}
+            ):
+                if shared:
+                    screener.publish_snapshot()
+                self.assertNotIn("EEE", self.symbols(Q()))
+                Stock.objects.create(symbol="EEE", name="EEE", RSI_14=90)
+                self.assertEqual(self.symbols(Q(RSI_14__gt=80)), ["EEE"])
+                Stock.objects.filter(symbol="EEE").delete()
+
+    def test_workers_switch_to_the_published_version(self):
+        with override_settings(SCREENER={"ENGINE": True, "SHARED": True, "ROOT": self.root, "RECHECK_SECONDS": 3600}):
+            screener.publish_snapshot()
+            snapshot = screener.get_snapshot()
+            self.assertFalse(snapshot.column("RSI_14").flags.writeable)
+            self.assertIs(screener.get_snapshot(), snapshot)
+
+            # Another worker finishes a refresh that changed values without touching updated_at.
+            Stock.objects.filter(symbol="AAA").update(RSI_14=10)
+            screener.ScreenerSnapshot.load().publish(self.root)
+            self.assertEqual(self.symbols(Q(RSI_14__gt=50)), ["BBB"])
+            self.assertNotEqual(screener.get_snapshot().directory, snapshot.directory)
+
+            Stock.objects.filter(symbol="AAA").update(RSI_14=60)
+            refresh_finished.send(sender=self.__class__, stock_ids=None)
+            self.assertEqual(self.symbols(Q(RSI_14__gt=50)), ["AAA", "BBB"])
+
+    def test_stale_shared_snapshot_is_published_once(self):
+        config = {"ENGINE": True, "SHARED": True, "ROOT": self.root, "RECHECK_SECONDS": 0}
+        with override_settings(SCREENER=config):
+            first = screener.publish_snapshot()
+            screener.get_snapshot()
+            stock = Stock.objects.get(symbol="AAA")
+            stock.RSI_14 = 10
+            stock.save()
+            second = screener.get_snapshot().directory
+            screener.invalidate()
+            self.assertEqual(screener.get_snapshot().directory, second)
+        self.assertNotEqual(first, second)
+        self.assertEqual(len([name for name in os.listdir(self.root) if name != "LOCK" and not name.startswith("CURRENT")]), 2)
+
+    def test_fetch_stock_does_not_finish_a_refresh(self):
+        stock = Stock.objects.get(symbol="AAA")
+        receiver = mock.Mock()
+        refresh_finished.connect(receiver)
+        self.addCleanup(refresh_finished.disconnect, receiver)
+        with mock.patch("stocks.schema.fetch_stock_data", return_value=stock):
+            data = execute('mutation { fetchStock(symbol: "AAA") { stock { symbol } } }')
+        self.assertEqual(data["fetchStock"]["stock"]["symbol"], "AAA")
+        receiver.assert_not_called()
+
+
+class KeysetPaginationTests(TestCase):
+    QUERY = """
+        query ($first: Int, $after: String, $last: Int, $before: String) {
+            trendingStocks(first: $first, after: $after, last: $last, before: $before) {
+                edges { node { symbol } }
+                pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+            }
+        }
+    """
+
+    def setUp(self):
+        # Ties and NULLs on RS_SP500, so pages turn on the id tie-break and the NULLs-last order.
+        for symbol, rs in [("AAA", 1.2), ("BBB", None), ("CCC", 1.5), ("DDD", 1.2), ("EEE", None), ("FFF", 0.8)]:
+            Stock.objects.create(symbol=symbol, name=symbol, RSI_14=65, RS_SP500=rs)
+        Stock.objects.create(symbol="LOW", name="LOW", RSI_14=40, RS_SP500=2.0)
+        self.expected = ["CCC", "AAA", "DDD", "FFF", "BBB", "EEE"]
+
+    def page(self, **args):
+        connection = execute(self.QUERY, **args)["trendingStocks"]
+        return [edge["node"]["symbol"] for edge in connection["edges"]], connection["pageInfo"]
+
+    def walk(self):
+        forward, info = self.page(first=4)
+        self.assertTrue(info["hasNextPage"])
+        while info["hasNextPage"]:
+            symbols, info = self.page(first=4, after=info["endCursor"])
+            forward += symbols
+
+        backward, info = self.page(last=4)
+        self.assertTrue(info["hasPreviousPage"])
+        while info["hasPreviousPage"]:
+            symbols, info = self.page(last=4, before=info["startCursor"])
+            backward = symbols + backward
+        return forward, backward
+
+    def test_first_after_and_last_before_round_trip(self):
+        self.assertEqual(self.walk(), (self.expected, self.expected))
+
+    def test_screener_pages_like_sql(self):
+        with override_settings(SCREENER={"ENGINE": True}):
+            screener.invalidate()
+            self.addCleanup(screener.invalidate)
+            self.assertEqual(self.walk(), (self.expected, self.expected))
+
+    def test_invalid_cursor(self):
+        with self.assertRaisesMessage(Exception, "Invalid cursor"):
+            self.page(first=2, after="not a cursor")
@@ -0,0 +1,199 @@
+"""
+Asyncio refresh pipeline: fetch -> compute -> batched write.
+
+Stages are connected by bounded queues, so a slow stage holds the faster ones
+back instead of letting fetched data pile up in memory. Network calls run on a
+pool as wide as ``concurrency`` and reuse the provider's pooled connections;
+database work stays on a few threads (one connection each) no matter how many
+requests are in flight, and all rows go through a single batched writer.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+from stocks.models import PriceBar, Stock
+from stocks.utils.benchmarks import clear_benchmark_cache
+from stocks.utils.bulk_writer import IndicatorWriter
+from stocks.utils.data_fetcher import stock_values
+from stocks.utils.fundamentals import cached_infos, store_info
+from stocks.utils.price_store import HISTORY_PERIOD, download_bars, store_bars, sync_point
+from stocks.utils.providers import get_provider
+from stocks.utils.refresh import RefreshSummary, send_refresh_finished
+from stocks.utils.trend_analysis import stored_stock_trends
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _close_connection(barrier):
+    # The barrier makes every pool thread take one call, so each closes its own connection.
+    barrier.wait()
+    connection.close()
+
+
+def _write_batch(batch):
+    with IndicatorWriter(batch_size=len(batch)) as writer:
+        for symbol, (values, as_of) in batch.items():
+            writer.add(symbol, values, as_of=as_of)
+    return writer.skipped
+
+
+class RefreshPipeline:
+    """
+    Refreshes stocks through three concurrent stages.
+
+    ``concurrency`` bounds the upstream requests in flight, ``compute_workers``
+    the threads that store bars and compute indicators, and ``queue_size`` how
+    many fetched stocks may wait for them.
+    """
+
+    def __init__(self, provider=None, concurrency=32, compute_workers=None, batch_size=500,
+                 retries=3, backoff=1.0, queue_size=None):
+        self.provider = provider or get_provider()
+        self.concurrency = concurrency
+        self.compute_workers = compute_workers or min(4, os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.queue_size = queue_size or 2 * self.compute_workers
+
+    async def run(self, symbols, whole_universe=False):
+        """
+        Refresh ``symbols`` and return a RefreshSummary.
+
+        ``refresh_finished`` gets the refreshed stocks' ids unless ``whole_universe``
+        says ``symbols`` are every stock.
+        """
+        clear_benchmark_cache()
+        self.provider.ensure_pool_size(self.concurrency)
+        summary = RefreshSummary(len(symbols))
+
+        io_pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix="refresh-fetch")
+        db_pool = ThreadPoolExecutor(self.compute_workers, thread_name_prefix="refresh-db")
+        write_pool = ThreadPoolExecutor(1, thread_name_prefix="refresh-write")
+        try:
+            await self._run(symbols, summary, io_pool, db_pool, write_pool, whole_universe)
+        finally:
+            loop = asyncio.get_running_loop()
+            for pool, size in ((db_pool, self.compute_workers), (write_pool, 1)):
+                barrier = threading.Barrier(size)
+                await asyncio.gather(*(loop.run_in_executor(pool, _close_connection, barrier) for _ in range(size)))
+            for pool in (io_pool, db_pool, write_pool):
+                pool.shutdown()
+        summary.finished = time.monotonic()
+        return summary
+
+    async def _run(self, symbols, summary, io_pool, db_pool, write_pool, whole_universe):
+        loop = asyncio.get_running_loop()
+        stocks = await loop.run_in_executor(
+            db_pool, lambda: Stock.objects.in_bulk(list(symbols), field_name="symbol")
+        )
+        infos = await loop.run_in_executor(db_pool, cached_infos, symbols)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        fetched = asyncio.Queue(maxsize=self.queue_size)
+        computed = asyncio.Queue(maxsize=self.batch_size)
+        progress = {"done": 0}
+
+        def finished(symbol, error=None):
+            if error:
+                logger.error("Giving up on %s: %s", symbol, error)
+                summary.failures[symbol] = error
+            progress["done"] += 1
+            if progress["done"] % self.batch_size == 0 or progress["done"] == summary.total:
+                logger.info("Refreshed %d/%d stocks (%.1f/s)",
+                            progress["done"], summary.total, progress["done"] / summary.elapsed)
+
+        async def fetch(symbol):
+            # The semaphore is held until the result is queued, so a full queue stops new requests.
+            async with semaphore:
+                stock = stocks.get(symbol)
+                info = infos.get(symbol)
+                new_info = info is None
+                for attempt in range(self.retries + 1):
+                    try:
+                        resume = await loop.run_in_executor(db_pool, sync_point, stock) if stock else None
+                        if info is None:
+                            # Only tickers without cached fundamentals cost an info call.
+                            info = await loop.run_in_executor(io_pool, self.provider.info, symbol)
+                        bars, full = await loop.run_in_executor(
+                            io_pool, download_bars, self.provider, symbol, resume, PriceBar.DAILY, HISTORY_PERIOD
+                        )
+                        break
+                    except Exception as e:
+                        if attempt == self.retries:
+                            finished(symbol, f"{type(e).__name__}: {e}")
+                            return
+                        delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                        logger.warning("Fetching %s failed (%s), retrying in %.1fs", symbol, e, delay)
+                        await asyncio.sleep(delay)
+                await fetched.put((symbol, stock, info, new_info, bars, full))
+
+        async def compute_worker():
+            while (item := await fetched.get()) is not _DONE:
+                symbol = item[0]
+                try:
+                    row = await loop.run_in_executor(db_pool, self._compute, *item)
+                except Exception as e:
+                    finished(symbol, f"{type(e).__name__}: {e}")
+                    continue
+                await computed.put((symbol, row))
+
+        async def write(batch):
+            try:
+                summary.skipped += await loop.run_in_executor(write_pool, _write_batch, batch)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                for symbol in batch:
+                    finished(symbol, error)
+                return
+            for symbol in batch:
+                finished(symbol)
+
+        async def write_worker():
+            batch = {}
+            while (item := await computed.get()) is not _DONE:
+                symbol, row = item
+                batch[symbol] = row
+                if len(batch) >= self.batch_size:
+                    await write(batch)
+                    batch = {}
+            if batch:
+                await write(batch)
+
+        computing = [asyncio.create_task(compute_worker()) for _ in range(self.compute_workers)]
+        writing = asyncio.create_task(write_worker())
+        try:
+            await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+            for _ in computing:
+                await fetched.put(_DONE)
+            await asyncio.gather(*computing)
+            await computed.put(_DONE)
+            await writing
+            await loop.run_in_executor(
+                write_pool, send_refresh_finished, RefreshPipeline, symbols, summary, whole_universe
+            )
+        finally:
+            for task in computing + [writing]:
+                task.cancel()
+
+    def _compute(self, symbol, stock, info, new_info, bars, full):
+        """Store the downloaded data and compute the stock's row and its date (runs on a database thread)."""
+        if new_info:
+            info = store_info(symbol, info)
+        if stock is None:
+            stock, _ = Stock.objects.get_or_create(symbol=symbol, defaults={"name": info.get("longName", symbol)})
+        store_bars(stock, PriceBar.DAILY, bars, full)
+        trends = stored_stock_trends(stock, provider=self.provider)
+        return stock_values(symbol, info, trends), trends["date"] if trends else None
+
+
+def refresh_stocks_async(symbols, whole_universe=False, **options):
+    """Run a RefreshPipeline over ``symbols`` from synchronous code and return its RefreshSummary."""
+    return asyncio.run(RefreshPipeline(**options).run(symbols, whole_universe))
@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import Future
+from datetime import date
+
+import pandas as pd
+
+from stocks.utils.providers import get_provider
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _close(history):
+    """The closes of a history frame, empty when the provider returned no bars."""
+    if "Close" not in history:
+        return pd.Series(dtype=float)
+    return history["Close"]
+
+
+def get_benchmark_close(symbol="SPY", period="6mo", as_of=None, provider=None):
+    """
+    Return a benchmark's closing prices, downloading them at most once per refresh run.
+
+    Series are memoized by symbol, period and as-of date (today by default), so
+    every ticker in a run is compared against the same benchmark data. The
+    lock is only held to look a series up: the first caller downloads it and
+    concurrent callers for the same key wait on its future, while other keys
+    download in parallel. Returns an empty series when the provider has no bars
+    for the benchmark; neither that nor a failed download is memoized, so the
+    next caller tries again.
+    """
+    key = (symbol, period, as_of or date.today())
+    with _lock:
+        future = _cache.get(key)
+        owner = future is None
+        if owner:
+            future = _cache[key] = Future()
+
+    if owner:
+        try:
+            provider = provider or get_provider()
+            close = _close(provider.history(symbol, period=period))
+        except Exception as e:
+            _forget(key, future)
+            future.set_exception(e)
+        else:
+            if close.empty:
+                _forget(key, future)
+            future.set_result(close)
+    return future.result()
+
+
+def _forget(key, future):
+    with _lock:
+        if _cache.get(key) is future:
+            del _cache[key]
+
+
+def clear_benchmark_cache():
+    """Forget memoized benchmark series, e.g. at the start of a refresh run."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,146 @@
+import math
+import threading
+
+from django.db import transaction
+from django.utils import timezone
+
+from stocks.models import INDICATOR_FIELDS, IndicatorSnapshot, Stock
+
+# Relative difference below which a float column counts as unchanged.
+FLOAT_TOLERANCE = 1e-6
+
+
+def values_differ(old, new):
+    """Compare a stored column value with a new one, with a tolerance for floats."""
+    if isinstance(old, float) and isinstance(new, float):
+        return not math.isclose(old, new, rel_tol=FLOAT_TOLERANCE, abs_tol=1e-9)
+    return old != new
+
+
+def changed_columns(current, values):
+    """The subset of ``values`` that differs from the ``current`` row."""
+    return {field: value for field, value in values.items() if values_differ(current[field], value)}
+
+
+def write_snapshots(stocks, as_of=None, batch_size=1000):
+    """
+    Record the current indicator values of ``stocks`` (a Stock queryset) in their history.
+
+    ``as_of`` maps symbols to the market date their values belong to; stocks
+    not in it are recorded under today's date. Stocks without a price are skipped.
+    """
+    as_of = as_of or {}
+    today = timezone.localdate()
+    rows = stocks.filter(current_price__isnull=False).values_list("id", "symbol", *INDICATOR_FIELDS)
+    snapshots = [
+        IndicatorSnapshot(stock_id=stock_id, date=as_of.get(symbol) or today, **dict(zip(INDICATOR_FIELDS, values)))
+        for stock_id, symbol, *values in rows
+    ]
+    IndicatorSnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["stock", "date"],
+        update_fields=INDICATOR_FIELDS,
+    )
+    return len(snapshots)
+
+
+class IndicatorWriter:
+    """
+    Collects computed ``Stock`` rows and writes them in batched upserts.
+
+    Each batch reads the stored values of its stocks once and only writes the
+    rows and columns that changed beyond ``FLOAT_TOLERANCE``, so unchanged
+    stocks keep their ``updated_at``. Changed rows go out as one
+    ``INSERT ... ON CONFLICT (symbol) DO UPDATE`` per set of columns, inside one
+    transaction, instead of an ``update_or_create`` (SELECT plus UPDATE/INSERT)
+    per ticker, and the stocks are appended to the indicator history in the
+    same transaction. Every stock in the batch, changed or not, then has its
+    ``refreshed_at`` set in one ``UPDATE``, which is what the scheduler goes by.
+    Use it as a context manager so the last partial batch is flushed.
+
+    ``written`` and ``skipped`` count the stocks that were and were not changed.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.pending = {}
+        self.as_of = {}
+        self.written = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def add(self, symbol, values, as_of=None):
+        """
+        Queue the column values for one stock, writing a batch once it is full.
+
+        ``as_of`` is the date of the bar the values were computed from (default: today).
+        """
+        with self.lock:
+            self.pending[symbol] = values
+            self.as_of[symbol] = as_of
+            if len(self.pending) < self.batch_size:
+                return
+            batch, self.pending = self.pending, {}
+            as_of, self.as_of = self.as_of, {}
+        self._write(batch, as_of)
+
+    def flush(self):
+        """Write everything that is still queued."""
+        with self.lock:
+            batch, self.pending = self.pending, {}
+            as_of, self.as_of = self.as_of, {}
+        if batch:
+            self._write(batch, as_of)
+
+    def _write(self, rows, as_of):
+        columns = set().union(*rows.values())
+        current = {
+            row["symbol"]: row
+            for row in Stock.objects.filter(symbol__in=list(rows)).values("symbol", *columns)
+        }
+        changed, unchanged = {}, []
+        for symbol, values in rows.items():
+            values = changed_columns(current[symbol], values) if symbol in current else values
+            if values:
+                changed[symbol] = values
+            else:
+                unchanged.append(symbol)
+
+        # An unchanged stock still needs a history row for a date it has none for yet.
+        today = timezone.localdate()
+        recorded = set(
+            IndicatorSnapshot.objects.filter(
+                stock__symbol__in=unchanged,
+                date__in={as_of.get(symbol) or today for symbol in unchanged},
+            ).values_list("stock__symbol", "date")
+        ) if unchanged else set()
+        history = list(changed) + [symbol for symbol in unchanged if (symbol, as_of.get(symbol) or today) not in recorded]
+
+        # Rows are grouped by their columns so a row never overwrites a column it did not set.
+        groups = {}
+        for symbol, values in changed.items():
+            groups.setdefault(tuple(sorted(values)), []).append(Stock(symbol=symbol, **values))
+
+        with transaction.atomic():
+            for fields, stocks in groups.items():
+                Stock.objects.bulk_create(
+                    stocks,
+                    update_conflicts=True,
+                    unique_fields=["symbol"],
+                    update_fields=list(fields) + ["updated_at"],
+                )
+            if history:
+                write_snapshots(Stock.objects.filter(symbol__in=history), as_of)
+            Stock.objects.filter(symbol__in=list(rows)).update(refreshed_at=timezone.now())
+        with self.lock:
+            self.written += len(changed)
+            self.skipped += len(unchanged)
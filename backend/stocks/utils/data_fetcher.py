@@ -1,30 +1,64 @@
 from stocks.models import Stock
+from stocks.utils.bulk_writer import IndicatorWriter
+from stocks.utils.fundamentals import get_info
+from stocks.utils.incremental import update_incrementally
+from stocks.utils.providers import get_provider
 from stocks.utils.trend_analysis import fetch_stock_trends
-import yfinance as yf
 
-def fetch_stock_data(ticker):
-    """Fetch stock fundamentals and trends, then update the database."""
-    stock = yf.Ticker(ticker)
-    info = stock.info
+def stock_values(ticker, info, trends):
+    """Column values for a stock row from its company info and computed trends."""
+    return {
+        "name": info.get("longName", ticker),
+        "current_price": trends["current_price"] if trends else None,
+        "SMA_50": trends["SMA_50"] if trends else None,
+        "SMA_200": trends["SMA_200"] if trends else None,
+        "RSI_14": trends["RSI_14"] if trends else None,
+        "WMA_30_week": trends["WMA_30_week"] if trends else None,
+        "SMA_50_week": trends["SMA_50_week"] if trends else None,
+        "SMA_200_week": trends["SMA_200_week"] if trends else None,
+        "RS_SP500": trends["RS_SP500"] if trends else None,
+        "new_high": trends["new_high"] if trends else False,
+        "new_low": trends["new_low"] if trends else False,
+        "volume_spike": trends["volume_spike"] if trends else False,
+    }
 
-    trends = fetch_stock_trends(ticker)
+def fetch_stock_data(ticker, provider=None, incremental=False, writer=None):
+    """
+    Fetch stock fundamentals and trends, then update the database.
 
-    stock_obj, created = Stock.objects.update_or_create(
+    Fundamentals come from the ``StockFundamentals`` cache when the ticker is
+    known, so only price history is fetched for it.
+
+    With ``incremental=True`` a stock that already exists only has its new daily
+    bars folded into its running indicator state (see ``utils.incremental``).
+    When a ``writer`` (``utils.bulk_writer.IndicatorWriter``) is given the row is
+    queued on it instead of being saved straight away.
+    """
+    provider = provider or get_provider()
+    if incremental:
+        stock_obj = Stock.objects.filter(symbol=ticker).first()
+        if stock_obj is not None:
+            update_incrementally(stock_obj, provider=provider, writer=writer)
+            if writer is None:
+                stock_obj.refresh_from_db()
+            return stock_obj
+
+    info = get_info(ticker, provider)
+
+    stock_obj, created = Stock.objects.get_or_create(
         symbol=ticker,
-        defaults={
-            "name": info.get("longName", ticker),
-            "current_price": trends["current_price"] if trends else None,
-            "SMA_50": trends["SMA_50"] if trends else None,
-            "SMA_200": trends["SMA_200"] if trends else None,
-            "RSI_14": trends["RSI_14"] if trends else None,
-            "WMA_30_week": trends["WMA_30_week"] if trends else None,
-            "SMA_50_week": trends["SMA_50_week"] if trends else None,
-            "SMA_200_week": trends["SMA_200_week"] if trends else None,
-            "RS_SP500": trends["RS_SP500"] if trends else None,
-            "new_high": trends["new_high"] if trends else False,
-            "new_low": trends["new_low"] if trends else False,
-            "volume_spike": trends["volume_spike"] if trends else False,
-        }
+        defaults={"name": info.get("longName", ticker)},
     )
+    trends = fetch_stock_trends(ticker, stock=stock_obj, provider=provider)
+
+    values = stock_values(ticker, info, trends)
+    as_of = trends["date"] if trends else None
+
+    if writer is not None:
+        writer.add(ticker, values, as_of=as_of)
+        return stock_obj
 
-    return stock_obj
+    with IndicatorWriter(batch_size=1) as single:
+        single.add(ticker, values, as_of=as_of)
+    stock_obj.refresh_from_db()
+    return stock_obj
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Cache of company info in ``StockFundamentals``.
+
+``Ticker.info`` is one of the slowest upstream calls and the fields we use
+(name, sector, industry) rarely change, so it is fetched once per symbol and
+then only re-fetched by ``refresh_stale_fundamentals`` once the row is older
+than the TTL. Indicator refreshes read the cache whatever its age.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from stocks.models import StockFundamentals
+from stocks.utils.providers import get_provider
+
+logger = logging.getLogger(__name__)
+
+
+def fundamentals_ttl():
+    return timedelta(days=settings.PRICE_DATA.get("FUNDAMENTALS_TTL_DAYS", 30))
+
+
+def _fundamentals_fields(info):
+    return {
+        "long_name": (info.get("longName") or "")[:200],
+        "sector": (info.get("sector") or "")[:100],
+        "industry": (info.get("industry") or "")[:100],
+    }
+
+
+def store_info(symbol, info):
+    """Save the fields we use from a ``Ticker.info`` dict and return them as an info dict."""
+    fundamentals, _ = StockFundamentals.objects.update_or_create(
+        symbol=symbol,
+        defaults={**_fundamentals_fields(info), "fetched_at": timezone.now()},
+    )
+    return fundamentals.as_info()
+
+
+def store_infos(infos, batch_size=500):
+    """Save ``{symbol: info}`` in batched upserts and return the stored values as info dicts."""
+    now = timezone.now()
+    rows = [
+        StockFundamentals(symbol=symbol, fetched_at=now, **_fundamentals_fields(info))
+        for symbol, info in infos.items()
+    ]
+    StockFundamentals.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["symbol"],
+        update_fields=["long_name", "sector", "industry", "fetched_at"],
+    )
+    return {row.symbol: row.as_info() for row in rows}
+
+
+def get_info(symbol, provider=None, max_age=None):
+    """
+    Company info for ``symbol``, from the cache unless it is missing or older than ``max_age``.
+
+    With no ``max_age`` any cached row is used, so a known ticker never costs an upstream call.
+    """
+    cached = StockFundamentals.objects.filter(symbol=symbol).first()
+    if cached is not None and (max_age is None or cached.fetched_at >= timezone.now() - max_age):
+        return cached.as_info()
+    provider = provider or get_provider()
+    return store_info(symbol, provider.info(symbol))
+
+
+def cached_infos(symbols, max_age=None):
+    """Return ``{symbol: info}`` for the symbols that are cached (no older than ``max_age``), in one query."""
+    cached = StockFundamentals.objects.filter(symbol__in=list(symbols))
+    if max_age is not None:
+        cached = cached.filter(fetched_at__gte=timezone.now() - max_age)
+    return {fundamentals.symbol: fundamentals.as_info() for fundamentals in cached}
+
+
+def refresh_stale_fundamentals(limit=None, provider=None):
+    """
+    Re-fetch cached info older than the TTL, oldest first. Returns how many rows were refreshed.
+
+    Symbols that fail keep their old row and are retried on the next call.
+    """
+    provider = provider or get_provider()
+    stale = StockFundamentals.objects.filter(fetched_at__lt=timezone.now() - fundamentals_ttl()).order_by("fetched_at")
+    symbols = list(stale.values_list("symbol", flat=True)[:limit])
+    refreshed = 0
+    for symbol in symbols:
+        try:
+            store_info(symbol, provider.info(symbol))
+            refreshed += 1
+        except Exception as e:
+            logger.warning("Refreshing fundamentals for %s failed: %s", symbol, e)
+    return refreshed
@@ -0,0 +1,241 @@
+"""
+Constant-time indicator updates when new daily bars arrive.
+
+Each stock keeps an ``IndicatorState`` holding running window sums for the
+SMAs, RSI gains/losses and volume, monotonic deques for the 52-bar high/low
+and the weekly EMA carry. Only complete bars are folded into the state; the
+newest bar of a fetch may still be in progress, so it is evaluated on top of
+the state without being committed and is folded in once a later bar exists.
+"""
+from collections import deque
+from datetime import timedelta
+from itertools import islice
+
+import pandas as pd
+
+from stocks.models import IndicatorState, PriceBar
+from stocks.utils.bulk_writer import IndicatorWriter
+from stocks.utils.price_store import HISTORY_PERIOD, load_bars, sync_bars
+from stocks.utils.providers import get_provider
+
+HIGH_LOW_WINDOW = 52
+RSI_PERIOD = 14
+VOLUME_WINDOW = 10
+WMA_SPAN = 30
+
+
+def week_start(bar_date):
+    """Monday of the week a bar belongs to, matching yfinance's weekly bar labels."""
+    return bar_date - timedelta(days=bar_date.weekday())
+
+
+class IndicatorAccumulator:
+    """Running sums and monotonic deques over the trailing daily bars of one stock."""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.count = state.get("count", 0)
+        self.closes = deque(state.get("closes", []), maxlen=200)
+        self.sum_50 = state.get("sum_50", 0.0)
+        self.sum_200 = state.get("sum_200", 0.0)
+        self.gains = deque(state.get("gains", []), maxlen=RSI_PERIOD)
+        self.losses = deque(state.get("losses", []), maxlen=RSI_PERIOD)
+        self.sum_gain = state.get("sum_gain", 0.0)
+        self.sum_loss = state.get("sum_loss", 0.0)
+        self.volumes = deque(state.get("volumes", []), maxlen=VOLUME_WINDOW)
+        self.sum_volume = state.get("sum_volume", 0.0)
+        # [sequence number, value] pairs, decreasing for highs and increasing for lows.
+        self.highs = deque(state.get("highs", []))
+        self.lows = deque(state.get("lows", []))
+        self.week = state.get("week")
+        self.ema_carry = state.get("ema_carry")
+        self.ema = state.get("ema")
+
+    def to_state(self):
+        return {
+            "count": self.count,
+            "closes": list(self.closes),
+            "sum_50": self.sum_50,
+            "sum_200": self.sum_200,
+            "gains": list(self.gains),
+            "losses": list(self.losses),
+            "sum_gain": self.sum_gain,
+            "sum_loss": self.sum_loss,
+            "volumes": list(self.volumes),
+            "sum_volume": self.sum_volume,
+            "highs": list(self.highs),
+            "lows": list(self.lows),
+            "week": self.week,
+            "ema_carry": self.ema_carry,
+            "ema": self.ema,
+        }
+
+    def _window_exits(self):
+        """Values leaving the 50/200/RSI/volume windows when one more bar is added."""
+        return (
+            self.closes[-50] if len(self.closes) >= 50 else 0.0,
+            self.closes[0] if len(self.closes) == 200 else 0.0,
+            self.gains[0] if len(self.gains) == RSI_PERIOD else 0.0,
+            self.losses[0] if len(self.losses) == RSI_PERIOD else 0.0,
+            self.volumes[0] if len(self.volumes) == VOLUME_WINDOW else 0.0,
+        )
+
+    def _move(self, close):
+        delta = close - self.closes[-1] if self.closes else 0.0
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    def _ema_after(self, bar_date, close):
+        """Return (week, carry, ema) after a close on ``bar_date``."""
+        week = week_start(bar_date).isoformat()
+        carry = self.ema_carry if week == self.week else self.ema
+        ema = close if carry is None else 2.0 / (WMA_SPAN + 1) * close + (1 - 2.0 / (WMA_SPAN + 1)) * carry
+        return week, carry, ema
+
+    def push(self, bar_date, high, low, close, volume):
+        """Fold a complete bar into the running state."""
+        exit_50, exit_200, exit_gain, exit_loss, exit_volume = self._window_exits()
+        gain, loss = self._move(close)
+
+        self.sum_50 += close - exit_50
+        self.sum_200 += close - exit_200
+        self.sum_gain += gain - exit_gain
+        self.sum_loss += loss - exit_loss
+        self.sum_volume += volume - exit_volume
+        self.closes.append(close)
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.volumes.append(volume)
+
+        seq = self.count
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append([seq, high])
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append([seq, low])
+        while self.highs[0][0] <= seq - HIGH_LOW_WINDOW:
+            self.highs.popleft()
+        while self.lows[0][0] <= seq - HIGH_LOW_WINDOW:
+            self.lows.popleft()
+
+        self.week, self.ema_carry, self.ema = self._ema_after(bar_date, close)
+        self.count += 1
+
+    def _window_extreme(self, entries, value, pick):
+        """Extreme of the last window including a not-yet-committed ``value``."""
+        seq = self.count
+        # The front entry may be the one about to leave the window; the next one is still in it.
+        for entry in islice(entries, 2):
+            if entry[0] > seq - HIGH_LOW_WINDOW:
+                return pick(entry[1], value)
+        return value
+
+    def indicators(self, bar_date, high, low, close, volume):
+        """Indicator values as if the given (possibly partial) bar were the latest one."""
+        exit_50, exit_200, exit_gain, exit_loss, exit_volume = self._window_exits()
+        gain, loss = self._move(close)
+        bars = self.count + 1
+
+        sum_gain = self.sum_gain + gain - exit_gain
+        sum_loss = self.sum_loss + loss - exit_loss
+        if bars < RSI_PERIOD or (sum_gain == 0 and sum_loss == 0):
+            rsi = None
+        elif sum_loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + sum_gain / sum_loss)
+
+        full_high_low = bars >= HIGH_LOW_WINDOW
+        avg_volume = (self.sum_volume + volume - exit_volume) / VOLUME_WINDOW
+        return {
+            "current_price": close,
+            "SMA_50": (self.sum_50 + close - exit_50) / 50 if bars >= 50 else None,
+            "SMA_200": (self.sum_200 + close - exit_200) / 200 if bars >= 200 else None,
+            "RSI_14": rsi,
+            "WMA_30_week": self._ema_after(bar_date, close)[2],
+            "new_high": full_high_low and close >= self._window_extreme(self.highs, high, max),
+            "new_low": full_high_low and close <= self._window_extreme(self.lows, low, min),
+            "volume_spike": bars >= VOLUME_WINDOW and volume > avg_volume * 1.5,
+        }
+
+
+def _bar_values(timestamp, row):
+    volume = 0.0 if pd.isna(row["Volume"]) else float(row["Volume"])
+    return timestamp.date(), float(row["High"]), float(row["Low"]), float(row["Close"]), volume
+
+
+def seed_state(stock):
+    """Build a stock's state from its stored bars, leaving the newest bar uncommitted."""
+    daily = load_bars(stock, PriceBar.DAILY, start=pd.Timestamp.today().date() - timedelta(days=400))
+    if daily.empty:
+        return None
+
+    accumulator = IndicatorAccumulator()
+    for timestamp, row in daily.iloc[:-1].iterrows():
+        accumulator.push(*_bar_values(timestamp, row))
+
+    # Seed the weekly EMA from the full weekly history rather than one year of daily closes.
+    if accumulator.week is not None:
+        weekly = load_bars(stock, PriceBar.WEEKLY)
+        previous_weeks = weekly[weekly.index < pd.Timestamp(accumulator.week)]["Close"]
+        if not previous_weeks.empty:
+            accumulator.ema_carry = float(previous_weeks.ewm(span=WMA_SPAN, adjust=False).mean().iloc[-1])
+            accumulator.ema = accumulator._ema_after(daily.index[-2].date(), float(daily["Close"].iloc[-2]))[2]
+
+    last_date = daily.index[-2].date() if len(daily) > 1 else daily.index[0].date() - timedelta(days=1)
+    state, _ = IndicatorState.objects.update_or_create(
+        stock=stock,
+        defaults={"last_date": last_date, "state": accumulator.to_state()},
+    )
+    return state
+
+
+def advance_state(state, bars):
+    """
+    Fold new bars into a stock's state and return indicators for the newest one.
+
+    Bars at or before ``state.last_date`` are ignored. Every new bar except the
+    newest is committed; the newest is only evaluated.
+    """
+    bars = bars[[timestamp.date() > state.last_date for timestamp in bars.index]].dropna(subset=["Close"])
+    if bars.empty:
+        return None
+
+    accumulator = IndicatorAccumulator(state.state)
+    for timestamp, row in bars.iloc[:-1].iterrows():
+        accumulator.push(*_bar_values(timestamp, row))
+        state.last_date = timestamp.date()
+    state.state = accumulator.to_state()
+    state.save()
+    return accumulator.indicators(*_bar_values(bars.index[-1], bars.iloc[-1]))
+
+
+def update_incrementally(stock, provider=None, writer=None):
+    """
+    Fetch a stock's new daily bars and update its daily indicators from the running state.
+
+    Weekly SMAs and RS_SP500 are left as they are until the next full recompute.
+    When the fetch replaced a re-adjusted history, the state is reseeded from the
+    reloaded bars before the new bar is applied. The update is queued on
+    ``writer`` when one is given.
+    """
+    provider = provider or get_provider()
+    _, reloaded = sync_bars(stock, provider, PriceBar.DAILY, period=HISTORY_PERIOD)
+
+    # A reloaded history was re-adjusted for a split or dividend: the old state no longer applies.
+    state = None if reloaded else IndicatorState.objects.filter(stock=stock).first()
+    state = state or seed_state(stock)
+    if state is None:
+        return None
+
+    new_bars = load_bars(stock, PriceBar.DAILY, start=state.last_date + timedelta(days=1))
+    indicators = advance_state(state, new_bars)
+    if indicators is None:
+        return None
+    as_of = new_bars.dropna(subset=["Close"]).index[-1].date()
+    if writer is not None:
+        writer.add(stock.symbol, indicators, as_of=as_of)
+    else:
+        with IndicatorWriter(batch_size=1) as single:
+            single.add(stock.symbol, indicators, as_of=as_of)
+    return indicators
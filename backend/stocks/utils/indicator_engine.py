@@ -0,0 +1,244 @@
+"""
+Vectorized indicator computation for the whole universe at once.
+
+Bars are loaded into 2D panels (stocks × dates) and every indicator is computed
+for all stocks in a single NumPy pass, instead of one pandas frame per ticker.
+The semantics match ``trend_analysis.fetch_stock_trends``: an indicator is
+only defined once its full window of bars is available.
+
+Only each stock's latest values are needed, so every indicator reads just the
+trailing columns of its window, and panels are not copied to align them:
+rows whose bars already end in the last column (nearly all of them) are read
+in place, which for a memory-mapped panel means straight from the mapping.
+"""
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from stocks.models import INDICATOR_FIELDS, PriceBar, Stock
+from stocks.signals import refresh_finished
+from stocks.utils.benchmarks import get_benchmark_close
+from stocks.utils.bulk_writer import IndicatorWriter
+from stocks.utils.panel_store import is_current, load_panel, open_panel, panel_window
+from stocks.utils.providers import period_offset
+
+logger = logging.getLogger(__name__)
+
+
+def right_align(values):
+    """Shift each row's bars to the right edge so the last column is every stock's latest bar."""
+    order = np.argsort(~np.isnan(values), axis=1, kind="stable")
+    return np.take_along_axis(values, order, axis=1)
+
+
+def ragged_rows(values):
+    """
+    Rows ``right_align`` would change: ones whose bars have a gap or stop before the last column.
+
+    A row is aligned when its valid bars are exactly its last ones, i.e. its
+    first valid column is the number of columns minus the number of bars.
+    """
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=1)
+    return (counts > 0) & (np.argmax(valid, axis=1) != values.shape[1] - counts)
+
+
+def rolling_mean(values, window):
+    """Trailing mean over ``window`` columns; NaN until the window holds no gaps."""
+    valid = ~np.isnan(values)
+    zeros = np.zeros((values.shape[0], 1))
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, values, 0.0), axis=1, dtype=np.float64)], axis=1)
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=1)], axis=1)
+
+    out = np.full(values.shape, np.nan)
+    window_counts = counts[:, window:] - counts[:, :-window]
+    window_sums = sums[:, window:] - sums[:, :-window]
+    out[:, window - 1:] = np.where(window_counts == window, window_sums / window, np.nan)
+    return out
+
+
+def last_window(values, window, reducer):
+    """Apply ``reducer`` over each row's last ``window`` columns; NaN if any are missing."""
+    if values.shape[1] < window:
+        return np.full(values.shape[0], np.nan)
+    tail = values[:, -window:]
+    return np.where(np.isnan(tail).any(axis=1), np.nan, reducer(tail, axis=1))
+
+
+def rsi(close, period=14):
+    """Vectorized equivalent of ``trend_analysis.compute_rsi`` for every row."""
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    missing = np.isnan(close)
+    gain = np.where(missing, np.nan, np.where(delta > 0, delta, 0.0))
+    loss = np.where(missing, np.nan, np.where(delta < 0, -delta, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+        return 100 - (100 / (1 + rs))
+
+
+def ewm_last(values, span):
+    """
+    Last value of each row's exponential moving average (``adjust=False``), in closed form.
+
+    Missing bars leave the average as it is, so gaps need no alignment: each
+    bar is weighted by ``alpha * (1 - alpha) ** n`` for the ``n`` bars after
+    it, and a row's first bar, which seeds the average, by ``(1 - alpha) ** n``.
+    """
+    alpha = 2.0 / (span + 1)
+    valid = ~np.isnan(values)
+    seen = np.cumsum(valid, axis=1)
+    after = seen[:, -1:] - seen
+    weights = np.where(seen == 1, 1.0, alpha) * (1 - alpha) ** after
+    with np.errstate(invalid="ignore"):
+        total = np.where(valid, values * weights, 0.0).sum(axis=1)
+    return np.where(valid.any(axis=1), total, np.nan)
+
+
+def last_mean(values, window):
+    """Each row's mean over its last ``window`` columns, from a view of just those columns; NaN on any gap."""
+    if not values.shape[1]:
+        return np.full(values.shape[0], np.nan)
+    return rolling_mean(values[:, -window:], window)[:, -1]
+
+
+def last_rsi(close, period=14):
+    """Each row's latest RSI, from its last ``period + 1`` closes."""
+    if not close.shape[1]:
+        return np.full(close.shape[0], np.nan)
+    return rsi(close[:, -(period + 1):], period)[:, -1]
+
+
+def relative_strength(panel, benchmark_close, period="6mo"):
+    """Mean daily return of each stock over ``period`` divided by the benchmark's."""
+    if len(panel.dates) == 0:
+        return np.full(len(panel.stock_ids), np.nan)
+    cutoff = np.datetime64((pd.Timestamp(panel.dates[-1]) - period_offset(period)).date())
+    close = panel.close[:, panel.dates >= cutoff]
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        # Stocks without bars in the window have an all-NaN row; their mean is NaN.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        returns = close[:, 1:] / close[:, :-1] - 1
+        stock_mean = np.nanmean(returns, axis=1) if returns.shape[1] else np.full(len(close), np.nan)
+    return stock_mean / benchmark_close.pct_change().mean()
+
+
+def daily_indicators(close, high, low, volume):
+    """The indicators of right-aligned daily bars, each computed from the trailing columns it needs."""
+    current_price = np.array(close[:, -1], dtype=np.float64) if close.shape[1] else np.full(len(close), np.nan)
+    latest_volume = volume[:, -1] if volume.shape[1] else np.full(len(volume), np.nan)
+    with np.errstate(invalid="ignore"):
+        return {
+            "current_price": current_price,
+            "SMA_50": last_mean(close, 50),
+            "SMA_200": last_mean(close, 200),
+            "RSI_14": last_rsi(close, 14),
+            "new_high": current_price >= last_window(high, 52, np.max),
+            "new_low": current_price <= last_window(low, 52, np.min),
+            "volume_spike": latest_volume > last_mean(volume, 10) * 1.5,
+        }
+
+
+def weekly_indicators(close):
+    """The indicators of right-aligned weekly closes."""
+    return {
+        "WMA_30_week": ewm_last(close, 30),
+        "SMA_50_week": last_mean(close, 50),
+        "SMA_200_week": last_mean(close, 200),
+    }
+
+
+def aligned_indicators(compute, *fields):
+    """
+    ``compute(*fields)`` as if every row of ``fields`` were right-aligned.
+
+    Most rows already are, so the indicators are computed from views of the
+    (possibly memory-mapped) panel as it is, and only the ragged rows are
+    copied, aligned and computed again.
+    """
+    indicators = compute(*fields)
+    ragged = ragged_rows(fields[0])
+    if ragged.any():
+        for name, values in compute(*(right_align(field[ragged]) for field in fields)).items():
+            indicators[name][ragged] = values
+    return indicators
+
+
+def compute_indicators(daily, weekly, benchmark_close):
+    """Compute every ``Stock`` indicator column for all rows of the two panels."""
+    return {
+        **aligned_indicators(daily_indicators, daily.close, daily.high, daily.low, daily.volume),
+        **aligned_indicators(weekly_indicators, weekly.close),
+        "RS_SP500": relative_strength(daily, benchmark_close),
+    }
+
+
+def last_bar_dates(panel):
+    """Date of each row's newest bar, NaT for rows without bars."""
+    valid = ~np.isnan(panel.close)
+    if not valid.shape[1]:
+        return np.full(len(valid), np.datetime64("NaT"), dtype="datetime64[D]")
+    last = valid.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    return np.where(valid.any(axis=1), panel.dates[last], np.datetime64("NaT"))
+
+
+def indicator_rows(stock_ids, indicators):
+    """Yield ``(stock_id, {field: value})`` for stocks that have price data."""
+    for i, stock_id in enumerate(stock_ids.tolist()):
+        if np.isnan(indicators["current_price"][i]):
+            continue
+        row = {}
+        for field in INDICATOR_FIELDS:
+            value = indicators[field][i]
+            if indicators[field].dtype == bool:
+                row[field] = bool(value)
+            else:
+                row[field] = None if np.isnan(value) else float(value)
+        yield stock_id, row
+
+
+def load_bar_panel(stock_ids, interval, start, dtype=np.float64, use_panels=False):
+    """
+    Bars for ``stock_ids`` from ``start``, from the shared on-disk panel when
+    asked for and available, and the database when there is none or it is stale.
+    """
+    shared = open_panel(interval) if use_panels else None
+    if shared is not None and not is_current(shared):
+        logger.info("The %s panel predates the stored bars; reading them from the database", interval)
+        shared = None
+    if shared is None:
+        return load_panel(stock_ids, interval, start=start, dtype=dtype)
+    return panel_window(shared, stock_ids, start=start, dtype=dtype)
+
+
+def recompute_indicators(stocks=None, dtype=np.float64, benchmark="SPY", batch_size=500, use_panels=False):
+    """
+    Recompute the indicator columns of ``stocks`` (default: all) from stored bars
+    and record them in the indicator history.
+
+    With ``use_panels`` the bars are read from the memory-mapped panels built by
+    ``panel_store.build_panel`` instead of the database; an interval without a
+    published panel, or whose panel bars were written after, falls back to the
+    database. ``refresh_finished`` is sent
+    afterwards. Returns the number of stocks whose values changed and
+    the number left as they were.
+    """
+    whole_universe = stocks is None
+    stocks = Stock.objects.all() if whole_universe else stocks
+    stock_ids = np.sort(np.fromiter(stocks.values_list("id", flat=True), dtype=np.int64))
+    today = pd.Timestamp.today().normalize()
+
+    daily_start = (today - pd.DateOffset(years=1)).date()
+    weekly_start = (today - pd.DateOffset(years=5)).date()
+    daily = load_bar_panel(stock_ids, PriceBar.DAILY, daily_start, dtype, use_panels)
+    weekly = load_bar_panel(stock_ids, PriceBar.WEEKLY, weekly_start, dtype, use_panels)
+    indicators = compute_indicators(daily, weekly, get_benchmark_close(benchmark))
+
+    symbols = dict(stocks.values_list("id", "symbol"))
+    last_dates = dict(zip(stock_ids.tolist(), last_bar_dates(daily).tolist()))
+    with IndicatorWriter(batch_size=batch_size) as writer:
+        for stock_id, row in indicator_rows(stock_ids, indicators):
+            writer.add(symbols[stock_id], row, as_of=last_dates[stock_id])
+    refresh_finished.send(sender=recompute_indicators, stock_ids=None if whole_universe else stock_ids.tolist())
+    return writer.written, writer.skipped
\ No newline at end of file
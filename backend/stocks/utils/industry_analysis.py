@@ -1,10 +1,21 @@
-from django.db.models import Avg, Count, F, Case, When, IntegerField
-from stocks.models import Stock, Sector, IndustryGroup
+from datetime import timedelta
 
-def rank_sectors():
-    """Ranks broad sectors by average relative strength and uptrend percentage."""
-    sector_stats = (
-        Stock.objects.values("sector__name")
+from django.db import transaction
+from django.db.models import Avg, Count, F, Case, Max, When, IntegerField
+from django.dispatch import receiver
+from django.utils import timezone
+
+from stocks.models import Stock, Sector, IndustryGroup, SectorStrength, IndustryGroupStrength
+from stocks.signals import refresh_finished
+from stocks.utils.market_hours import market_date
+
+STRENGTH_FIELDS = ["avg_rs", "count_above_sma50", "count_above_sma200", "total_stocks"]
+
+
+def _strength(stocks, *group_by, **named):
+    """Average relative strength and uptrend counts of ``stocks`` per ``group_by`` (and ``named``) value."""
+    return (
+        stocks.values(*group_by, **named)
         .annotate(
             avg_rs=Avg("RS_SP500"),
             count_above_sma50=Count(Case(
@@ -17,26 +28,172 @@ def rank_sectors():
             )),
             total_stocks=Count("id")
         )
-        .order_by("-avg_rs")  # Rank by highest relative strength
+        .order_by(F("avg_rs").desc(nulls_last=True))  # Rank by highest relative strength
     )
-    return sector_stats
+
+def rank_sectors():
+    """Ranks broad sectors by average relative strength and uptrend percentage."""
+    return _strength(Stock.objects.all(), sector_name=F("sector__name"))
 
 def rank_industry_groups():
     """Ranks industry groups (more specific than sectors) by strength."""
-    industry_stats = (
-        Stock.objects.values("industry_group__name", "sector__name")
-        .annotate(
-            avg_rs=Avg("RS_SP500"),
-            count_above_sma50=Count(Case(
-                When(current_price__gt=F("SMA_50"), then=1),
-                output_field=IntegerField()
-            )),
-            count_above_sma200=Count(Case(
-                When(current_price__gt=F("SMA_200"), then=1),
-                output_field=IntegerField()
-            )),
-            total_stocks=Count("id")
+    return _strength(
+        Stock.objects.all(), industry_group_name=F("industry_group__name"), sector_name=F("sector__name")
+    )
+
+
+@transaction.atomic
+def record_group_strength(date=None):
+    """
+    Store the current sector and industry group strength as the rows for ``date``
+    (the current market date by default), replacing any earlier rows for that date.
+
+    Every group is recomputed from the stored values of all stocks, however
+    few a refresh touched: that is one GROUP BY, and it keeps the date's rows
+    complete and ranked against each other, since the last run of a day is
+    that day's history. Returns the number of rows written.
+    """
+    date = date or market_date(timezone.now())
+    universe = Stock.objects.all()
+    SectorStrength.objects.filter(date=date).delete()
+    IndustryGroupStrength.objects.filter(date=date).delete()
+    written = SectorStrength.objects.bulk_create([
+        SectorStrength(date=date, sector_id=row["sector"], **{name: row[name] for name in STRENGTH_FIELDS})
+        for row in _strength(universe, "sector")
+    ])
+    written += IndustryGroupStrength.objects.bulk_create([
+        IndustryGroupStrength(
+            date=date,
+            industry_group_id=row["industry_group"],
+            sector_id=row["sector"],
+            **{name: row[name] for name in STRENGTH_FIELDS},
         )
-        .order_by("-avg_rs")
+        for row in _strength(universe, "industry_group", "sector")
+    ])
+    rank_group_strength(SectorStrength, date)
+    rank_group_strength(IndustryGroupStrength, date)
+    return len(written)
+
+
+@receiver(refresh_finished)
+def record_strength_after_refresh(sender, **kwargs):
+    record_group_strength()
+
+
+def rank_group_strength(model, date):
+    """Number the ``model`` rows of ``date`` by avg_rs, strongest first; groups without one come last."""
+    rows = list(model.objects.filter(date=date).only("id", "avg_rs"))
+    rows.sort(key=lambda row: (row.avg_rs is None, -(row.avg_rs or 0), row.id))
+    for rank, row in enumerate(rows, 1):
+        row.rank = rank
+    model.objects.bulk_update(rows, ["rank"])
+
+
+def _latest_date(model, date=None):
+    rows = model.objects.all()
+    if date is not None:
+        rows = rows.filter(date__lte=date)
+    return rows.aggregate(latest=Max("date"))["latest"]
+
+
+def _rank_changes(model, key, names, days, date=None):
+    """
+    Pair each group's rank on the latest recorded date (on or before ``date``)
+    with its rank on the latest date at least ``days`` earlier.
+
+    Both dates are looked up through the date index, so the cost is two
+    index scans of one row per group however much history is stored.
+    """
+    latest = _latest_date(model, date)
+    if latest is None:
+        return []
+    previous = _latest_date(model, latest - timedelta(days=days))
+    if previous is None:
+        return []
+
+    def ranked(on):
+        rows = model.objects.filter(date=on, rank__isnull=False).values(*key, "rank", "avg_rs", **names)
+        return {tuple(row[k] for k in key): row for row in rows}
+
+    before = ranked(previous)
+    changes = []
+    for group, row in ranked(latest).items():
+        old = before.get(group)
+        if old is None:
+            continue
+        changes.append({
+            **{name: row[name] for name in names},
+            "rank": row["rank"],
+            "previous_rank": old["rank"],
+            "rank_change": old["rank"] - row["rank"],
+            "avg_rs": row["avg_rs"],
+            "previous_avg_rs": old["avg_rs"],
+            "date": latest,
+            "previous_date": previous,
+        })
+    return changes
+
+
+def _movers(changes, min_change=None, max_change=None, limit=None):
+    if min_change is not None:
+        changes = [change for change in changes if change["rank_change"] >= min_change]
+    if max_change is not None:
+        changes = [change for change in changes if change["rank_change"] <= max_change]
+    changes.sort(key=lambda change: (-change["rank_change"], change["rank"]))
+    return changes[:limit]
+
+
+def sector_rank_changes(days, date=None, min_change=None, max_change=None, limit=None):
+    """
+    Sectors by how many ranks they climbed over the last ``days``, biggest climbers first.
+
+    ``rank_change`` is positive for a sector that moved up; ``min_change`` and
+    ``max_change`` bound it (e.g. ``max_change=-3`` for the fallers only).
+    """
+    changes = _rank_changes(SectorStrength, ("sector",), {"sector_name": F("sector__name")}, days, date)
+    return _movers(changes, min_change, max_change, limit)
+
+
+def industry_group_rank_changes(days, date=None, min_change=None, max_change=None, limit=None):
+    """Industry groups by how many ranks they climbed over the last ``days``, like ``sector_rank_changes``."""
+    changes = _rank_changes(
+        IndustryGroupStrength,
+        ("industry_group", "sector"),
+        {"industry_group_name": F("industry_group__name"), "sector_name": F("sector__name")},
+        days,
+        date,
+    )
+    return _movers(changes, min_change, max_change, limit)
+
+
+def _ranked(rows):
+    """Number aggregated ``rows`` (already strongest first) the way stored rows are ranked."""
+    return [dict(row, rank=rank) for rank, row in enumerate(rows, 1)]
+
+
+def sector_strength(date=None):
+    """
+    Stored sector strength as of ``date`` (latest by default), strongest first.
+
+    Falls back to aggregating the stocks when nothing has been recorded yet.
+    """
+    latest = _latest_date(SectorStrength, date)
+    if latest is None:
+        return _ranked(rank_sectors()) if date is None else []
+    return (
+        SectorStrength.objects.filter(date=latest)
+        .values(*STRENGTH_FIELDS, "rank", sector_name=F("sector__name"))
+        .order_by("rank")
     )
-    return industry_stats
+
+
+def industry_group_strength(date=None):
+    """Stored industry group strength as of ``date`` (latest by default), strongest first."""
+    latest = _latest_date(IndustryGroupStrength, date)
+    if latest is None:
+        return _ranked(rank_industry_groups()) if date is None else []
+    return (
+        IndustryGroupStrength.objects.filter(date=latest)
+        .values(*STRENGTH_FIELDS, "rank", industry_group_name=F("industry_group__name"), sector_name=F("sector__name"))
+        .order_by("rank")
+    )
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+US equity market hours (NYSE/Nasdaq regular session). Exchange holidays are not known.
+"""
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+
+def is_market_open(now):
+    local = now.astimezone(MARKET_TZ)
+    return local.weekday() < 5 and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+
+def last_market_close(now):
+    """The most recent weekday 16:00 New York time at or before ``now``."""
+    local = now.astimezone(MARKET_TZ)
+    day = local.date() if local.time() >= MARKET_CLOSE else local.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return datetime.combine(day, MARKET_CLOSE, tzinfo=MARKET_TZ)
+
+
+def market_date(now):
+    """The trading day whose bars are current at ``now``: today once the session has opened, else the last one."""
+    local = now.astimezone(MARKET_TZ)
+    if local.weekday() < 5 and local.time() >= MARKET_OPEN:
+        return local.date()
+    return last_market_close(now).date()
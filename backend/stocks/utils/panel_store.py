@@ -0,0 +1,206 @@
+"""
+Columnar on-disk price panels shared between processes.
+
+Each interval's panel is a directory of ``.npy`` files, one 2D array
+(stocks × dates) per bar field plus the ``stock_ids``, ``symbols`` and ``dates``
+indexes. Panels are opened with ``mmap_mode="r"``, so every process reading
+the same panel shares its pages through the OS cache instead of loading its own
+copy of the bars, and slicing a date window is a view rather than a copy.
+
+Layout::
+
+    <PANEL_ROOT>/<interval>/<version>/{stock_ids,symbols,dates,close,high,low,volume,built_at}.npy
+    <PANEL_ROOT>/<interval>/CURRENT        name of the version readers should open
+
+A new version is written next to the old one and published by replacing
+``CURRENT``, so readers never see a half-written panel. The screener snapshot
+is published through the same helpers.
+
+Panels are not rebuilt by refreshes. ``built_at`` records when a panel started
+loading its bars, and ``is_current`` tells whether any stock's bars have been
+written since then (``Stock.bars_updated_at``).
+"""
+import os
+import shutil
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from stocks.models import PriceBar, Stock
+
+PANEL_FIELDS = ("high", "low", "close", "volume")
+INDEX_FILES = ("stock_ids", "symbols", "dates")
+
+# Versions kept on disk, so processes still reading the previous one are not cut off.
+KEEP_VERSIONS = 2
+
+_open_panels = {}
+_lock = threading.Lock()
+
+
+class PricePanel:
+    """Bars for many stocks as 2D arrays (stocks × dates), NaN where a stock has no bar."""
+
+    def __init__(self, stock_ids, dates, built_at=None, **fields):
+        self.stock_ids = stock_ids
+        self.dates = dates
+        self.built_at = built_at
+        for name, values in fields.items():
+            setattr(self, name, values)
+
+
+def load_panel(stock_ids, interval=PriceBar.DAILY, start=None, dtype=np.float64):
+    """Load stored bars for ``stock_ids`` (sorted) into a PricePanel."""
+    bars = PriceBar.objects.filter(stock_id__in=stock_ids.tolist(), interval=interval)
+    if start is not None:
+        bars = bars.filter(date__gte=start)
+    rows = list(bars.values_list("stock_id", "date", *PANEL_FIELDS))
+
+    if rows:
+        ids, row_dates, *columns = zip(*rows)
+    else:
+        ids, row_dates, columns = (), (), [() for _ in PANEL_FIELDS]
+    dates, col_idx = np.unique(np.array(row_dates, dtype="datetime64[D]"), return_inverse=True)
+    row_idx = np.searchsorted(stock_ids, np.array(ids, dtype=stock_ids.dtype))
+
+    fields = {}
+    for name, values in zip(PANEL_FIELDS, columns):
+        panel = np.full((len(stock_ids), len(dates)), np.nan, dtype=dtype)
+        panel[row_idx, col_idx] = np.array(values, dtype=dtype)
+        fields[name] = panel
+    return PricePanel(stock_ids, dates, **fields)
+
+
+def panel_root():
+    return settings.PRICE_DATA["PANEL_ROOT"]
+
+
+def current_directory(base):
+    """Return the version directory ``base/CURRENT`` points at, or None if nothing was published there."""
+    try:
+        with open(os.path.join(base, "CURRENT")) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(base, version)
+
+
+def current_version(interval, root=None):
+    """Return the directory of the published panel for ``interval``, or None if there is none."""
+    return current_directory(os.path.join(root or panel_root(), interval))
+
+
+def write_arrays(arrays, directory):
+    """Save ``{name: array}`` as one ``.npy`` file per array."""
+    os.makedirs(directory)
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), values)
+
+
+def read_arrays(directory, names=None):
+    """Open the ``.npy`` files of a directory (all of them, or ``names``) memory-mapped and read-only."""
+    if names is None:
+        names = [file[:-4] for file in os.listdir(directory) if file.endswith(".npy")]
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in names}
+
+
+def publish_arrays(arrays, base):
+    """Write ``arrays`` as a new version under ``base``, switch ``CURRENT`` to it and prune old versions."""
+    version = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+    write_arrays(arrays, os.path.join(base, version))
+
+    pointer = os.path.join(base, "CURRENT")
+    with open(f"{pointer}.{os.getpid()}", "w") as f:
+        f.write(version)
+    os.replace(f"{pointer}.{os.getpid()}", pointer)
+
+    versions = sorted(name for name in os.listdir(base) if os.path.isdir(os.path.join(base, name)))
+    for old in versions[:-KEEP_VERSIONS]:
+        # Pages already mapped by readers stay valid after the files are unlinked.
+        shutil.rmtree(os.path.join(base, old), ignore_errors=True)
+    return os.path.join(base, version)
+
+
+def read_panel(directory):
+    """Open a panel directory memory-mapped and read-only."""
+    arrays = read_arrays(directory, INDEX_FILES + PANEL_FIELDS)
+    built_at = None
+    if os.path.exists(os.path.join(directory, "built_at.npy")):
+        microseconds = int(np.load(os.path.join(directory, "built_at.npy"))[0])
+        built_at = datetime.fromtimestamp(microseconds / 1_000_000, dt_timezone.utc)
+    return PricePanel(arrays.pop("stock_ids"), arrays.pop("dates"), built_at, **arrays)
+
+
+def publish_panel(panel, interval, root=None):
+    """Write ``panel`` (with a ``symbols`` index) as the new version for ``interval`` and switch readers to it."""
+    arrays = {name: getattr(panel, name) for name in INDEX_FILES + PANEL_FIELDS}
+    if panel.built_at is not None:
+        arrays["built_at"] = np.array([round(panel.built_at.timestamp() * 1_000_000)], dtype=np.int64)
+    return publish_arrays(arrays, os.path.join(root or panel_root(), interval))
+
+
+def is_current(panel):
+    """Whether no stock's bars have been written since ``panel`` was built, so it still holds the stored ones."""
+    if panel.built_at is None:
+        return False
+    return not Stock.objects.filter(bars_updated_at__gte=panel.built_at).exists()
+
+
+def build_panel(interval=PriceBar.DAILY, years=5, dtype=np.float64, root=None):
+    """Load every stock's stored bars for the last ``years`` from the database and publish them as a panel."""
+    # Taken before the bars are read, so bars written during the build make the panel stale.
+    built_at = timezone.now()
+    stock_ids = np.sort(np.fromiter(Stock.objects.values_list("id", flat=True), dtype=np.int64))
+    start = (pd.Timestamp.today().normalize() - pd.DateOffset(years=years)).date()
+    panel = load_panel(stock_ids, interval, start=start, dtype=dtype)
+    panel.built_at = built_at
+
+    symbols = Stock.objects.in_bulk(stock_ids.tolist())
+    panel.symbols = np.array([symbols[stock_id].symbol for stock_id in stock_ids.tolist()], dtype=str)
+    return publish_panel(panel, interval, root)
+
+
+def open_panel(interval=PriceBar.DAILY, root=None):
+    """
+    Return the published panel for ``interval``, or None when none has been built.
+
+    The mapping is reused within a process until a newer version is published.
+    """
+    directory = current_version(interval, root)
+    if directory is None:
+        return None
+    with _lock:
+        cached = _open_panels.get(interval)
+        if cached is None or cached[0] != directory:
+            cached = (directory, read_panel(directory))
+            _open_panels[interval] = cached
+        return cached[1]
+
+
+def panel_window(panel, stock_ids, start=None, dtype=np.float64):
+    """
+    Cut the rows for ``stock_ids`` (sorted) and the dates from ``start`` out of a shared panel.
+
+    Stocks missing from the panel get all-NaN rows, like ``load_panel`` gives
+    stocks without bars. For the whole universe in the panel's own dtype the
+    fields are views of the mapping, not copies; a subset of stocks is copied.
+    """
+    columns = slice(None) if start is None else slice(np.searchsorted(panel.dates, np.datetime64(start, "D")), None)
+    dates = np.asarray(panel.dates[columns])
+
+    if len(panel.stock_ids) and np.array_equal(panel.stock_ids, stock_ids):
+        fields = {name: np.asarray(getattr(panel, name)[:, columns], dtype=dtype) for name in PANEL_FIELDS}
+        return PricePanel(stock_ids, dates, **fields)
+
+    rows = np.searchsorted(panel.stock_ids, stock_ids).clip(max=max(len(panel.stock_ids) - 1, 0))
+    found = panel.stock_ids[rows] == stock_ids if len(panel.stock_ids) else np.zeros(len(stock_ids), dtype=bool)
+    fields = {}
+    for name in PANEL_FIELDS:
+        values = np.full((len(stock_ids), len(dates)), np.nan, dtype=dtype)
+        values[found] = getattr(panel, name)[rows[found], columns]
+        fields[name] = values
+    return PricePanel(stock_ids, dates, **fields)
@@ -1,34 +1,143 @@
-import yfinance as yf
+import csv
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 from stocks.models import Stock, Sector, IndustryGroup
+from stocks.utils.fundamentals import cached_infos, fundamentals_ttl, store_infos
+from stocks.utils.providers import get_provider
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = "Unknown"
+
 
-def populate_stocks(symbols):
+def read_symbols_csv(path, column="symbol"):
     """
-    Fetches sector and industry data for given stock symbols and saves them to the database.
+    Read symbols from a CSV file, from the ``column`` column if the file has a
+    header with that name and from the first column otherwise.
+    """
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+    header = [name.strip().lower() for name in rows[0]]
+    if column.lower() in header:
+        index, rows = header.index(column.lower()), rows[1:]
+    else:
+        index = 0
+    return [row[index].strip().upper() for row in rows if len(row) > index and row[index].strip()]
+
+
+def fetch_infos(symbols, provider=None, workers=8):
+    """
+    Company info for ``symbols``: cached fundamentals younger than the TTL, the
+    rest fetched concurrently (within the provider's rate limit) and cached.
+
+    Symbols whose info could not be fetched are left out.
     """
-    for symbol in symbols:
+    provider = provider or get_provider()
+    infos = cached_infos(symbols, max_age=fundamentals_ttl())
+    missing = [symbol for symbol in symbols if symbol not in infos]
+    logger.info("%d symbols have cached fundamentals, fetching %d", len(infos), len(missing))
+
+    def fetch(symbol):
         try:
-            stock_info = yf.Ticker(symbol).info
-            sector_name = stock_info.get("sector", "Unknown")
-            industry_name = stock_info.get("industry", "Unknown")
-            company_name = stock_info.get("longName", symbol)
+            return symbol, provider.info(symbol)
+        except Exception as e:
+            logger.warning("Fetching info for %s failed: %s", symbol, e)
+            return symbol, None
+
+    fetched = {}
+    provider.ensure_pool_size(workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for done, (symbol, info) in enumerate(executor.map(fetch, missing), 1):
+            if info is not None:
+                fetched[symbol] = info
+            if done % 100 == 0:
+                logger.info("Fetched info for %d/%d symbols", done, len(missing))
+    infos.update(store_infos(fetched))
+    return infos
+
 
-            # Get or create the sector
-            sector, _ = Sector.objects.get_or_create(name=sector_name)
+class GroupCache:
+    """In-memory name → Sector/IndustryGroup lookup that creates missing ones in bulk."""
 
-            # Get or create the industry group
-            industry_group, _ = IndustryGroup.objects.get_or_create(name=industry_name, sector=sector)
+    def __init__(self):
+        self.sectors = {sector.name: sector for sector in Sector.objects.all()}
+        self.groups = {group.name: group for group in IndustryGroup.objects.all()}
 
-            # Create the stock entry
-            Stock.objects.update_or_create(
-                symbol=symbol,
-                defaults={"name": company_name, "sector": sector, "industry_group": industry_group},
+    def resolve(self, infos):
+        """Make sure every sector and industry named in ``infos`` exists."""
+        sector_names = {info.get("sector", UNKNOWN) for info in infos.values()}
+        new_sectors = sector_names - set(self.sectors)
+        if new_sectors:
+            Sector.objects.bulk_create([Sector(name=name) for name in new_sectors], ignore_conflicts=True)
+            self.sectors.update((sector.name, sector) for sector in Sector.objects.filter(name__in=new_sectors))
+
+        # Industry names are unique, so an industry keeps the sector it was first created under.
+        new_groups = {}
+        for info in infos.values():
+            name = info.get("industry", UNKNOWN)
+            if name not in self.groups:
+                new_groups.setdefault(name, self.sectors[info.get("sector", UNKNOWN)])
+        if new_groups:
+            IndustryGroup.objects.bulk_create(
+                [IndustryGroup(name=name, sector=sector) for name, sector in new_groups.items()],
+                ignore_conflicts=True,
             )
-            print(f"Added: {symbol} - {company_name}")
+            self.groups.update((group.name, group) for group in IndustryGroup.objects.filter(name__in=new_groups))
+        return len(new_sectors), len(new_groups)
 
-        except Exception as e:
-            print(f"Error processing {symbol}: {e}")
+
+def onboard_stocks(symbols, provider=None, batch_size=500, workers=8):
+    """
+    Add or update many stocks with their name, sector and industry group.
+
+    Sectors and industry groups are resolved through an in-memory cache and
+    created in bulk, and stocks are upserted in batches, so onboarding costs a
+    handful of queries per batch instead of several per symbol. Returns the
+    number of stocks written.
+    """
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+    infos = fetch_infos(symbols, provider, workers)
+    failed = len(symbols) - len(infos)
+    if failed:
+        logger.warning("Skipping %d symbols without company info", failed)
+
+    cache = GroupCache()
+    new_sectors, new_groups = cache.resolve(infos)
+    logger.info("Created %d sectors and %d industry groups", new_sectors, new_groups)
+
+    written = 0
+    onboarded = [symbol for symbol in symbols if symbol in infos]
+    for start in range(0, len(onboarded), batch_size):
+        batch = onboarded[start:start + batch_size]
+        Stock.objects.bulk_create(
+            [
+                Stock(
+                    symbol=symbol,
+                    name=infos[symbol].get("longName", symbol)[:100],
+                    sector=cache.sectors[infos[symbol].get("sector", UNKNOWN)],
+                    industry_group=cache.groups[infos[symbol].get("industry", UNKNOWN)],
+                )
+                for symbol in batch
+            ],
+            update_conflicts=True,
+            unique_fields=["symbol"],
+            update_fields=["name", "sector", "industry_group"],
+        )
+        written += len(batch)
+        logger.info("Onboarded %d/%d stocks", written, len(onboarded))
+    return written
+
+
+def populate_stocks(symbols, provider=None):
+    """
+    Fetches sector and industry data for given stock symbols and saves them to the database.
+    """
+    return onboard_stocks(symbols, provider=provider)
 
 # Example usage
 def populate_example_stocks():
     stock_list = ["AAPL", "MSFT", "GOOGL", "TSLA", "NVDA", "AMZN"]
-    populate_stocks(stock_list)
+    populate_stocks(stock_list)
\ No newline at end of file
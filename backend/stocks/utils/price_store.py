@@ -0,0 +1,175 @@
+from datetime import timedelta
+
+import pandas as pd
+
+from django.utils import timezone
+
+from stocks.models import IndicatorState, PriceBar, Stock
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Daily history kept for a stock when its bars are (re)loaded; weekly SMA_200
+# is rolled up from it and needs about four years.
+HISTORY_PERIOD = "5y"
+
+# Weekly bars are labelled with the week's Monday and monthly bars with the
+# first of the month, the same way yfinance labels them.
+RESAMPLE_RULES = {
+    PriceBar.WEEKLY: "W-MON",
+    PriceBar.MONTHLY: "MS",
+}
+
+
+def load_bars(stock, interval=PriceBar.DAILY, start=None):
+    """Load stored bars as a DataFrame shaped like ``Ticker.history`` output."""
+    bars = PriceBar.objects.filter(stock=stock, interval=interval)
+    if start is not None:
+        bars = bars.filter(date__gte=start)
+
+    rows = bars.order_by("date").values_list("date", "open", "high", "low", "close", "volume")
+    df = pd.DataFrame.from_records(list(rows), columns=["Date"] + BAR_COLUMNS)
+    df.index = pd.DatetimeIndex(df.pop("Date"), name="Date")
+    return df
+
+
+def append_bars(stock, interval, df):
+    """
+    Insert new bars and overwrite any that were already stored for the same date.
+
+    Marks the stock's ``bars_updated_at``, which published panels are checked against.
+    """
+    df = df.dropna(subset=["Close"])
+    bars = [
+        PriceBar(
+            stock=stock,
+            interval=interval,
+            date=timestamp.date(),
+            open=float(row["Open"]),
+            high=float(row["High"]),
+            low=float(row["Low"]),
+            close=float(row["Close"]),
+            volume=int(row["Volume"]) if not pd.isna(row["Volume"]) else 0,
+        )
+        for timestamp, row in df.iterrows()
+    ]
+    PriceBar.objects.bulk_create(
+        bars,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["stock", "interval", "date"],
+        update_fields=["open", "high", "low", "close", "volume"],
+    )
+    if bars:
+        Stock.objects.filter(pk=stock.pk).update(bars_updated_at=timezone.now())
+    return len(bars)
+
+
+def sync_point(stock, interval=PriceBar.DAILY):
+    """
+    Return ``(date, close)`` of the stored bar a sync resumes from, or None to fetch the full period.
+
+    The newest stored bar is re-fetched because it may have been written
+    mid-session, so syncing resumes from the one before it.
+    """
+    stored = list(
+        PriceBar.objects.filter(stock=stock, interval=interval)
+        .order_by("-date")
+        .values_list("date", "close")[:2]
+    )
+    return stored[1] if len(stored) == 2 else None
+
+
+def download_bars(provider, symbol, resume=None, interval=PriceBar.DAILY, period="1y"):
+    """
+    Download the bars a sync needs from ``provider`` without touching the database.
+
+    Returns ``(df, full)``. ``full`` is True when the whole period was downloaded,
+    either because nothing was stored (``resume`` is None) or because the resume
+    bar no longer matches, which means the history was re-adjusted for a split
+    or dividend and the stored bars are stale.
+    """
+    if resume is None:
+        return provider.history(symbol, period=period, interval=interval), True
+
+    resume_date, resume_close = resume
+    df = provider.history(symbol, interval=interval, start=resume_date)
+    if df.empty:
+        return df, False
+
+    first_close = float(df["Close"].iloc[0])
+    if df.index[0].date() != resume_date or abs(first_close - resume_close) > 1e-4 * abs(resume_close):
+        return provider.history(symbol, period=period, interval=interval), True
+    return df, False
+
+
+def store_bars(stock, interval, df, full=False):
+    """
+    Write downloaded bars, replacing the stored ones when ``full`` is set.
+
+    New daily bars are rolled up into the weekly and monthly bars they belong to.
+    Replacing the daily history also drops the stock's ``IndicatorState``, whose
+    running sums were built from the old prices. Returns True if the stored
+    history was replaced.
+    """
+    if df.empty:
+        return False
+    if full:
+        stale = PriceBar.objects.filter(stock=stock)
+        if interval != PriceBar.DAILY:
+            stale = stale.filter(interval=interval)
+        else:
+            IndicatorState.objects.filter(stock=stock).delete()
+        stale.delete()
+    append_bars(stock, interval, df)
+    if interval == PriceBar.DAILY:
+        rollup_bars(stock, since=df.index[0].date())
+    return full
+
+
+def sync_bars(stock, provider, interval=PriceBar.DAILY, period="1y"):
+    """
+    Bring the stored bars for a stock up to date.
+
+    Only bars from the last complete stored bar onwards are downloaded; see
+    ``download_bars`` for how re-adjusted histories are detected. Returns the
+    bars that were fetched and whether they replaced the stored history.
+    """
+    df, full = download_bars(provider, stock.symbol, sync_point(stock, interval), interval, period)
+    return df, store_bars(stock, interval, df, full)
+
+
+def period_start(bar_date, interval):
+    """First day of the weekly or monthly period containing ``bar_date``."""
+    if interval == PriceBar.WEEKLY:
+        return bar_date - timedelta(days=bar_date.weekday())
+    return bar_date.replace(day=1)
+
+
+def resample_bars(df, interval):
+    """Roll daily bars up to weekly or monthly OHLCV bars."""
+    bars = df[BAR_COLUMNS].resample(RESAMPLE_RULES[interval], label="left", closed="left").agg({
+        "Open": "first",
+        "High": "max",
+        "Low": "min",
+        "Close": "last",
+        "Volume": "sum",
+    })
+    return bars.dropna(subset=["Close"])
+
+
+def rollup_bars(stock, since=None):
+    """
+    Rebuild a stock's weekly and monthly bars from its stored daily bars.
+
+    Only periods from the one containing ``since`` onwards are rewritten, so
+    appending a day of bars touches one weekly and one monthly row.
+    """
+    for interval in RESAMPLE_RULES:
+        if since is None:
+            PriceBar.objects.filter(stock=stock, interval=interval).delete()
+            start = None
+        else:
+            start = period_start(since, interval)
+        daily = load_bars(stock, PriceBar.DAILY, start=start)
+        if not daily.empty:
+            append_bars(stock, interval, resample_bars(daily, interval))
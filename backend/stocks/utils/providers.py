@@ -0,0 +1,216 @@
+import json
+import os
+
+import pandas as pd
+import requests
+import yfinance as yf
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from stocks.utils.price_store import BAR_COLUMNS
+from stocks.utils.rate_limit import RateLimiter
+
+PERIOD_UNITS = {
+    "d": "days",
+    "wk": "weeks",
+    "mo": "months",
+    "y": "years",
+}
+
+
+def period_offset(period):
+    """Convert a yfinance-style period ("6mo", "1y", "5d") to a DateOffset, or None for "max"."""
+    if period == "max":
+        return None
+    for suffix, unit in PERIOD_UNITS.items():
+        amount = period[:-len(suffix)]
+        if period.endswith(suffix) and amount.isdigit():
+            return pd.DateOffset(**{unit: int(amount)})
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def pooled_session(pool_size):
+    """A requests session that keeps up to ``pool_size`` connections per host alive for reuse."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class PriceDataProvider:
+    """Source of price history and company info for the refresh pipeline."""
+
+    # Upstream calls per second allowed when settings do not say otherwise.
+    default_rate_limit = None
+
+    def __init__(self, rate_limit=None):
+        rate_limit = rate_limit or self.default_rate_limit
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    def throttle(self):
+        """Wait until the provider's rate limit allows another upstream call."""
+        if self.limiter is not None:
+            self.limiter.acquire()
+
+    def ensure_pool_size(self, size):
+        """Prepare for ``size`` concurrent calls; providers without connections ignore it."""
+
+    def history(self, symbol, period="1y", interval="1d", start=None):
+        """
+        Return OHLCV bars for a symbol, oldest first, indexed by timestamp.
+
+        ``start`` takes precedence over ``period`` when both are given.
+        """
+        raise NotImplementedError
+
+    def bulk_history(self, symbols, period="1y", interval="1d", start=None):
+        """Return ``{symbol: DataFrame}`` for several symbols."""
+        return {
+            symbol: self.history(symbol, period=period, interval=interval, start=start)
+            for symbol in symbols
+        }
+
+    def info(self, symbol):
+        """Return company metadata (``longName``, ``sector``, ``industry``, ...)."""
+        raise NotImplementedError
+
+
+class YFinanceProvider(PriceDataProvider):
+    """Fetches data from Yahoo Finance through yfinance."""
+
+    default_rate_limit = 10
+
+    def __init__(self, rate_limit=None, pool_size=20):
+        super().__init__(rate_limit)
+        # One pooled session shared by every call, instead of yfinance's default
+        # pool of 10, which drops connections as soon as more workers are running.
+        self.pool_size = pool_size
+        self.session = pooled_session(pool_size)
+
+    def ensure_pool_size(self, size):
+        if size > self.pool_size:
+            self.pool_size = size
+            self.session = pooled_session(size)
+
+    def history(self, symbol, period="1y", interval="1d", start=None):
+        self.throttle()
+        window = {"start": start} if start is not None else {"period": period}
+        return yf.Ticker(symbol, session=self.session).history(interval=interval, auto_adjust=True, actions=False, **window)
+
+    def bulk_history(self, symbols, period="1y", interval="1d", start=None):
+        self.throttle()
+        window = {"start": start} if start is not None else {"period": period}
+        data = yf.download(
+            list(symbols),
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,
+            actions=False,
+            progress=False,
+            session=self.session,
+            **window,
+        )
+        downloaded = set(data.columns.get_level_values(0)) if not data.empty else set()
+        return {
+            symbol: data[symbol].dropna(how="all") if symbol in downloaded else pd.DataFrame(columns=BAR_COLUMNS)
+            for symbol in symbols
+        }
+
+    def info(self, symbol):
+        self.throttle()
+        return yf.Ticker(symbol, session=self.session).info
+
+
+class LocalFileProvider(PriceDataProvider):
+    """
+    Reads bars from a directory of files, for offline tests and benchmarks.
+
+    Layout::
+
+        <root>/<interval>/<SYMBOL>.parquet   (or .csv, indexed by date)
+        <root>/info.json                     {"<SYMBOL>": {"longName": ..., ...}}
+
+    Periods are measured back from the newest bar in each file rather than from
+    today, so a fixture directory gives the same results whenever it is read.
+    Parquet files need pyarrow installed; CSV works with plain pandas.
+    """
+
+    def __init__(self, root, rate_limit=None):
+        super().__init__(rate_limit)
+        self.root = root
+        self._info = None
+
+    def _path(self, symbol, interval, extension):
+        return os.path.join(self.root, interval, f"{symbol}.{extension}")
+
+    def _read(self, symbol, interval):
+        parquet_path = self._path(symbol, interval, "parquet")
+        if os.path.exists(parquet_path):
+            return pd.read_parquet(parquet_path)
+        csv_path = self._path(symbol, interval, "csv")
+        if os.path.exists(csv_path):
+            return pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+
+    def history(self, symbol, period="1y", interval="1d", start=None):
+        self.throttle()
+        df = self._read(symbol, interval)
+        if df.empty:
+            return df
+
+        if start is not None:
+            cutoff = pd.Timestamp(start)
+            if df.index.tz is not None:
+                cutoff = cutoff.tz_localize(df.index.tz)
+        else:
+            offset = period_offset(period)
+            if offset is None:
+                return df
+            cutoff = df.index[-1] - offset
+        return df[df.index >= cutoff]
+
+    def info(self, symbol):
+        if self._info is None:
+            info_path = os.path.join(self.root, "info.json")
+            if os.path.exists(info_path):
+                with open(info_path) as f:
+                    self._info = json.load(f)
+            else:
+                self._info = {}
+        return self._info.get(symbol, {})
+
+    def write_history(self, symbol, df, interval="1d", file_format="parquet"):
+        """Store bars for a symbol, e.g. to build a fixture directory."""
+        os.makedirs(os.path.join(self.root, interval), exist_ok=True)
+        path = self._path(symbol, interval, file_format)
+        if file_format == "parquet":
+            df[BAR_COLUMNS].to_parquet(path)
+        else:
+            df[BAR_COLUMNS].to_csv(path)
+
+
+PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "local": LocalFileProvider,
+}
+
+_provider = None
+
+
+def build_provider(config):
+    """Instantiate the provider described by a ``PRICE_DATA`` style dict."""
+    name = config.get("PROVIDER", "yfinance")
+    provider_class = PROVIDERS[name] if name in PROVIDERS else import_string(name)
+    rate_limit = config.get("RATE_LIMIT")
+    if provider_class is LocalFileProvider:
+        return provider_class(config["LOCAL_ROOT"], rate_limit=rate_limit)
+    return provider_class(rate_limit=rate_limit)
+
+
+def get_provider():
+    """Return the process-wide provider configured in ``settings.PRICE_DATA``."""
+    global _provider
+    if _provider is None:
+        _provider = build_provider(getattr(settings, "PRICE_DATA", {}))
+    return _provider
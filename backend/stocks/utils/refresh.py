@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connection, connections
+
+from stocks.models import Stock
+from stocks.signals import refresh_finished
+from stocks.utils import providers
+from stocks.utils.benchmarks import clear_benchmark_cache
+from stocks.utils.bulk_writer import IndicatorWriter
+from stocks.utils.data_fetcher import fetch_stock_data
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshSummary:
+    """Outcome of a refresh run: what failed and how fast it went."""
+
+    def __init__(self, total):
+        self.total = total
+        self.failures = {}
+        self.skipped = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def succeeded(self):
+        return self.total - len(self.failures)
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self):
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+
+def refresh_one(symbol, writer, retries=3, backoff=1.0, incremental=False):
+    """Refresh one stock into ``writer``, retrying with exponential backoff. Returns an error message or None."""
+    for attempt in range(retries + 1):
+        try:
+            fetch_stock_data(symbol, incremental=incremental, writer=writer)
+            return None
+        except Exception as e:
+            if attempt == retries:
+                return f"{type(e).__name__}: {e}"
+            delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            logger.warning("Refreshing %s failed (%s), retrying in %.1fs", symbol, e, delay)
+            time.sleep(delay)
+
+
+def refresh_chunk(symbols, retries=3, backoff=1.0, incremental=False):
+    """
+    Refresh a chunk of stocks and write their rows in one batch.
+
+    Returns ``{symbol: error}`` for the stocks that could not be refreshed and
+    the number of stocks whose values had not changed.
+    """
+    failures = {}
+    writer = None
+    try:
+        with IndicatorWriter(batch_size=len(symbols)) as writer:
+            for symbol in symbols:
+                error = refresh_one(symbol, writer, retries, backoff, incremental)
+                if error:
+                    failures[symbol] = error
+    except Exception as e:
+        for symbol in symbols:
+            failures.setdefault(symbol, f"{type(e).__name__}: {e}")
+    finally:
+        # Worker threads outlive the task, so give the connection back explicitly.
+        connection.close()
+    return failures, writer.skipped if writer else 0
+
+
+def send_refresh_finished(sender, symbols, summary, whole_universe=False):
+    """
+    Send ``refresh_finished`` for a run over ``symbols`` if any of them was refreshed.
+
+    ``stock_ids`` are the stocks that did not fail, or None when ``whole_universe``
+    says the run covered every stock, so receivers only redo what the run touched.
+    """
+    if not summary.succeeded:
+        return
+    stock_ids = None
+    if not whole_universe:
+        refreshed = [symbol for symbol in symbols if symbol not in summary.failures]
+        stock_ids = list(Stock.objects.filter(symbol__in=refreshed).values_list("id", flat=True))
+    refresh_finished.send(sender=sender, stock_ids=stock_ids)
+
+
+def _init_worker_process(config):
+    providers._provider = providers.build_provider(config)
+
+
+def _executor(workers, use_processes):
+    if not use_processes:
+        providers.get_provider().ensure_pool_size(workers)
+        return ThreadPoolExecutor(max_workers=workers)
+
+    # Each process gets its own provider; split the rate limit so the total stays within it.
+    config = dict(getattr(settings, "PRICE_DATA", {}))
+    rate_limit = providers.get_provider().limiter.rate if providers.get_provider().limiter else None
+    config["RATE_LIMIT"] = rate_limit / workers if rate_limit else None
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker_process,
+        initargs=(config,),
+    )
+
+
+def refresh_stocks(symbols, workers=8, use_processes=False, retries=3, backoff=1.0, incremental=False,
+                   chunk_size=50, whole_universe=False):
+    """
+    Refresh many stocks concurrently and return a RefreshSummary.
+
+    Stocks are handed to workers in chunks of ``chunk_size``, each written back
+    in one batch. Threads suit the network-bound default; ``use_processes``
+    forks worker processes instead when computation becomes the bottleneck.
+    ``refresh_finished`` is sent once the run is done, with the refreshed
+    stocks' ids unless ``whole_universe`` says ``symbols`` are every stock.
+    """
+    clear_benchmark_cache()
+    summary = RefreshSummary(len(symbols))
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+
+    with _executor(workers, use_processes) as executor:
+        futures = {
+            executor.submit(refresh_chunk, chunk, retries, backoff, incremental): chunk
+            for chunk in chunks
+        }
+        done = 0
+        for future in as_completed(futures):
+            failures, skipped = future.result()
+            summary.skipped += skipped
+            for symbol, error in failures.items():
+                logger.error("Giving up on %s: %s", symbol, error)
+            summary.failures.update(failures)
+            done += len(futures[future])
+            logger.info("Refreshed %d/%d stocks (%.1f/s)", done, summary.total, done / summary.elapsed)
+
+    send_refresh_finished(refresh_stocks, symbols, summary, whole_universe)
+    summary.finished = time.monotonic()
+    return summary
@@ -0,0 +1,130 @@
+"""
+Saved screens: predicate trees over the indicator columns of ``Stock``.
+
+A definition is a JSON tree of::
+
+    {"and": [<node>, ...]}        all children match
+    {"or": [<node>, ...]}         any child matches
+    {"not": <node>}               the child does not match
+    {"field": "RSI_14", "op": "between", "value": [55, 70]}
+    {"field": "current_price", "op": "gt", "value": {"field": "SMA_50"}}
+    {"field": "SMA_200", "op": "eq", "value": null}   the column is NULL
+
+It compiles to one ``Q``, so a screen is a single SQL query on ``Stock``
+(whose screened columns are indexed) and a page of its stocks one more with a
+``LIMIT``; pages are always read live. Only the result ids the stock count is
+taken from are cached until the next refresh run, keyed by the latest
+``RefreshRun`` (one primary key lookup per read), so every process drops them
+together.
+"""
+from django.core.cache import cache
+from django.db.models import F, Max, Q
+from django.dispatch import receiver
+
+from stocks.models import INDICATOR_FIELDS, RefreshRun, Stock
+from stocks.signals import refresh_finished
+
+SCREEN_FIELDS = INDICATOR_FIELDS + ["sector", "industry_group"]
+
+# Entries are keyed by refresh generation, so they are never stale; this only bounds their lifetime.
+CACHE_SECONDS = 24 * 60 * 60
+
+OPERATORS = {
+    "eq": "exact",
+    "gt": "gt",
+    "gte": "gte",
+    "lt": "lt",
+    "lte": "lte",
+    "between": "range",
+    "in": "in",
+}
+
+
+class InvalidScreen(ValueError):
+    pass
+
+
+def _operand(value):
+    if isinstance(value, dict):
+        if set(value) != {"field"} or value["field"] not in INDICATOR_FIELDS:
+            raise InvalidScreen(f"Invalid column reference {value!r}")
+        return F(value["field"])
+    if value is None:
+        raise InvalidScreen("Only 'eq' takes null")
+    if isinstance(value, (bool, int, float)):
+        return value
+    raise InvalidScreen(f"Invalid value {value!r}")
+
+
+def compile_screen(node):
+    """Compile a definition tree to a Q, raising InvalidScreen for anything malformed."""
+    if not isinstance(node, dict):
+        raise InvalidScreen(f"Expected an object, got {node!r}")
+    if "and" in node or "or" in node:
+        children = node.get("and", node.get("or"))
+        if len(node) != 1 or not isinstance(children, list) or not children:
+            raise InvalidScreen("'and'/'or' take a non-empty list of conditions")
+        compiled = [compile_screen(child) for child in children]
+        q = compiled[0]
+        for child in compiled[1:]:
+            q = q & child if "and" in node else q | child
+        return q
+    if "not" in node:
+        if len(node) != 1:
+            raise InvalidScreen("'not' takes a single condition")
+        return ~compile_screen(node["not"])
+
+    field, op, value = node.get("field"), node.get("op"), node.get("value")
+    if set(node) != {"field", "op", "value"}:
+        raise InvalidScreen(f"A condition has exactly field, op and value: {node!r}")
+    if field not in SCREEN_FIELDS:
+        raise InvalidScreen(f"Unknown field {field!r}")
+    if op not in OPERATORS:
+        raise InvalidScreen(f"Unknown operator {op!r}")
+    if value is None:
+        # NULL never compares; "eq" null is the one condition that can match it.
+        if op != "eq":
+            raise InvalidScreen("Only 'eq' takes null")
+        return Q(**{f"{field}__isnull": True})
+    if op == "between":
+        if not isinstance(value, list) or len(value) != 2:
+            raise InvalidScreen("'between' takes [low, high]")
+        value = [_operand(bound) for bound in value]
+    elif op == "in":
+        if not isinstance(value, list):
+            raise InvalidScreen("'in' takes a list")
+        value = [_operand(item) for item in value]
+    else:
+        value = _operand(value)
+    return Q(**{f"{field}__{OPERATORS[op]}": value})
+
+
+def validate_order_by(order_by):
+    if order_by and order_by.lstrip("-") not in INDICATOR_FIELDS + ["symbol"]:
+        raise InvalidScreen(f"Cannot order by {order_by!r}")
+    return order_by
+
+
+def screen_queryset(screen):
+    return Stock.objects.filter(compile_screen(screen.definition)).order_by(screen.order_by or "symbol", "id")
+
+
+def refresh_generation():
+    return RefreshRun.objects.aggregate(latest=Max("id"))["latest"] or 0
+
+
+def screen_ids(screen):
+    """Ids of the stocks matching ``screen``, from the cache unless a refresh ran or the screen changed since."""
+    if not hasattr(screen, "_screen_ids"):
+        key = f"saved-screen:{screen.pk}:{screen.updated_at.timestamp()}:{refresh_generation()}"
+        ids = cache.get(key)
+        if ids is None:
+            ids = list(screen_queryset(screen).values_list("id", flat=True))
+            cache.set(key, ids, timeout=CACHE_SECONDS)
+        screen._screen_ids = ids
+    return screen._screen_ids
+
+
+@receiver(refresh_finished)
+def record_refresh_run(sender, stock_ids=None, **kwargs):
+    RefreshRun.objects.create(stock_count=None if stock_ids is None else len(stock_ids))
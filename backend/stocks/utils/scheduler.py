@@ -0,0 +1,135 @@
+"""
+Market-hours-aware refresh scheduling.
+
+Stocks users are looking at (in a stock list, or with a note or evaluation
+touched recently) are refreshed every ``PRIORITY_INTERVAL`` while the market
+is open, the rest of the universe every ``UNIVERSE_INTERVAL``. Outside market
+hours a stock is only refreshed if it has not been refreshed since the last
+close. Each run refreshes at most ``MAX_STOCKS_PER_RUN`` stocks, watched ones
+first and then the stalest, so the provider quota goes where it matters.
+Off-hours runs with nothing due spend it on re-fetching expired fundamentals.
+
+Due-ness goes by ``Stock.refreshed_at``, which every refresh sets, rather than
+``updated_at``, which only changes with the values: a halted stock, or any
+stock over a weekend, would otherwise be due again on every tick.
+
+Exchange holidays are not known; on a holiday the open-hours intervals apply.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from stocks.models import Stock, StockList
+from stocks.utils.fundamentals import refresh_stale_fundamentals
+from stocks.utils.market_hours import is_market_open, last_market_close
+from stocks.utils.refresh import refresh_stocks
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULE = {
+    "PRIORITY_INTERVAL": 15 * 60,
+    "UNIVERSE_INTERVAL": 4 * 60 * 60,
+    "ACTIVITY_DAYS": 14,
+    "MAX_STOCKS_PER_RUN": 500,
+}
+
+
+def schedule_config():
+    return {**DEFAULT_SCHEDULE, **getattr(settings, "REFRESH_SCHEDULE", {})}
+
+
+def priority_filter(now, activity_days):
+    """Stocks in any stock list, or with a note or evaluation created or edited in the last ``activity_days``."""
+    since = now - timedelta(days=activity_days)
+    StockNote = apps.get_model("analysis", "StockNote")
+    StockEvaluation = apps.get_model("analysis", "StockEvaluation")
+    return (
+        Exists(StockList.stocks.through.objects.filter(stock_id=OuterRef("pk")))
+        | Exists(StockNote.objects.filter(stock_id=OuterRef("pk"), updated_at__gte=since))
+        | Exists(StockEvaluation.objects.filter(stock_id=OuterRef("pk"), updated_at__gte=since))
+    )
+
+
+def _refreshed_before(moment):
+    # A stock no refresh has processed yet is always due.
+    return Q(refreshed_at__lt=moment) | Q(refreshed_at__isnull=True)
+
+
+def plan_refresh(now=None, config=None, exclude=()):
+    """
+    Return the symbols due for a refresh at ``now``, most urgent first.
+
+    Watched stocks come before the rest of the universe and, within each
+    group, the longest-unrefreshed come first. Symbols in ``exclude`` are skipped.
+    """
+    now = now or timezone.now()
+    config = config or schedule_config()
+    watched = priority_filter(now, config["ACTIVITY_DAYS"])
+    stocks = Stock.objects.exclude(symbol__in=list(exclude))
+
+    if is_market_open(now):
+        priority_due = _refreshed_before(now - timedelta(seconds=config["PRIORITY_INTERVAL"]))
+        universe_due = _refreshed_before(now - timedelta(seconds=config["UNIVERSE_INTERVAL"]))
+    else:
+        priority_due = universe_due = _refreshed_before(last_market_close(now))
+
+    budget = config["MAX_STOCKS_PER_RUN"]
+    stalest = F("refreshed_at").asc(nulls_first=True)
+    symbols = list(
+        stocks.filter(watched, priority_due).order_by(stalest).values_list("symbol", flat=True)[:budget]
+    )
+    if len(symbols) < budget:
+        symbols += stocks.filter(~watched, universe_due).order_by(stalest).values_list(
+            "symbol", flat=True
+        )[:budget - len(symbols)]
+    return symbols
+
+
+class RefreshScheduler:
+    """
+    Plans and runs a refresh every ``tick`` seconds until stopped.
+
+    A stock whose refresh failed keeps its old ``refreshed_at`` and would head
+    every plan, so it is left out for ``UNIVERSE_INTERVAL`` before being retried.
+    """
+
+    def __init__(self, tick=60, workers=8, config=None):
+        self.tick = tick
+        self.workers = workers
+        self.config = config or schedule_config()
+        self.failed_until = {}
+
+    def run_once(self, now=None):
+        """Refresh whatever is due now. Returns the RefreshSummary, or None if nothing was due."""
+        clock = time.monotonic()
+        self.failed_until = {symbol: until for symbol, until in self.failed_until.items() if until > clock}
+        symbols = plan_refresh(now, self.config, exclude=self.failed_until)
+        if not symbols:
+            if not is_market_open(now or timezone.now()):
+                refreshed = refresh_stale_fundamentals(limit=self.config["MAX_STOCKS_PER_RUN"])
+                if refreshed:
+                    logger.info("Refreshed fundamentals for %d symbols", refreshed)
+            return None
+
+        logger.info("Refreshing %d due stocks", len(symbols))
+        summary = refresh_stocks(symbols, workers=self.workers)
+        for symbol in summary.failures:
+            self.failed_until[symbol] = clock + self.config["UNIVERSE_INTERVAL"]
+        logger.info("Refreshed %d/%d stocks in %.1fs (%d unchanged)",
+                    summary.succeeded, summary.total, summary.elapsed, summary.skipped)
+        return summary
+
+    def run_forever(self):
+        while True:
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception:
+                # A failed run (e.g. the database restarting) must not stop the scheduler.
+                logger.exception("Scheduled refresh failed")
+            time.sleep(max(0.0, self.tick - (time.monotonic() - started)))
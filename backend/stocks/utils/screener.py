@@ -0,0 +1,325 @@
+"""
+In-process columnar screening over the indicator columns of ``Stock``.
+
+The columns are loaded once into NumPy arrays (one per column, one element per
+stock) and a screen -- a ``Q`` tree such as a FilterSet or the breakout screen
+builds -- is evaluated as vectorized boolean masks, so re-running a screen with
+slightly different thresholds costs microseconds instead of a table scan. The
+result is the ordered ids of the matching stocks; ``ScreenResult`` turns them
+into Stock rows for just the slice that is displayed.
+
+With ``SCREENER["SHARED"]`` the process that finishes a refresh run publishes
+the snapshot as a versioned directory of ``.npy`` files (see ``panel_store``)
+and every server worker maps the current version read-only: memory stays flat
+as workers are added, and all of them switch to a new version as soon as its
+``CURRENT`` pointer is replaced. Without it each process keeps its own copy,
+dropped when a refresh run in that process finishes. In both modes writes
+outside a refresh run (mutations, onboarding) are picked up by comparing the
+table's row count and latest ``updated_at`` with the snapshot's at most every
+``RECHECK_SECONDS``; a stale shared snapshot is republished by the first
+worker to notice. Tag membership is not kept in the snapshot; a tag filter
+costs one indexed query on the tag table.
+
+Enabled with ``SCREENER["ENGINE"]``; without it, and for any lookup the engine
+does not understand, screens run in SQL as before.
+"""
+import fcntl
+import operator
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from functools import reduce
+
+import numpy as np
+from django.conf import settings
+from django.db import models
+from django.db.models import Count, F, Max, Q
+from django.dispatch import receiver
+from django_filters.constants import EMPTY_VALUES
+
+from stocks.models import INDICATOR_FIELDS, Stock
+from stocks.signals import refresh_finished
+from stocks.utils.panel_store import current_directory, publish_arrays, read_arrays
+
+TEXT_FIELDS = ["symbol", "name"]
+KEY_FIELDS = ["sector", "industry_group"]
+BOOLEAN_FIELDS = [name for name in INDICATOR_FIELDS if isinstance(Stock._meta.get_field(name), models.BooleanField)]
+FLOAT_FIELDS = [name for name in INDICATOR_FIELDS if name not in BOOLEAN_FIELDS]
+
+COMPARISONS = {
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+_snapshot = None
+_checked = 0.0
+_lock = threading.Lock()
+
+
+class UnsupportedScreen(Exception):
+    """The screen uses a lookup the engine cannot evaluate; run it in SQL instead."""
+
+
+def screener_config():
+    return getattr(settings, "SCREENER", {})
+
+
+def enabled():
+    return screener_config().get("ENGINE", False)
+
+
+def shared():
+    return screener_config().get("SHARED", False)
+
+
+def snapshot_root():
+    return screener_config().get("ROOT") or os.path.join(settings.PRICE_DATA["PANEL_ROOT"], "screener")
+
+
+def table_version():
+    """Changes whenever a stock is added, removed or saved: its row count and latest ``updated_at`` in microseconds."""
+    table = Stock.objects.aggregate(count=Count("id"), updated=Max("updated_at"))
+    updated = table["updated"] or datetime.fromtimestamp(0, dt_timezone.utc)
+    return (table["count"], round(updated.timestamp() * 1_000_000))
+
+
+class ScreenerSnapshot:
+    """
+    The screenable columns of every stock, ordered by id, with NaN for NULL
+    floats and -1 for NULL keys. Text columns also have a lowercased
+    ``<name>_lower`` copy for case-insensitive lookups.
+    """
+
+    def __init__(self, ids, columns, version=None, directory=None):
+        self.ids = ids
+        self.columns = columns
+        # The table_version() the columns were loaded at.
+        self.version = version
+        self.directory = directory
+
+    @classmethod
+    def load(cls):
+        version = table_version()
+        fields = ["id", *TEXT_FIELDS, *(f"{name}_id" for name in KEY_FIELDS), *INDICATOR_FIELDS]
+        rows = list(Stock.objects.order_by("id").values_list(*fields))
+        values = dict(zip(fields, zip(*rows))) if rows else {name: () for name in fields}
+
+        columns = {}
+        for name in TEXT_FIELDS:
+            columns[name] = np.array(values[name], dtype=str)
+            columns[f"{name}_lower"] = np.char.lower(columns[name])
+        for name in KEY_FIELDS:
+            columns[name] = np.array([-1 if key is None else key for key in values[f"{name}_id"]], dtype=np.int64)
+        for name in FLOAT_FIELDS:
+            columns[name] = np.array(values[name], dtype=np.float64)  # None becomes NaN
+        for name in BOOLEAN_FIELDS:
+            columns[name] = np.array(values[name], dtype=bool)
+        return cls(np.array(values["id"], dtype=np.int64), columns, version)
+
+    @classmethod
+    def open(cls, directory):
+        """Map a published snapshot."""
+        columns = read_arrays(directory)
+        version = columns.pop("version", None)
+        return cls(columns.pop("ids"), columns, None if version is None else tuple(version.tolist()), directory)
+
+    def publish(self, root=None):
+        """Publish this snapshot as the current version for every process and return its directory."""
+        arrays = {"ids": self.ids, "version": np.array(self.version, dtype=np.int64), **self.columns}
+        return publish_arrays(arrays, root or snapshot_root())
+
+    def column(self, name):
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise UnsupportedScreen(f"{name} is not in the screener snapshot")
+
+    def lookup(self, path, value):
+        """Evaluate one ``field__lookup=value`` filter argument to a mask."""
+        field, _, lookup = path.partition("__")
+        lookup = lookup or "exact"
+        if field == "tags" and lookup == "in":
+            tagged = Stock.tags.through.objects.filter(tag__in=value).values_list("stock_id", flat=True)
+            return np.isin(self.ids, np.fromiter(tagged, dtype=np.int64))
+
+        column = self.column(field)
+        if isinstance(value, F):
+            value = self.column(value.name)
+        elif isinstance(value, models.Model):
+            value = value.pk
+        elif isinstance(value, Decimal):
+            # NumberFilter cleans to Decimal, which cannot be compared with NaN.
+            value = float(value)
+
+        if lookup == "exact":
+            return column == value
+        if lookup in COMPARISONS:
+            # Comparisons with NaN are False, as comparisons with NULL are in SQL.
+            return COMPARISONS[lookup](column, value)
+        if lookup == "icontains":
+            return np.char.find(self.column(f"{field}_lower"), str(value).lower()) >= 0
+        if lookup == "in":
+            return np.isin(column, [item.pk if isinstance(item, models.Model) else item for item in value])
+        raise UnsupportedScreen(f"Unsupported lookup {path}")
+
+    def mask(self, q):
+        """Evaluate a Q tree of lookups to a boolean mask over the snapshot's stocks."""
+        if q.negated:
+            # NOT over NULLs does not map onto NaN masks; leave it to SQL.
+            raise UnsupportedScreen("Negated conditions are not supported")
+        masks = [self.mask(child) if isinstance(child, Q) else self.lookup(*child) for child in q.children]
+        if not masks:
+            return np.ones(len(self.ids), dtype=bool)
+        return reduce(np.logical_or if q.connector == Q.OR else np.logical_and, masks)
+
+    def screen(self, q, order_by=None):
+        """Ids of the stocks matching ``q``, by id or by ``order_by`` (a column, ``-`` for descending, NULLs last)."""
+        matches = np.flatnonzero(self.mask(q))
+        if order_by:
+            descending = order_by.startswith("-")
+            values = self.column(order_by.lstrip("-"))[matches].astype(np.float64)
+            keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+            matches = matches[np.argsort(keys, kind="stable")]
+        return self.ids[matches]
+
+
+def get_snapshot():
+    """
+    The current snapshot: the published one when shared (until one is
+    published, a private copy), else a private copy reloaded if a refresh
+    finished. Either is replaced once the table changed since it was loaded.
+    """
+    global _snapshot, _checked
+    with _lock:
+        now = time.monotonic()
+        recheck = screener_config().get("RECHECK_SECONDS", 10)
+        if _snapshot is not None and now - _checked >= recheck:
+            _checked = now
+            if table_version() != _snapshot.version:
+                _snapshot = None
+                if shared():
+                    _republish_if_stale(snapshot_root())
+
+        directory = current_directory(snapshot_root()) if shared() else None
+        if directory is not None:
+            if _snapshot is None or _snapshot.directory != directory:
+                _snapshot = ScreenerSnapshot.open(directory)
+            return _snapshot
+        if _snapshot is None:
+            _snapshot = ScreenerSnapshot.load()
+            _checked = now
+        return _snapshot
+
+
+def invalidate():
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+@contextmanager
+def _publishing(root):
+    # One publisher at a time across processes, so workers noticing the same
+    # change do not each publish a version and prune the one others just opened.
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "LOCK"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def publish_snapshot(root=None):
+    """Load the snapshot from the database and publish it to every process."""
+    root = root or snapshot_root()
+    with _publishing(root):
+        return ScreenerSnapshot.load().publish(root)
+
+
+def _republish_if_stale(root):
+    """Publish a new snapshot unless another process already published one matching the table."""
+    with _publishing(root):
+        directory = current_directory(root)
+        if directory is None or ScreenerSnapshot.open(directory).version != table_version():
+            ScreenerSnapshot.load().publish(root)
+
+
+@receiver(refresh_finished)
+def reload_after_refresh(sender, **kwargs):
+    if shared():
+        publish_snapshot()
+    invalidate()
+
+
+def screen(q, order_by=None):
+    return get_snapshot().screen(q, order_by)
+
+
+def filterset_q(filterset):
+    """The Q tree a bound, valid FilterSet applies, for filters the engine can evaluate."""
+    q = Q()
+    for name, filter_ in filterset.filters.items():
+        value = filterset.form.cleaned_data.get(name)
+        if value in EMPTY_VALUES:
+            continue
+        if filter_.exclude or filter_.method is not None:
+            raise UnsupportedScreen(f"Filter {name} cannot be screened in memory")
+        if filter_.field_name == "tags__name":
+            # Like the filter itself, an empty tag selection filters nothing.
+            if value:
+                q &= Q(tags__in=[tag.pk for tag in value])
+        else:
+            q &= Q(**{f"{filter_.field_name}__{filter_.lookup_expr}": value})
+    return q
+
+
+class ScreenResult:
+    """
+    Screened stock ids that behave like a sliceable sequence of Stocks.
+
+    Slicing only narrows the ids; rows are fetched when the result is iterated,
+    so a connection that displays one page loads one page.
+    """
+
+    def __init__(self, ids, queryset=None, snapshot=None):
+        self.ids = ids
+        self.queryset = Stock.objects.all() if queryset is None else queryset
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ScreenResult(self.ids[index], self.queryset, self.snapshot)
+        return self.queryset.get(pk=int(self.ids[index]))
+
+    def seek(self, keys, values, reverse=False):
+        """
+        The ids whose sort keys come after ``values`` (before them with
+        ``reverse``), for keyset pagination; ``keys`` are ``(column,
+        descending)`` pairs the ids are already ordered by, with NaN last.
+        """
+        snapshot = self.snapshot or get_snapshot()
+        positions = np.searchsorted(snapshot.ids, self.ids)
+        after = np.zeros(len(self.ids), dtype=bool)
+        equal = np.ones(len(self.ids), dtype=bool)
+        for (name, descending), value in zip(keys, values):
+            column = (self.ids if name == "id" else snapshot.column(name)[positions]).astype(np.float64)
+            # Compare (is NULL, signed value) pairs, so NULLs sort last in either direction.
+            null, signed = np.isnan(column), np.nan_to_num(-column if descending else column)
+            value_null = value is None
+            value_signed = 0.0 if value_null else float(-value if descending else value)
+            beyond = (null > value_null) | ((null == value_null) & (signed > value_signed))
+            after |= equal & beyond
+            equal &= (null == value_null) & (signed == value_signed)
+        keep = ~(after | equal) if reverse else after
+        return ScreenResult(self.ids[keep], self.queryset, snapshot)
+
+    def __iter__(self):
+        stocks = self.queryset.in_bulk(self.ids.tolist())
+        # A stock deleted since the snapshot was taken is skipped.
+        return (stocks[stock_id] for stock_id in self.ids.tolist() if stock_id in stocks)
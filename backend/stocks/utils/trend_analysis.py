@@ -1,14 +1,42 @@
 import numpy as np
-import yfinance as yf
 import pandas as pd
 
+from stocks.models import PriceBar
+from stocks.utils.benchmarks import get_benchmark_close
+from stocks.utils.price_store import HISTORY_PERIOD, load_bars, resample_bars, sync_bars
+from stocks.utils.providers import get_provider, period_offset
 
-def fetch_stock_trends(ticker):
-    """Fetch stock price trends and technical indicators."""
-    stock = yf.Ticker(ticker)
-    df = stock.history(period="1y", interval="1d", auto_adjust=True, actions=False)
-    df_weekly = stock.history(period="5y", interval="1wk", auto_adjust=True, actions=False)
 
+def fetch_stock_trends(ticker, stock=None, provider=None):
+    """
+    Fetch stock price trends and technical indicators.
+
+    When a ``Stock`` is given its bars are kept in the price store and only
+    bars newer than the last stored one are downloaded.
+    """
+    provider = provider or get_provider()
+    if stock is not None:
+        sync_bars(stock, provider, PriceBar.DAILY, period=HISTORY_PERIOD)
+        return stored_stock_trends(stock, provider=provider)
+
+    df_history = provider.history(ticker, period=HISTORY_PERIOD, interval=PriceBar.DAILY)
+    if df_history.empty:
+        return None  # No data available
+    df_weekly = resample_bars(df_history, PriceBar.WEEKLY)
+    df = df_history[df_history.index >= df_history.index[-1] - pd.DateOffset(years=1)].copy()
+    return compute_trends(df, df_weekly, provider=provider)
+
+
+def stored_stock_trends(stock, provider=None):
+    """Compute trends from the bars already in the price store, without downloading anything."""
+    today = pd.Timestamp.today().normalize()
+    df = load_bars(stock, PriceBar.DAILY, start=(today - pd.DateOffset(years=1)).date())
+    df_weekly = load_bars(stock, PriceBar.WEEKLY, start=(today - pd.DateOffset(years=5)).date())
+    return compute_trends(df, df_weekly, provider=provider)
+
+
+def compute_trends(df, df_weekly, provider=None):
+    """Compute the technical indicators from one year of daily bars and the weekly history."""
     if df.empty or df_weekly.empty:
         return None  # No data available
 
@@ -26,9 +54,10 @@ def fetch_stock_trends(ticker):
 
     volume_spike = bool(df['Volume'].iloc[-1] > df['Volume'].rolling(window=10).mean().iloc[-1] * 1.5)
 
-    rs_sp500 = compute_relative_strength(ticker, "SPY")
+    rs_sp500 = compute_relative_strength(df['Close'], "SPY", provider=provider)
 
     return {
+        "date": df.index[-1].date(),
         "current_price": df['Close'].iloc[-1],
         "SMA_50": float(df['SMA_50'].iloc[-1]) if not np.isnan(df['SMA_50'].iloc[-1]) else None,
         "SMA_200": float(df['SMA_200'].iloc[-1]) if not np.isnan(df['SMA_200'].iloc[-1]) else None,
@@ -55,13 +84,18 @@ def compute_rsi(series, period=14):
     return 100 - (100 / (1 + rs))
 
 
-def compute_relative_strength(stock_ticker, benchmark_ticker):
-    """Calculate the relative strength of a stock compared to a benchmark (SPY)."""
-    stock_data = yf.Ticker(stock_ticker).history(period="6mo")['Close']
-    spy_data = yf.Ticker(benchmark_ticker).history(period="6mo")['Close']
+def compute_relative_strength(stock_close, benchmark_ticker, period="6mo", provider=None):
+    """
+    Calculate the relative strength of a stock compared to a benchmark (SPY).
+
+    ``stock_close`` is the stock's already-loaded daily closes; only the last
+    ``period`` of it is used. The benchmark series is shared across the run.
+    """
+    stock_data = stock_close[stock_close.index >= stock_close.index[-1] - period_offset(period)]
+    spy_data = get_benchmark_close(benchmark_ticker, period=period, provider=provider)
 
     if stock_data.empty or spy_data.empty:
-        return None
+        return np.nan
 
     rs = stock_data.pct_change().mean() / spy_data.pct_change().mean()
     return rs
@@ -0,0 +1,121 @@
+"""
+Per-request batching of relation lookups (the DataLoader pattern) for the GraphQL types.
+
+Execution is synchronous and depth-first, so instead of deferring loads until
+the end of a tick, the batch is every instance of a model seen so far:
+``DataLoaderMiddleware`` registers what list and connection fields return, and
+the first time a type resolves a relation of one of them (``batched("sector")``),
+the relation is prefetched for every registered instance of that model in one
+query. The related objects of the whole batch are registered in turn, so the
+next level down batches across all parents, not just the first one. A deep
+query therefore costs one query per relation and level rather than one per node.
+"""
+from collections import defaultdict
+
+from django.db import models
+from django.db.models import prefetch_related_objects
+from graphene.relay import Connection
+
+from stocktracker.optimizer import OptimizedConnectionField
+
+
+class RequestLoaders:
+    """The instances seen during one GraphQL execution, grouped by model, and which relations are loaded for them."""
+
+    def __init__(self):
+        self.pending = defaultdict(dict)
+        self.loaded = defaultdict(set)
+
+    def register(self, instances):
+        for instance in instances:
+            if isinstance(instance, models.Model):
+                # Keyed by identity: the same row may be loaded twice as different objects.
+                self.pending[type(instance)].setdefault(id(instance), instance)
+
+    def load(self, instance, relation):
+        """Return ``instance``'s ``relation``: the related object, or a list of them for a to-many relation."""
+        model = type(instance)
+        loaded = self.loaded[(model, relation)]
+        if id(instance) not in loaded:
+            batch = {key: other for key, other in self.pending[model].items() if key not in loaded}
+            batch[id(instance)] = instance
+            prefetch_related_objects(list(batch.values()), relation)
+            loaded.update(batch)
+            for other in batch.values():
+                self.register(self._related(other, relation))
+
+        return self._related(instance, relation) if self._to_many(instance, relation) else getattr(instance, relation)
+
+    @staticmethod
+    def _to_many(instance, relation):
+        return isinstance(getattr(instance, relation), models.Manager)
+
+    @staticmethod
+    def _related(instance, relation):
+        value = getattr(instance, relation)
+        if isinstance(value, models.Manager):
+            return list(value.all())
+        return [] if value is None else [value]
+
+
+def get_loaders(info):
+    """The loaders of the current request (a fresh, unshared set when there is no request)."""
+    context = info.context
+    if context is None:
+        return RequestLoaders()
+    loaders = getattr(context, "_dataloaders", None)
+    if loaders is None:
+        loaders = context._dataloaders = RequestLoaders()
+    return loaders
+
+
+def batched(relation):
+    """
+    A resolver that loads ``relation`` through the request's loaders.
+
+    ``"stock__tags"`` follows forward relations first: the ``stock`` of every
+    instance in the batch, then the ``tags`` of every one of those stocks.
+    """
+
+    def resolver(root, info, **kwargs):
+        loaders = get_loaders(info)
+        for step in relation.split("__"):
+            if root is None:
+                return None
+            root = loaders.load(root, step)
+        return root
+
+    # Lets the query optimizer plan the field as the model relation it is.
+    resolver.relation = relation
+    return resolver
+
+
+class DataLoaderMiddleware:
+    """Registers the model instances every list and connection field returns as the batch for their relations."""
+
+    def resolve(self, next, root, info, **args):
+        result = next(root, info, **args)
+        if isinstance(result, Connection):
+            get_loaders(info).register(edge.node for edge in result.edges)
+        elif isinstance(result, (list, tuple, models.QuerySet)):
+            # Evaluating a QuerySet here fills its result cache, which the list field then iterates.
+            get_loaders(info).register(result)
+        return result
+
+
+class BatchedConnectionField(OptimizedConnectionField):
+    """
+    A filter connection over a to-many relation resolved by ``batched``.
+
+    Without filter arguments the batched list is paginated as is; with them
+    the relation is queried and filtered for this node alone.
+    """
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        if isinstance(iterable, list):
+            if not any(args.get(name) is not None for name in filtering_args):
+                return iterable
+            model = connection._meta.node._meta.model
+            iterable = model.objects.filter(pk__in=[instance.pk for instance in iterable])
+        return super().resolve_queryset(connection, iterable, info, args, filtering_args, filterset_class)
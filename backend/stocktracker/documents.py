@@ -0,0 +1,109 @@
+"""
+GraphQL documents: persisted queries and a cache of parsed and validated ones.
+
+Parsing and validating a large dashboard query against the whole schema costs
+more than many of the resolvers it runs, and the frontend sends the same few
+documents over and over. ``parse_and_validate`` keeps the last
+``GRAPHQL_DOCUMENTS["CACHE_SIZE"]`` results in an LRU keyed by the SHA-256 of
+the document, so a repeated document skips both steps.
+
+Persisted queries are documents registered ahead of time in the JSON manifest
+at ``GRAPHQL_DOCUMENTS["PERSISTED_QUERIES"]``: either ``{"<sha256>": "<query>"}``
+or an Apollo persisted query manifest (``{"operations": [{"id", "body"}, ...]}``).
+A client then sends only the hash, as Apollo's
+``extensions.persistedQuery.sha256Hash``, instead of the whole document.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from graphql import GraphQLError, parse, validate
+
+from stocktracker.query_cost import count, recording_metrics
+
+DEFAULT_DOCUMENTS = {
+    "CACHE_SIZE": 512,
+    "PERSISTED_QUERIES": None,
+    "PERSISTED_ONLY": False,
+}
+
+
+def documents_config():
+    return {**DEFAULT_DOCUMENTS, **getattr(settings, "GRAPHQL_DOCUMENTS", {})}
+
+
+def document_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def persisted_queries():
+    """The registered documents by hash, read from the manifest once per process."""
+    path = documents_config()["PERSISTED_QUERIES"]
+    if not path:
+        return {}
+    with open(path) as manifest:
+        data = json.load(manifest)
+    if "operations" in data:
+        data = {operation["id"]: operation["body"] for operation in data["operations"]}
+    for digest, query in data.items():
+        if document_hash(query) != digest:
+            raise ImproperlyConfigured(f"Persisted query {digest} in {path} does not match its document's hash")
+    return data
+
+
+def persisted_query(digest):
+    return persisted_queries().get(digest)
+
+
+class DocumentCache:
+    """A thread-safe LRU of ``(document, validation errors, metric counts)`` by document hash."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry, size):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+
+_documents = DocumentCache()
+
+
+def parse_and_validate(schema, query, rules=None, digest=None, max_errors=None):
+    """
+    Return ``(document, errors)`` for ``query``: the parsed document (None if
+    it does not parse) and its syntax or validation errors, from the cache
+    when the same document was seen before with the same schema and rules.
+    What validating it counted in the query metrics is counted on every call.
+    """
+    key = (digest or document_hash(query), schema, tuple(rules or ()))
+    entry = _documents.get(key)
+    if entry is None:
+        with recording_metrics() as increments:
+            try:
+                document = parse(query)
+            except GraphQLError as error:
+                document, errors = None, [error]
+            else:
+                errors = validate(schema, document, rules, max_errors)
+        entry = (document, errors, increments)
+        _documents.put(key, entry, documents_config()["CACHE_SIZE"])
+    document, errors, increments = entry
+    count(**increments)
+    return document, errors
@@ -0,0 +1,180 @@
+"""
+Query planning from the GraphQL selection set.
+
+``optimize(queryset, info)`` looks at the fields a query selects on the type
+being resolved and narrows the queryset to match: ``only()`` the selected
+columns, ``select_related`` the selected forward relations (following their
+own selections) and ``prefetch_related`` the selected to-many relations with
+a ``Prefetch`` queryset planned the same way. A screen that asks for
+``symbol`` and ``RSI_14`` loads those two columns and nothing else.
+
+A field the optimizer cannot map to a column -- a custom resolver, a computed
+field -- may read anything on the instance, so the type it sits on keeps all
+its columns; its relations are still planned. Relations resolved through
+``batched`` count as model relations, and since they skip what is already
+loaded, the plan and the per-request loaders never fetch the same rows twice.
+"""
+from django.db import models
+from django.db.models import Prefetch
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_camel_case
+from graphene_django import DjangoObjectType
+from graphene_django.filter import DjangoFilterConnectionField
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode, get_named_type
+
+
+class Plan:
+    """What one queryset loads: its columns (None for all of them) and its related lookups."""
+
+    def __init__(self):
+        self.only = set()
+        self.select = []
+        self.prefetch = []
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        if self.only is not None:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def _collect(info, selection_sets, into=None):
+    """Merge the selected fields of ``selection_sets`` by name, expanding fragments, as ``{name: [FieldNode]}``."""
+    into = {} if into is None else into
+    for selection_set in selection_sets:
+        if selection_set is None:
+            continue
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                into.setdefault(selection.name.value, []).append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                _collect(info, [selection.selection_set], into)
+            elif isinstance(selection, FragmentSpreadNode):
+                _collect(info, [info.fragments[selection.name.value].selection_set], into)
+    return into
+
+
+def _subfields(info, nodes):
+    return _collect(info, [node.selection_set for node in nodes])
+
+
+def _graphene_type(graphql_type):
+    return getattr(get_named_type(graphql_type), "graphene_type", None)
+
+
+def _node_selection(info, graphene_type, selection):
+    """Unwrap a connection to its node type and the fields selected on ``edges { node }``."""
+    if isinstance(graphene_type, type) and issubclass(graphene_type, Connection):
+        edges = _subfields(info, selection.get("edges", []))
+        return graphene_type._meta.node, _subfields(info, edges.get("node", []))
+    return graphene_type, selection
+
+
+def _model_fields(model):
+    """The model's fields and relations by the attribute name graphene exposes them under."""
+    fields = {}
+    for field in model._meta.get_fields():
+        name = field.get_accessor_name() if field.auto_created and not field.concrete else field.name
+        if name:
+            fields[name] = field
+    return fields
+
+
+def _plan(info, graphene_type, selection, plan, prefix=""):
+    """Add what ``selection`` needs from ``graphene_type``'s model to ``plan``, under the lookup ``prefix``."""
+    model = graphene_type._meta.model
+    graphql_fields = info.schema.get_type(graphene_type._meta.name).fields
+    model_fields = _model_fields(model)
+    # Relations are Dynamic fields until the schema is built; they have neither a name nor a resolver.
+    fields = graphene_type._meta.fields
+    by_graphql_name = {getattr(field, "name", None) or to_camel_case(name): name for name, field in fields.items()}
+
+    columns = {model._meta.pk.name}
+    complete = True
+    for graphql_name, nodes in selection.items():
+        if graphql_name == "__typename" or graphql_name == "id":
+            continue
+        name = by_graphql_name.get(graphql_name)
+        resolver = name and (getattr(fields[name], "resolver", None) or getattr(graphene_type, f"resolve_{name}", None))
+        relation = getattr(resolver, "relation", None) if resolver else name
+        field = model_fields.get(relation)
+        if field is None:
+            complete = False
+            continue
+
+        if not field.is_relation:
+            columns.add(field.name)
+            continue
+
+        related_type, related_selection = _node_selection(
+            info, _graphene_type(graphql_fields[graphql_name].type), _subfields(info, nodes)
+        )
+        optimizable = isinstance(related_type, type) and issubclass(related_type, DjangoObjectType)
+        if field.concrete and not field.many_to_many:
+            # A forward foreign key or one-to-one: joined into this query.
+            columns.add(field.name)
+            plan.select.append(prefix + field.name)
+            if optimizable:
+                _plan(info, related_type, related_selection, plan, f"{prefix}{field.name}__")
+            continue
+
+        child = Plan()
+        queryset = field.related_model._default_manager.all()
+        if optimizable:
+            _plan(info, related_type, related_selection, child)
+            if child.only is not None and (field.one_to_many or field.one_to_one):
+                # The prefetch matches children to parents by their foreign key.
+                child.only.add(field.field.name)
+        plan.prefetch.append(Prefetch(prefix + relation, queryset=child.apply(queryset)))
+
+    if plan.only is not None:
+        if complete:
+            plan.only.update(prefix + column for column in columns)
+        else:
+            # A joined relation's columns are part of the same query, so it keeps them all too.
+            plan.only = None
+
+
+def optimize(queryset, info):
+    """
+    ``queryset`` narrowed to what the current field selects.
+
+    Querysets that are already evaluated or prefetched, or narrowed by hand,
+    are returned as they are, and so is anything resolved to a type that is
+    not a ``DjangoObjectType`` of the queryset's model.
+    """
+    if isinstance(queryset, models.Manager):
+        queryset = queryset.get_queryset()
+    if not isinstance(queryset, models.QuerySet) or queryset._result_cache is not None:
+        return queryset
+    if queryset.query.deferred_loading != (frozenset(), True):
+        return queryset
+
+    graphene_type, selection = _node_selection(
+        info, _graphene_type(info.return_type), _subfields(info, info.field_nodes)
+    )
+    if not (isinstance(graphene_type, type) and issubclass(graphene_type, DjangoObjectType)):
+        return queryset
+    if graphene_type._meta.model is not queryset.model:
+        return queryset
+
+    plan = Plan()
+    _plan(info, graphene_type, selection, plan)
+    return plan.apply(queryset)
+
+
+class OptimizedConnectionField(DjangoFilterConnectionField):
+    """
+    A filter connection whose queryset is planned from the selection set.
+
+    Types do not override ``get_queryset`` for this: graphene-django then
+    resolves every foreign key to the type through ``get_node``, a query per row.
+    """
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        queryset = super().resolve_queryset(connection, iterable, info, args, filtering_args, filterset_class)
+        return optimize(queryset, info)
@@ -0,0 +1,165 @@
+"""
+Keyset (cursor) pagination for list fields.
+
+A ``KeysetConnectionField`` orders what its resolver returns by sort keys
+ending in a unique column, e.g. ``("-RS_SP500", "id")``, and an edge's cursor
+is that row's key values. ``after`` resumes with the rows whose keys sort
+strictly after the cursor's, so a page is one index range scan with a
+``LIMIT`` whatever its depth, and rows inserted or deleted meanwhile never
+shift a page the way they do with ``OFFSET``. NULL keys sort last.
+
+Resolvers return a QuerySet, or anything with a ``seek(keys, values,
+reverse)`` that narrows it the same way (such as a screener result, already
+in key order). Pages hold at most ``RELAY_CONNECTION_MAX_LIMIT`` rows. When
+the parent decides the order (a saved screen's ``order_by``), ``order_by``
+is a function of the parent object instead.
+"""
+import base64
+import binascii
+import json
+from functools import partial
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q, QuerySet
+from graphene.relay import Connection, ConnectionField, PageInfo
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+
+_connections = {}
+
+
+def connection_for(node_type):
+    """The Connection type over ``node_type``: its own if it is a relay Node, else one made (once) for it."""
+    connection = getattr(node_type._meta, "connection", None)
+    if connection is None:
+        connection = _connections.get(node_type)
+    if connection is None:
+        connection = _connections[node_type] = Connection.create_type(f"{node_type.__name__}Connection", node=node_type)
+    return connection
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def decode_cursor(cursor, model, keys):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise GraphQLError(f"Invalid cursor {cursor!r}")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise GraphQLError(f"Invalid cursor {cursor!r}")
+    return [
+        None if value is None else model._meta.get_field(name).to_python(value)
+        for (name, _), value in zip(keys, values)
+    ]
+
+
+def parse_order(order_by):
+    """``("-RS_SP500", "id")`` as ``[("RS_SP500", True), ("id", False)]``, True meaning descending."""
+    return [(key.lstrip("-"), key.startswith("-")) for key in order_by]
+
+
+def _ordering(keys):
+    return [F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True) for name, descending in keys]
+
+
+def _beyond(name, descending, value, reverse):
+    """Rows whose ``name`` sorts after ``value`` (before it with ``reverse``), or None if none can."""
+    if value is None:
+        # NULLs come last: nothing is after one, and every non-NULL value is before it.
+        return Q(**{f"{name}__isnull": False}) if reverse else None
+    lookup = "gt" if descending == reverse else "lt"
+    beyond = Q(**{f"{name}__{lookup}": value})
+    return beyond if reverse else beyond | Q(**{f"{name}__isnull": True})
+
+
+def seek(queryset, keys, values, reverse=False):
+    """``queryset`` narrowed to the rows after the key ``values`` (before them with ``reverse``)."""
+    condition = None
+    equal = Q()
+    for (name, descending), value in zip(keys, values):
+        beyond = _beyond(name, descending, value, reverse)
+        if beyond is not None:
+            term = equal & beyond
+            condition = term if condition is None else condition | term
+        equal &= Q(**{f"{name}__isnull": True} if value is None else {name: value})
+    return queryset.none() if condition is None else queryset.filter(condition)
+
+
+def _seek(rows, keys, values, reverse=False):
+    if isinstance(rows, QuerySet):
+        return seek(rows, keys, values, reverse)
+    return rows.seek(keys, values, reverse)
+
+
+def _with_keys(queryset, keys):
+    """Make sure a queryset narrowed with ``only()`` loads the sort keys the cursors are made of."""
+    names, defer = queryset.query.deferred_loading
+    if names and not defer:
+        return queryset.only(*names, *(name for name, _ in keys))
+    return queryset
+
+
+class KeysetConnectionField(ConnectionField):
+    """
+    A connection over ``node_type`` paginated by the keys in ``order_by``, which must end in a unique one.
+
+    ``order_by`` is the keys, or a function returning them for the parent object.
+    """
+
+    def __init__(self, node_type, *args, order_by=("id",), **kwargs):
+        self.order_by = order_by
+        super().__init__(connection_for(node_type), *args, **kwargs)
+
+    def wrap_resolve(self, parent_resolver):
+        resolver = super(ConnectionField, self).wrap_resolve(parent_resolver)
+        return partial(self.keyset_resolver, resolver)
+
+    def keyset_resolver(self, resolver, root, info, first=None, last=None, after=None, before=None, **args):
+        keys = parse_order(self.order_by(root) if callable(self.order_by) else self.order_by)
+        model = self.type._meta.node._meta.model
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        for name, size in (("first", first), ("last", last)):
+            if size is not None and not 0 <= size <= max_limit:
+                raise GraphQLError(
+                    f"`{name}` on the `{info.field_name}` connection must be between 0 and {max_limit}"
+                )
+
+        rows = resolver(root, info, **args)
+        if isinstance(rows, QuerySet):
+            rows = _with_keys(rows, keys).order_by(*_ordering(keys))
+        if after is not None:
+            rows = _seek(rows, keys, decode_cursor(after, model, keys))
+        if before is not None:
+            rows = _seek(rows, keys, decode_cursor(before, model, keys), reverse=True)
+
+        if first is None and last is not None:
+            # Backwards from the end (or from ``before``): read the last rows in reverse key order.
+            if isinstance(rows, QuerySet):
+                page = list(rows.reverse()[:last + 1])[::-1]
+            else:
+                page = list(rows[max(len(rows) - last - 1, 0):])
+            has_previous, has_next = len(page) > last, before is not None
+            page = page[len(page) - last:] if has_previous else page
+        else:
+            limit = max_limit if first is None else first
+            page = list(rows[:limit + 1])
+            has_previous, has_next = after is not None, len(page) > limit
+            page = page[:limit]
+            if last is not None and len(page) > last:
+                page, has_previous = page[len(page) - last:], True
+
+        edges = [
+            self.type.Edge(node=row, cursor=encode_cursor([getattr(row, name) for name, _ in keys]))
+            for row in page
+        ]
+        return self.type(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous,
+                has_next_page=has_next,
+            ),
+        )
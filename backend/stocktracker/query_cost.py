@@ -0,0 +1,177 @@
+"""
+Static cost and depth limits for GraphQL operations, checked during validation.
+
+A field costs its weight -- ``FIELD_WEIGHTS["Type.field"]``, else 1 for
+objects and 0 for scalars and a connection's ``edges`` and ``pageInfo`` --
+plus the cost of its selections, times the number of times it is resolved:
+a list field multiplies what it selects by
+its ``first``/``last`` argument (a variable counts as its default, else as the
+largest page), a connection's ``edges`` by its page size (at most
+``RELAY_CONNECTION_MAX_LIMIT``) and any other list by ``LIST_SIZE``. An
+operation over ``MAX_COST`` or nested deeper than ``MAX_DEPTH`` is rejected
+before it runs, with the computed cost in the error's extensions.
+
+The limits and this process's counts of checked and rejected operations are
+served by ``stocktracker.views.query_metrics``. A document validated once and
+reused from the document cache still counts every time it is served: the
+cache keeps what its validation counted (``recording_metrics``) and adds it
+again on each hit.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from graphene.validation import depth_limit_validator
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_leaf_type,
+    is_list_type,
+    is_object_type,
+    specified_rules,
+)
+from graphql.validation import ValidationRule
+
+DEFAULT_LIMITS = {
+    "MAX_COST": 50000,
+    "MAX_DEPTH": 12,
+    "LIST_SIZE": 20,
+    "FIELD_WEIGHTS": {},
+}
+
+metrics = Counter()
+_metrics_lock = threading.Lock()
+_recording = threading.local()
+
+
+def query_limits():
+    return {**DEFAULT_LIMITS, **getattr(settings, "QUERY_LIMITS", {})}
+
+
+def count(**increments):
+    recorded = getattr(_recording, "increments", None)
+    if recorded is not None:
+        recorded.update(increments)
+        return
+    with _metrics_lock:
+        metrics.update(increments)
+
+
+@contextmanager
+def recording_metrics():
+    """Collect what is counted in this thread inside the block in a Counter, instead of in ``metrics``."""
+    _recording.increments = increments = Counter()
+    try:
+        yield increments
+    finally:
+        _recording.increments = None
+
+
+def _is_connection(graphql_type):
+    return is_object_type(graphql_type) and "edges" in graphql_type.fields and "pageInfo" in graphql_type.fields
+
+
+class QueryCostRule(ValidationRule):
+    """Rejects operations whose estimated cost is over ``MAX_COST``."""
+
+    def enter_operation_definition(self, node, *args):
+        self.limits = query_limits()
+        self.defaults = {
+            definition.variable.name.value: definition.default_value
+            for definition in node.variable_definitions or ()
+        }
+        root = self.context.schema.get_root_type(node.operation)
+        cost = self.selection_cost(root, node.selection_set, set())
+        max_cost = self.limits["MAX_COST"]
+        count(operations_checked=1, cost_total=cost)
+        if cost > max_cost:
+            count(rejected_cost=1)
+            name = node.name.value if node.name else "anonymous"
+            self.report_error(GraphQLError(
+                f"'{name}' has an estimated cost of {cost}, over the maximum of {max_cost}.",
+                node,
+                extensions={"code": "QUERY_TOO_COSTLY", "cost": cost, "maxCost": max_cost},
+            ))
+
+    def page_size(self, node):
+        """The ``first``/``last`` argument of a field, or None."""
+        sizes = []
+        for argument in node.arguments:
+            if argument.name.value not in ("first", "last"):
+                continue
+            value = argument.value
+            if isinstance(value, VariableNode):
+                value = self.defaults.get(value.name.value)
+            if isinstance(value, IntValueNode):
+                sizes.append(int(value.value))
+            else:
+                sizes.append(graphene_settings.RELAY_CONNECTION_MAX_LIMIT)
+        return min(sizes) if sizes else None
+
+    def selection_cost(self, parent_type, selection_set, fragments, edges_size=None):
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field = getattr(parent_type, "fields", {}).get(selection.name.value)
+                if field is not None:
+                    cost += self.field_cost(parent_type, field, selection, fragments, edges_size)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = self.context.schema.get_type(condition.name.value) if condition else parent_type
+                cost += self.selection_cost(fragment_type, selection.selection_set, fragments, edges_size)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.context.get_fragment(name)
+                # A fragment that spreads itself is reported by NoFragmentCyclesRule.
+                if fragment is not None and name not in fragments:
+                    fragment_type = self.context.schema.get_type(fragment.type_condition.name.value)
+                    cost += self.selection_cost(fragment_type, fragment.selection_set, fragments | {name}, edges_size)
+        return cost
+
+    def field_cost(self, parent_type, field, node, fragments, edges_size):
+        name = node.name.value
+        field_type = get_nullable_type(field.type)
+        named_type = get_named_type(field_type)
+        # Edges only wrap the nodes, which are what is counted.
+        structural = is_leaf_type(named_type) or _is_connection(parent_type)
+        weight = self.limits["FIELD_WEIGHTS"].get(f"{parent_type.name}.{name}", 0 if structural else 1)
+        size = self.page_size(node)
+
+        times = 1
+        if is_list_type(field_type):
+            if name == "edges" and edges_size is not None:
+                times = edges_size
+            else:
+                times = self.limits["LIST_SIZE"] if size is None else size
+
+        selections = 0
+        if node.selection_set is not None:
+            page = None
+            if _is_connection(named_type):
+                page = graphene_settings.RELAY_CONNECTION_MAX_LIMIT if size is None else size
+            selections = self.selection_cost(named_type, node.selection_set, fragments, page)
+        return times * (weight + selections)
+
+
+def _record_depths(depths):
+    max_depth = query_limits()["MAX_DEPTH"]
+    # The depth validator stops counting, and reports, one level past the limit.
+    count(rejected_depth=sum(1 for depth in depths.values() if depth > max_depth))
+
+
+def validation_rules():
+    """The standard rules plus the depth and cost rules, for the GraphQL view to validate operations with."""
+    # A view's validation_rules replace the standard ones rather than adding to them.
+    return (
+        *specified_rules,
+        depth_limit_validator(max_depth=query_limits()["MAX_DEPTH"], callback=_record_depths),
+        QueryCostRule,
+    )
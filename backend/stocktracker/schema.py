@@ -3,6 +3,7 @@ import graphql_jwt
 import stocks.schema
 import analysis.schema
 import users.schema
+from stocktracker import query_cost
 
 class Query(stocks.schema.Query, analysis.schema.Query, users.schema.Query, graphene.ObjectType):
     pass
@@ -13,4 +14,7 @@ class Mutation(stocks.schema.Mutation, analysis.schema.Mutation, users.schema.Mu
     verify_token = graphql_jwt.Verify.Field()
     refresh_token = graphql_jwt.Refresh.Field()
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = graphene.Schema(query=Query, mutation=Mutation)
+
+# Checked for every operation before it runs: nesting depth and estimated cost (see stocktracker.query_cost).
+validation_rules = query_cost.validation_rules()
\ No newline at end of file
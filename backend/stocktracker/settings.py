@@ -141,13 +141,97 @@ GRAPHENE = {
     'SCHEMA': 'stocktracker.schema.schema',
     'MIDDLEWARE': [
         'graphene_django.debug.DjangoDebugMiddleware',
-        "graphql_jwt.middleware.JSONWebTokenMiddleware"
+        "graphql_jwt.middleware.JSONWebTokenMiddleware",
+        'stocktracker.dataloaders.DataLoaderMiddleware',
     ]
 }
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Where the refresh pipeline gets prices from: "yfinance", "local" (a directory
+# of Parquet/CSV bar files, see stocks.utils.providers.LocalFileProvider) or a
+# dotted path to a PriceDataProvider subclass. RATE_LIMIT caps upstream calls
+# per second for each refresh process; unset uses the provider's own default.
+# PANEL_ROOT holds the memory-mapped price panels (see stocks.utils.panel_store).
+# FUNDAMENTALS_TTL_DAYS is how long cached company info (name, sector,
+# industry) is trusted before refresh_fundamentals fetches it again.
+PRICE_DATA = {
+    'PROVIDER': os.environ.get('PRICE_DATA_PROVIDER', 'yfinance'),
+    'LOCAL_ROOT': os.environ.get('PRICE_DATA_ROOT', os.path.join(BASE_DIR, 'price_data')),
+    'RATE_LIMIT': float(os.environ['PRICE_DATA_RATE_LIMIT']) if 'PRICE_DATA_RATE_LIMIT' in os.environ else None,
+    'PANEL_ROOT': os.environ.get('PRICE_PANEL_ROOT', os.path.join(BASE_DIR, 'price_data', 'panels')),
+    'FUNDAMENTALS_TTL_DAYS': 30,
+}
+
+# Refresh scheduler (manage.py run_scheduler): intervals in seconds between
+# refreshes of watched stocks and of the rest of the universe while the market
+# is open, how recent a note/evaluation must be to count as watched, and the
+# most stocks refreshed per scheduling run.
+REFRESH_SCHEDULE = {
+    'PRIORITY_INTERVAL': 15 * 60,
+    'UNIVERSE_INTERVAL': 4 * 60 * 60,
+    'ACTIVITY_DAYS': 14,
+    'MAX_STOCKS_PER_RUN': 500,
+}
+
+# In-memory screening of allStocks/stocksFiltered/breakoutStocks/trendingStocks
+# (stocks/utils/screener.py). With SHARED the snapshot is published under ROOT
+# after each refresh and memory-mapped by every worker; otherwise each worker
+# keeps its own copy and checks every RECHECK_SECONDS whether the stocks table changed.
+SCREENER = {
+    'ENGINE': os.environ.get('SCREENER_ENGINE', '0') == '1',
+    'SHARED': os.environ.get('SCREENER_SHARED', '0') == '1',
+    'ROOT': os.environ.get('SCREENER_ROOT', os.path.join(BASE_DIR, 'price_data', 'screener')),
+    'RECHECK_SECONDS': 10,
+}
+
+# GraphQL operations are rejected before running when nested deeper than
+# MAX_DEPTH or estimated to cost more than MAX_COST (stocktracker/query_cost.py).
+# A field costs its FIELD_WEIGHTS entry ("Type.field"; 1 for objects, 0 for
+# scalars by default) per time it is resolved. Lists count as their first/last
+# argument, or as LIST_SIZE when they have none (connections as a full page).
+QUERY_LIMITS = {
+    'MAX_COST': int(os.environ.get('GRAPHQL_MAX_COST', 50000)),
+    'MAX_DEPTH': int(os.environ.get('GRAPHQL_MAX_DEPTH', 12)),
+    'LIST_SIZE': 20,
+    'FIELD_WEIGHTS': {
+        # Fetches a price history from the data provider.
+        'Mutation.fetchStock': 500,
+        # Screens and aggregates over the whole universe.
+        'Query.stocksAsOf': 50,
+        # A filtered scan of the universe per page; its nodes count per page like any connection's.
+        'SavedScreenType.stocks': 20,
+        'Query.sectorStrength': 20,
+        'Query.industryGroupStrength': 20,
+    },
+}
+
+# Parsed and validated GraphQL documents are kept in a per-process LRU of
+# CACHE_SIZE entries (stocktracker/documents.py). PERSISTED_QUERIES is the path
+# of a JSON manifest of registered documents by SHA-256, which clients can send
+# as just the hash; with PERSISTED_ONLY no other document is accepted.
+GRAPHQL_DOCUMENTS = {
+    'CACHE_SIZE': 512,
+    'PERSISTED_QUERIES': os.environ.get('GRAPHQL_PERSISTED_QUERIES') or None,
+    'PERSISTED_ONLY': os.environ.get('GRAPHQL_PERSISTED_ONLY', '0') == '1',
+}
+
+# Progress of refreshes, onboarding and the scheduler goes to the console.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'stocks': {'handlers': ['console'], 'level': os.environ.get('STOCKS_LOG_LEVEL', 'INFO')},
+    },
+}
+
 AUTHENTICATION_BACKENDS = [
     "graphql_jwt.backends.JSONWebTokenBackend",
     "django.contrib.auth.backends.ModelBackend",
@@ -19,9 +19,12 @@ from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.decorators.csrf import csrf_exempt
-from graphene_file_upload.django import FileUploadGraphQLView
+
+from stocktracker.schema import validation_rules
+from stocktracker.views import GraphQLView, query_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('graphql/', csrf_exempt(FileUploadGraphQLView.as_view(graphiql=True))),
+    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True, validation_rules=validation_rules))),
+    path('graphql/metrics/', query_metrics),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
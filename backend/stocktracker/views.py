@@ -0,0 +1,134 @@
+import json
+
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import HttpError
+from graphene_file_upload.django import FileUploadGraphQLView
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, validate_schema
+
+from stocktracker import documents
+from stocktracker.query_cost import metrics, query_limits
+
+
+class GraphQLView(FileUploadGraphQLView):
+    """
+    The GraphQL endpoint: file uploads, persisted queries, and parsed and
+    validated documents reused from ``stocktracker.documents`` instead of
+    parsing and validating every request again.
+    """
+
+    @staticmethod
+    def persisted_hash(request, data):
+        """The hash of Apollo's ``extensions.persistedQuery``, if the request has one."""
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        persisted = (extensions or {}).get("persistedQuery")
+        return persisted.get("sha256Hash") if isinstance(persisted, dict) else None
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        digest = self.persisted_hash(request, data)
+        if digest is not None:
+            if query and documents.document_hash(query) != digest:
+                raise HttpError(HttpResponseBadRequest("The persisted query hash does not match the query."))
+            query = query or documents.persisted_query(digest)
+            if not query:
+                return ExecutionResult(errors=[
+                    GraphQLError("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+                ])
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        digest = digest or documents.document_hash(query)
+        if documents.documents_config()["PERSISTED_ONLY"] and documents.persisted_query(digest) is None:
+            return ExecutionResult(errors=[
+                GraphQLError("Only persisted queries are accepted.", extensions={"code": "PERSISTED_QUERY_REQUIRED"})
+            ])
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, errors = documents.parse_and_validate(
+            schema, query, self.validation_rules, digest, graphene_settings.MAX_VALIDATION_ERRORS
+        )
+        if document is None:
+            return ExecutionResult(errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ["POST"], f"Can only perform a {operation_ast.operation.value} operation from a POST request."
+            ))
+
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+def query_metrics(request):
+    """
+    GraphQL query limits and this process's counts of checked and rejected
+    operations, in Prometheus text format. Operations served from the
+    document cache count as often as they are served.
+    """
+    limits = query_limits()
+    lines = []
+    for name, kind, help_text, samples in [
+        ("graphql_query_cost_budget", "gauge", "Largest estimated cost an operation may have.",
+         [("", limits["MAX_COST"])]),
+        ("graphql_query_depth_budget", "gauge", "Deepest nesting an operation may have.",
+         [("", limits["MAX_DEPTH"])]),
+        ("graphql_operations_checked_total", "counter", "Operations whose cost was estimated.",
+         [("", metrics["operations_checked"])]),
+        ("graphql_operation_cost_total", "counter", "Sum of the estimated costs of checked operations.",
+         [("", metrics["cost_total"])]),
+        ("graphql_operations_rejected_total", "counter", "Operations rejected for going over a limit.",
+         [('{reason="cost"}', metrics["rejected_cost"]), ('{reason="depth"}', metrics["rejected_depth"])]),
+    ]:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+    return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -2,6 +2,7 @@ import graphene
 from graphene_django import DjangoObjectType
 from graphql import GraphQLError
 from django.contrib.auth.models import User
+from stocktracker.pagination import KeysetConnectionField
 from .models import Profile
 
 class UserType(DjangoObjectType):
@@ -68,7 +69,7 @@ class UpdateProfileMutation(graphene.Mutation):
 class Query(graphene.ObjectType):
     me = graphene.Field(UserType)
     user = graphene.Field(UserType, id=graphene.ID())
-    users = graphene.List(UserType)
+    users = KeysetConnectionField(UserType, order_by=("username",))
 
     def resolve_me(self, info):
         user = info.context.user
@@ -1,3 +1,47 @@
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from stocktracker.schema import schema
+
+
+def execute(query, **variables):
+    request = RequestFactory().post("/graphql/")
+    request.user = AnonymousUser()
+    result = schema.execute(query, variable_values=variables, context_value=request)
+    if result.errors:
+        raise result.errors[0]
+    return result.data
+
+
+class UsersTests(TestCase):
+    QUERY = """
+        query ($first: Int, $after: String, $last: Int, $before: String) {
+            users(first: $first, after: $after, last: $last, before: $before) {
+                edges { node { username } }
+                pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+            }
+        }
+    """
+
+    def setUp(self):
+        for username in ["dora", "alice", "carol", "bob"]:
+            User.objects.create_user(username)
+
+    def page(self, **args):
+        connection = execute(self.QUERY, **args)["users"]
+        return [edge["node"]["username"] for edge in connection["edges"]], connection["pageInfo"]
+
+    def test_users_are_paged_by_username(self):
+        first, info = self.page(first=3)
+        self.assertEqual(first, ["alice", "bob", "carol"])
+        self.assertTrue(info["hasNextPage"])
+
+        rest, info = self.page(first=3, after=info["endCursor"])
+        self.assertEqual(rest, ["dora"])
+        self.assertEqual((info["hasNextPage"], info["hasPreviousPage"]), (False, True))
+
+        self.assertEqual(self.page(last=3, before=info["startCursor"])[0], first)
+
+    def test_page_size_is_capped(self):
+        with self.assertRaisesMessage(Exception, "`first` on the `users` connection must be between 0 and"):
+            self.page(first=10_000)